@@ -0,0 +1,187 @@
+"""Бэкенды AI-анализа: OpenAI, локальный HTTP-сервер и эвристика без модели.
+
+Выбирается через AI_BACKEND:
+- openai    — OpenAI ChatCompletion (по умолчанию);
+- http      — любой OpenAI-совместимый /chat/completions по AI_BACKEND_URL,
+              например benchmarks.stand_ins.FakeLLM для офлайн-нагрузки;
+- heuristic — оценка по медианам цены за м² из истории выдачи
+              (app/services/price_stats.py), бесплатно и без сети.
+
+Эвристика же служит запасным вариантом, когда основной бэкенд упал или не
+уложился в AI_TIMEOUT. AI_LATENCY_MS добавляет искусственную задержку к
+любому бэкенду — чтобы нагружать PRO-путь с реалистичным временем ответа.
+"""
+import abc
+import asyncio
+import logging
+import os
+
+import aiohttp
+import openai
+
+from app.services.price_stats import PRICES, guess_mode
+from config import Config, get_config
+
+logger = logging.getLogger(__name__)
+
+
+class AIBackend(abc.ABC):
+    name = "base"
+
+    def __init__(self, latency_ms: int = 0):
+        self._latency = latency_ms / 1000
+
+    async def complete(self, prompt: str, listing: dict, max_tokens: int = 200) -> tuple[str | None, int]:
+        """(текст или None, потрачено токенов)."""
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return await self._complete(prompt, listing, max_tokens)
+
+    @abc.abstractmethod
+    async def _complete(self, prompt: str, listing: dict, max_tokens: int) -> tuple[str | None, int]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIBackend(AIBackend):
+    name = "openai"
+
+    def __init__(self, api_key: str | None, model: str = "gpt-4o-mini", latency_ms: int = 0):
+        super().__init__(latency_ms)
+        self._api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._model = model
+
+    async def _complete(self, prompt: str, listing: dict, max_tokens: int) -> tuple[str | None, int]:
+        openai.api_key = self._api_key
+        resp = await openai.ChatCompletion.acreate(
+            model=self._model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7,
+        )
+        usage = getattr(resp, "usage", None)
+        tokens = getattr(usage, "total_tokens", 0) or 0
+        return resp.choices[0].message.content.strip(), tokens
+
+
+class HTTPBackend(AIBackend):
+    """OpenAI-совместимый сервер: POST {url}/chat/completions."""
+
+    name = "http"
+
+    def __init__(self, url: str, api_key: str | None = None, model: str = "gpt-4o-mini", latency_ms: int = 0):
+        super().__init__(latency_ms)
+        self._url = url.rstrip("/") + "/chat/completions"
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._model = model
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _complete(self, prompt: str, listing: dict, max_tokens: int) -> tuple[str | None, int]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self._headers)
+        payload = {
+            "model": self._model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+        }
+        async with self._session.post(self._url, json=payload) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        text = data["choices"][0]["message"]["content"].strip()
+        return text, int((data.get("usage") or {}).get("total_tokens") or 0)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class HeuristicBackend(AIBackend):
+    """Цена за м² против медианы похожих объявлений (режим, район, комнаты)."""
+
+    name = "heuristic"
+
+    async def _complete(self, prompt: str, listing: dict, max_tokens: int) -> tuple[str | None, int]:
+        score = market_score(listing)
+        if score is None:
+            return None, 0
+        deviation, _, samples = score
+        return format_estimate(deviation, samples), 0
+
+
+def market_score(listing: dict) -> tuple[float, float, int] | None:
+    price = listing.get("price") or ""
+    return PRICES.score(guess_mode(price), listing.get("district") or "", listing.get("title") or "", price)
+
+
+def format_estimate(deviation: float, samples: int) -> str:
+    """Тот же формат, что просим у модели, по отклонению от медианы (-0.12 = на 12% ниже)."""
+    pct = abs(deviation) * 100
+    if deviation <= -0.05:
+        price = f"📊 Цена на {pct:.0f}% ниже рынка"
+    elif deviation >= 0.05:
+        price = f"📊 Цена на {pct:.0f}% выше рынка"
+    else:
+        price = "📊 Цена в рынке"
+    if deviation <= -0.3:
+        risk, value, summary = "высокий", "под вопросом", "Подозрительно дёшево — проверьте документы и продавца."
+    elif deviation <= -0.1:
+        risk, value, summary = "средний", "высокая", "Заметно дешевле похожих — стоит смотреть быстро."
+    elif deviation < 0.1:
+        risk, value, summary = "низкий", "средняя", "Обычное предложение по рынку."
+    else:
+        risk, value, summary = "низкий", "низкая", "Дороже похожих — есть смысл торговаться."
+    return (
+        f"{price} (медиана {samples} похожих)\n"
+        f"⚠ Риск: {risk}\n"
+        f"💰 Инвестиционная привлекательность: {value}\n"
+        f"{summary}"
+    )
+
+
+_backend: AIBackend | None = None
+_heuristic: HeuristicBackend | None = None
+
+
+def get_heuristic() -> HeuristicBackend:
+    global _heuristic
+    if _heuristic is None:
+        _heuristic = HeuristicBackend()
+    return _heuristic
+
+
+def get_backend(config: Config | None = None) -> AIBackend:
+    global _backend
+    if _backend is None:
+        config = config or get_config()
+        name = config.AI_BACKEND
+        if name == "heuristic":
+            _backend = HeuristicBackend(config.AI_LATENCY_MS)
+        elif name == "http":
+            if not config.AI_BACKEND_URL:
+                raise RuntimeError("AI_BACKEND=http требует AI_BACKEND_URL")
+            _backend = HTTPBackend(config.AI_BACKEND_URL, config.OPENAI_API_KEY, latency_ms=config.AI_LATENCY_MS)
+        else:
+            if name != "openai":
+                logger.warning("Unknown AI_BACKEND=%r, using openai", name)
+            _backend = OpenAIBackend(config.OPENAI_API_KEY, latency_ms=config.AI_LATENCY_MS)
+        logger.info("AI backend: %s", _backend.name)
+    return _backend
+
+
+def observe_listing(listing: dict) -> None:
+    """Кормит медианы всеми распарсенными объявлениями, не только PRO.
+
+    Старый монитор не сбрасывает PRICES в listing_prices (и id у него
+    строковые), поэтому медианы здесь живут только в памяти процесса.
+    """
+    price = listing.get("price") or ""
+    PRICES.observe(
+        listing.get("id"),
+        guess_mode(price),
+        listing.get("district") or "",
+        listing.get("title") or "",
+        price,
+        persist=False,
+    )
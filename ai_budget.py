@@ -0,0 +1,123 @@
+"""Бюджет AI-анализа: вызовы, токены и латентность за скользящий час.
+
+analyze_listing спрашивает у BUDGET режим перед каждым запросом к модели:
+- full      — обычный запрос (AI_MAX_TOKENS);
+- short     — бюджет почти выбран (AI_BUDGET_SOFT от лимита) или модель
+              отвечает медленнее AI_SLOW_MS — просим AI_SHORT_MAX_TOKENS;
+- heuristic — лимит вызовов или токенов за час исчерпан, модель не зовём,
+              отдаём оценку по медианам (ai_backends.HeuristicBackend).
+Сводка для админки — BUDGET.snapshot() / admin_text().
+"""
+import time
+from collections import Counter, deque
+
+from config import Config, get_config
+
+WINDOW = 3600.0
+# вес последнего ответа в скользящей средней латентности
+LATENCY_ALPHA = 0.2
+
+FULL, SHORT, HEURISTIC = "full", "short", "heuristic"
+
+
+class AIBudget:
+    def __init__(
+        self,
+        calls_per_hour: int,
+        tokens_per_hour: int,
+        slow_ms: float,
+        soft: float = 0.8,
+        max_tokens: int = 200,
+        short_max_tokens: int = 80,
+    ):
+        self.calls_per_hour = calls_per_hour
+        self.tokens_per_hour = tokens_per_hour
+        self.slow_ms = slow_ms
+        self.soft = soft
+        self.max_tokens = max_tokens
+        self.short_max_tokens = short_max_tokens
+        # (время, токены) за последний час; суммы ведём инкрементально
+        self._events: deque[tuple[float, int]] = deque()
+        self._tokens = 0
+        self.latency_ms = 0.0
+        self.errors = 0
+        self.modes: Counter[str] = Counter()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "AIBudget":
+        return cls(
+            calls_per_hour=config.AI_CALLS_PER_HOUR,
+            tokens_per_hour=config.AI_TOKENS_PER_HOUR,
+            slow_ms=config.AI_SLOW_MS,
+            max_tokens=config.AI_MAX_TOKENS,
+            short_max_tokens=config.AI_SHORT_MAX_TOKENS,
+        )
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - WINDOW
+        while self._events and self._events[0][0] < cutoff:
+            self._tokens -= self._events.popleft()[1]
+
+    def mode(self) -> str:
+        self._prune(time.time())
+        calls = len(self._events)
+        if calls >= self.calls_per_hour or self._tokens >= self.tokens_per_hour:
+            mode = HEURISTIC
+        elif (
+            calls >= self.calls_per_hour * self.soft
+            or self._tokens >= self.tokens_per_hour * self.soft
+            or self.latency_ms > self.slow_ms
+        ):
+            mode = SHORT
+        else:
+            mode = FULL
+        self.modes[mode] += 1
+        return mode
+
+    def max_tokens_for(self, mode: str) -> int:
+        return self.short_max_tokens if mode == SHORT else self.max_tokens
+
+    def record(self, tokens: int, latency_ms: float, ok: bool = True) -> None:
+        """Учесть вызов модели; неудачный тоже тратит бюджет вызовов."""
+        self._events.append((time.time(), tokens))
+        self._tokens += tokens
+        if not ok:
+            self.errors += 1
+        if self.latency_ms:
+            self.latency_ms += LATENCY_ALPHA * (latency_ms - self.latency_ms)
+        else:
+            self.latency_ms = latency_ms
+
+    def snapshot(self) -> dict:
+        self._prune(time.time())
+        return {
+            "calls_hour": len(self._events),
+            "calls_cap": self.calls_per_hour,
+            "tokens_hour": self._tokens,
+            "tokens_cap": self.tokens_per_hour,
+            "latency_ms": self.latency_ms,
+            "slow_ms": self.slow_ms,
+            "errors": self.errors,
+            "modes": dict(self.modes),
+        }
+
+    def admin_text(self) -> str:
+        s = self.snapshot()
+        modes = s["modes"]
+        return (
+            f"🤖 AI за час: {s['calls_hour']}/{s['calls_cap']} вызовов, "
+            f"{s['tokens_hour']}/{s['tokens_cap']} токенов\n"
+            f"⏱ Латентность ~{s['latency_ms']:.0f} ms (порог {s['slow_ms']:.0f})\n"
+            f"↘ Деградация: short {modes.get(SHORT, 0)}, heuristic {modes.get(HEURISTIC, 0)}, "
+            f"ошибок {s['errors']}"
+        )
+
+
+_budget: AIBudget | None = None
+
+
+def get_budget() -> AIBudget:
+    global _budget
+    if _budget is None:
+        _budget = AIBudget.from_config(get_config())
+    return _budget
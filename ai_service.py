@@ -1,25 +1,77 @@
+import asyncio
+import itertools
 import logging
-import os
+import time
+from typing import Awaitable, Callable
 
-import openai
-
-from config import get_redis
+from ai_backends import get_backend, get_heuristic, market_score
+from ai_budget import HEURISTIC, get_budget
+from app.cache import TieredCache
+from config import get_config, get_redis
 
 logger = logging.getLogger(__name__)
 
+AI_CACHE_TTL = 21600
+
+_ai_cache: TieredCache | None = None
+
+
+async def _get_ai_cache() -> TieredCache:
+    """ai:{id} — сначала LRU процесса, потом Redis."""
+    global _ai_cache
+    if _ai_cache is None:
+        config = get_config()
+        _ai_cache = TieredCache(
+            "ai", await get_redis(), config.AI_CACHE_LOCAL_SIZE, config.AI_CACHE_LOCAL_TTL
+        )
+    return _ai_cache
+
+# listing id -> анализ, который сейчас выполняется в этом процессе
+_inflight: dict[str, asyncio.Future] = {}
+
+
 async def analyze_listing(listing: dict) -> str | None:
-    """Perform AI analysis of a listing and cache in Redis."""
+    """AI-анализ объявления с singleflight.
+
+    Параллельные вызовы по одному объявлению ждут один и тот же запрос к
+    модели; между процессами результат делится через Redis (ai:{id}).
+    """
+    listing_id = listing.get("id")
+    if not listing_id:
+        return None
+    key = str(listing_id)
+    pending = _inflight.get(key)
+    if pending is not None:
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    result = None
+    try:
+        result = await _analyze(listing, listing_id)
+        return result
+    finally:
+        del _inflight[key]
+        future.set_result(result)
+
+
+async def _analyze(listing: dict, listing_id) -> str | None:
+    """Perform AI analysis of a listing with the configured backend and cache it."""
     try:
-        listing_id = listing.get("id")
-        if not listing_id:
-            return None
-        redis = await get_redis()
+        cache = await _get_ai_cache()
         key = f"ai:{listing_id}"
-        cached = await redis.get(key)
+        cached = await cache.get(key)
         if cached:
             return cached
 
         # build prompt
+        score = market_score(listing)
+        market = (
+            f"market: медиана {score[1]:,.0f} ₸/м² по {score[2]} похожим, "
+            f"это объявление {score[0] * 100:+.0f}%\n"
+            if score else ""
+        )
         prompt = (
             "Ты — эксперт по недвижимости Алматы.\n"
             "Проанализируй объявление:\n"
@@ -27,7 +79,8 @@ async def analyze_listing(listing: dict) -> str | None:
             f"price: {listing.get('price')}\n"
             f"district: {listing.get('district')}\n"
             f"residential_complex: {listing.get('residential_complex')}\n"
-            f"description: {listing.get('description')}\n\n"
+            f"description: {listing.get('description')}\n"
+            f"{market}\n"
             "Выдай:\n"
             "1. 📊 Оценка цены (ниже/выше рынка)\n"
             "2. ⚠ Риск (низкий/средний/высокий)\n"
@@ -35,16 +88,104 @@ async def analyze_listing(listing: dict) -> str | None:
             "4. Краткий вывод (1–2 предложения)\n\n"
             "Ответ в сжатом формате."
         )
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        resp = await openai.ChatCompletion.acreate(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.7,
-        )
-        text = resp.choices[0].message.content.strip()
-        await redis.set(key, text, ex=21600)
+        backend = get_backend()
+        if backend.name == "heuristic":
+            text, _ = await backend.complete(prompt, listing)
+            return text
+
+        budget = get_budget()
+        mode = budget.mode()
+        if mode == HEURISTIC:
+            # часовой лимит выбран — модель не зовём, в кэш не кладём
+            text, _ = await get_heuristic().complete(prompt, listing)
+            return text
+
+        started = time.perf_counter()
+        try:
+            text, tokens = await asyncio.wait_for(
+                backend.complete(prompt, listing, max_tokens=budget.max_tokens_for(mode)),
+                timeout=get_config().AI_TIMEOUT,
+            )
+        except Exception as e:
+            budget.record(0, (time.perf_counter() - started) * 1000, ok=False)
+            # модель упала или тормозит — бесплатная оценка вместо пустоты;
+            # в кэш не кладём, чтобы следующий вызов снова спросил модель
+            logger.warning("AI backend %s failed, using heuristic: %r", backend.name, e)
+            text, _ = await get_heuristic().complete(prompt, listing)
+            return text
+        budget.record(tokens, (time.perf_counter() - started) * 1000)
+        if text:
+            await cache.set(key, text, ex=AI_CACHE_TTL)
         return text
     except Exception as e:
         logger.warning("AI analyze error: %s", e)
         return None
+
+
+# Отдельная стадия AI-анализа: объявление уходит PRO-пользователю сразу,
+# анализ приходит следом вторым сообщением. На одно объявление — один
+# вызов модели, сколько бы PRO-получателей его ни ждали.
+AI_WORKERS = 3
+AI_MAX_PENDING = 500
+
+
+def format_followup(listing: dict, analysis: str) -> str:
+    return f"🤖 AI Анализ: {listing.get('title')}\n\n{analysis}"
+
+
+class AnalysisStage:
+    def __init__(
+        self,
+        deliver: Callable[[int, str], Awaitable[None]],
+        workers: int = AI_WORKERS,
+        max_pending: int = AI_MAX_PENDING,
+    ):
+        self._deliver = deliver
+        self._workers = workers
+        # (priority, seq, listing): меньше priority — раньше; seq держит FIFO
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_pending)
+        self._seq = itertools.count()
+        # listing id -> кому отправить анализ; есть ключ — анализ уже в очереди
+        self._recipients: dict[str, list[int]] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, listing: dict, user_id: int, priority: int = 0) -> bool:
+        """Поставить анализ в очередь, не дожидаясь его. False — очередь полна."""
+        key = str(listing["id"])
+        waiting = self._recipients.get(key)
+        if waiting is not None:
+            if user_id not in waiting:
+                waiting.append(user_id)
+            return True
+        try:
+            self._queue.put_nowait((priority, next(self._seq), listing))
+        except asyncio.QueueFull:
+            logger.warning("AI queue full, skipping analysis for %s", key)
+            return False
+        self._recipients[key] = [user_id]
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, listing = await self._queue.get()
+            key = str(listing["id"])
+            try:
+                analysis = await analyze_listing(listing)
+                # получатели, добавленные пока шёл запрос, тоже попадают сюда
+                recipients = self._recipients.pop(key, [])
+                if analysis:
+                    text = format_followup(listing, analysis)
+                    for user_id in recipients:
+                        await self._deliver(user_id, text)
+            except Exception as e:
+                self._recipients.pop(key, None)
+                logger.warning("AI stage error for %s: %s", key, e)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        for _ in range(self._workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def pending(self) -> int:
+        return len(self._recipients)
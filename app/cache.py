@@ -0,0 +1,116 @@
+"""Двухуровневый кэш: LRU с TTL в памяти процесса, за ним Redis.
+
+Первый уровень отвечает без сетевого запроса на то, что процесс уже видел
+(AI-анализ объявления, ключи «уже отправлено»); второй делит данные между
+процессами и переживает рестарт. Промах первого уровня идёт в Redis, найденное
+там поднимается в LRU. Попадания и промахи считаются по уровням — в
+cache_lookups_total и в stats() для админки.
+"""
+import time
+from collections import Counter, OrderedDict
+from typing import Iterable, Sequence
+
+from app.metrics import CACHE_LOOKUPS
+from app.redis_client import RedisClient
+
+
+class LRUCache:
+    def __init__(self, max_size: int = 1000, ttl: float = 300.0):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        if self._max_size <= 0:
+            return
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class TieredCache:
+    def __init__(self, name: str, redis: RedisClient, local_size: int = 1000, local_ttl: float = 300.0):
+        self.name = name
+        self._redis = redis
+        self.local = LRUCache(local_size, local_ttl)
+        self._stats: Counter[tuple[str, str]] = Counter()
+
+    def _count(self, tier: str, result: str, n: int = 1) -> None:
+        if n:
+            self._stats[tier, result] += n
+            CACHE_LOOKUPS.inc(self.name, tier, result, amount=n)
+
+    async def get(self, key: str) -> str | None:
+        value = self.local.get(key)
+        if value is not None:
+            self._count("local", "hit")
+            return value
+        self._count("local", "miss")
+        value = await self._redis.get(key)
+        self._count("redis", "hit" if value is not None else "miss")
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    async def get_many(self, keys: Sequence[str]) -> list[str | None]:
+        """Как get по каждому ключу, но промахи LRU уходят в Redis одним MGET."""
+        values = [self.local.get(k) for k in keys]
+        missing = [i for i, v in enumerate(values) if v is None]
+        self._count("local", "hit", len(keys) - len(missing))
+        self._count("local", "miss", len(missing))
+        if not missing:
+            return values
+        remote = await self._redis.mget([keys[i] for i in missing])
+        found = 0
+        for i, value in zip(missing, remote):
+            if value is not None:
+                values[i] = value
+                self.local.set(keys[i], value)
+                found += 1
+        self._count("redis", "hit", found)
+        self._count("redis", "miss", len(missing) - found)
+        return values
+
+    async def set(self, key: str, value: str, ex: float | None = None) -> None:
+        self.local.set(key, value, ex)
+        await self._redis.set(key, value, ex=ex)
+
+    async def set_many(self, items: Iterable[tuple[str, str]], ex: float | None = None) -> None:
+        items = list(items)
+        for key, value in items:
+            self.local.set(key, value, ex)
+        await self._redis.set_many(items, ex=ex)
+
+    async def delete(self, key: str) -> None:
+        self.local.delete(key)
+        await self._redis.delete(key)
+
+    def stats(self) -> dict:
+        """{"local": {"hit": n, "miss": n, "size": n}, "redis": {"hit": n, "miss": n}}"""
+        result = {tier: {"hit": 0, "miss": 0} for tier in ("local", "redis")}
+        for (tier, outcome), n in self._stats.items():
+            result[tier][outcome] = n
+        result["local"]["size"] = len(self.local)
+        return result
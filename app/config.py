@@ -6,6 +6,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass(frozen=True)
 class Config:
     TOKEN: str
@@ -28,10 +35,32 @@ class Config:
     PARSER_DELAY_MIN: float = 2.0
     PARSER_DELAY_MAX: float = 5.0
     PARSER_TIMEOUT: int = 15
+    PARSER_EXECUTOR: str = "process"
+    KRISHA_BASE_URL: str = "https://krisha.kz"
+    PARSER_WORKERS: int = 2
 
     RATE_LIMIT_PER_SECOND: float = 3.0
+    BROADCAST_RATE_PER_SECOND: float = 25.0
+    SEND_WORKERS: int = 4
+    USER_CACHE_TTL: float = 30.0
+    STATS_FLUSH_INTERVAL: int = 10
+    STATS_SNAPSHOT_TTL: int = 60
+    SENT_RETENTION_MONTHS: int = 6
+    REDIS_URL: str | None = None
+    LOCAL_CACHE_SIZE: int = 100_000
+    LOCAL_CACHE_TTL: float = 300.0
     PROXY_LIST: Tuple[str, ...] = ()
 
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL: float = 0.5
+    LOOP_SLOW_CALLBACK_MS: int = 100
+    LOOP_REPORT_INTERVAL: int = 300
+    LOOP_ASYNCIO_DEBUG: bool = False
+
+    METRICS_ENABLED: bool = False
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 9100
+
     @classmethod
     def from_env(cls) -> "Config":
         token = os.getenv("TOKEN") or os.getenv("BOT_TOKEN")
@@ -72,8 +101,28 @@ class Config:
             PARSER_DELAY_MIN=float(os.getenv("PARSER_DELAY_MIN", "2.0")),
             PARSER_DELAY_MAX=float(os.getenv("PARSER_DELAY_MAX", "5.0")),
             PARSER_TIMEOUT=int(os.getenv("PARSER_TIMEOUT", "15")),
+            PARSER_EXECUTOR=os.getenv("PARSER_EXECUTOR", "process").strip().lower(),
+            KRISHA_BASE_URL=os.getenv("KRISHA_BASE_URL", "https://krisha.kz").rstrip("/"),
+            PARSER_WORKERS=int(os.getenv("PARSER_WORKERS", "2")),
             RATE_LIMIT_PER_SECOND=float(os.getenv("RATE_LIMIT_PER_SECOND", "3.0")),
+            BROADCAST_RATE_PER_SECOND=float(os.getenv("BROADCAST_RATE_PER_SECOND", "25")),
+            SEND_WORKERS=int(os.getenv("SEND_WORKERS", "4")),
+            USER_CACHE_TTL=float(os.getenv("USER_CACHE_TTL", "30")),
+            STATS_FLUSH_INTERVAL=int(os.getenv("STATS_FLUSH_INTERVAL", "10")),
+            STATS_SNAPSHOT_TTL=int(os.getenv("STATS_SNAPSHOT_TTL", "60")),
+            SENT_RETENTION_MONTHS=int(os.getenv("SENT_RETENTION_MONTHS", "6")),
+            REDIS_URL=os.getenv("REDIS_URL") or None,
+            LOCAL_CACHE_SIZE=int(os.getenv("LOCAL_CACHE_SIZE", "100000")),
+            LOCAL_CACHE_TTL=float(os.getenv("LOCAL_CACHE_TTL", "300")),
             PROXY_LIST=proxy_list,
+            LOOP_MONITOR_ENABLED=_env_bool("LOOP_MONITOR_ENABLED", True),
+            LOOP_LAG_INTERVAL=float(os.getenv("LOOP_LAG_INTERVAL", "0.5")),
+            LOOP_SLOW_CALLBACK_MS=int(os.getenv("LOOP_SLOW_CALLBACK_MS", "100")),
+            LOOP_REPORT_INTERVAL=int(os.getenv("LOOP_REPORT_INTERVAL", "300")),
+            LOOP_ASYNCIO_DEBUG=_env_bool("LOOP_ASYNCIO_DEBUG", False),
+            METRICS_ENABLED=_env_bool("METRICS_ENABLED", False),
+            METRICS_HOST=os.getenv("METRICS_HOST", "0.0.0.0"),
+            METRICS_PORT=int(os.getenv("METRICS_PORT", "9100")),
         )
 
     def masked_summary(self) -> dict:
@@ -96,8 +145,23 @@ class Config:
             "PARSER_DELAY_MIN": self.PARSER_DELAY_MIN,
             "PARSER_DELAY_MAX": self.PARSER_DELAY_MAX,
             "PARSER_TIMEOUT": self.PARSER_TIMEOUT,
+            "PARSER_EXECUTOR": self.PARSER_EXECUTOR,
+            "PARSER_WORKERS": self.PARSER_WORKERS,
             "RATE_LIMIT_PER_SECOND": self.RATE_LIMIT_PER_SECOND,
+            "BROADCAST_RATE_PER_SECOND": self.BROADCAST_RATE_PER_SECOND,
+            "SEND_WORKERS": self.SEND_WORKERS,
+            "USER_CACHE_TTL": self.USER_CACHE_TTL,
+            "STATS_FLUSH_INTERVAL": self.STATS_FLUSH_INTERVAL,
+            "STATS_SNAPSHOT_TTL": self.STATS_SNAPSHOT_TTL,
+            "SENT_RETENTION_MONTHS": self.SENT_RETENTION_MONTHS,
+            "REDIS_URL": "***" if self.REDIS_URL else "none",
+            "LOCAL_CACHE_SIZE": self.LOCAL_CACHE_SIZE,
+            "LOCAL_CACHE_TTL": self.LOCAL_CACHE_TTL,
             "PROXY_LIST": f"{len(self.PROXY_LIST)} proxies" if self.PROXY_LIST else "none",
+            "LOOP_MONITOR_ENABLED": self.LOOP_MONITOR_ENABLED,
+            "LOOP_SLOW_CALLBACK_MS": self.LOOP_SLOW_CALLBACK_MS,
+            "METRICS_ENABLED": self.METRICS_ENABLED,
+            "METRICS_PORT": self.METRICS_PORT,
         }
 
     def fingerprint(self) -> str:
@@ -114,5 +178,47 @@ class Config:
         return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
 
 
+_config: Config | None = None
+
+
+def get_config() -> Config:
+    """Конфиг процесса: читается из окружения один раз и дальше переиспользуется.
+
+    Config неизменяемый, поэтому ссылку можно держать сколько угодно —
+    reload_config() не меняет старый объект, а подменяет синглтон.
+    """
+    global _config
+    if _config is None:
+        _config = Config.from_env()
+    return _config
+
+
+def reload_config() -> tuple[Config, dict]:
+    """Перечитывает .env и окружение. Возвращает новый конфиг и изменения.
+
+    Изменения — {поле: (было, стало)} по masked_summary, без секретов.
+    Новый конфиг видят обработчики со следующего апдейта, монитор — со
+    следующего цикла; то, что читается один раз при старте (TOKEN,
+    DATABASE_URL, REDIS_URL, скорость отправки, прокси, пул разбора),
+    применяется только после перезапуска.
+    """
+    global _config
+    load_dotenv(override=True)
+    old = _config
+    new = Config.from_env()
+    _config = new
+    if old is None:
+        return new, {}
+    before, after = old.masked_summary(), new.masked_summary()
+    changes = {k: (before.get(k), v) for k, v in after.items() if before.get(k) != v}
+    if old.TOKEN != new.TOKEN:
+        changes["TOKEN"] = ("***", "***")
+    if old.DATABASE_URL != new.DATABASE_URL:
+        changes["DATABASE_URL"] = ("***", "***")
+    if old.REDIS_URL != new.REDIS_URL:
+        changes["REDIS_URL"] = (before["REDIS_URL"], after["REDIS_URL"])
+    return new, changes
+
+
 def load_config() -> Config:
-    return Config.from_env()
+    return get_config()
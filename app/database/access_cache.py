@@ -0,0 +1,72 @@
+"""user_id -> момент окончания доступа (trial или подписка), в памяти процесса.
+
+SubscriptionMiddleware проверяет доступ на каждом апдейте; с этой картой
+проверка — поиск в dict без обращения к БД. Запись появляется при первом
+апдейте пользователя и сбрасывается там, где доступ меняется: старт trial,
+оплата/апгрейд, массовое понижение истёкших подписок.
+"""
+import time
+from datetime import datetime, timezone
+
+from app.metrics import ACCESS_CACHE_LOOKUPS
+
+# истёкший доступ перепроверяем в БД не чаще раза в RECHECK секунд:
+# подписку могли продлить в обход бота (ручной UPDATE, старый бот)
+RECHECK = 60.0
+
+
+def _ts(value: datetime | None) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        # колонки TIMESTAMP без зоны пишутся через datetime.utcnow()
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def access_expiry(user: dict | None) -> float:
+    """Unix-время окончания доступа по строке users; 0 — доступа нет."""
+    if not user:
+        return 0.0
+    if user.get("subscription_type") in ("standard", "pro"):
+        return _ts(user.get("subscription_until"))
+    return _ts(user.get("trial_until"))
+
+
+class AccessMap:
+    def __init__(self):
+        self._items: dict[int, tuple[float, float]] = {}
+
+    def get(self, user_id: int) -> float | None:
+        """Окончание доступа или None, если нужно сходить в БД."""
+        item = self._items.get(user_id)
+        if item is None:
+            ACCESS_CACHE_LOOKUPS.inc("miss")
+            return None
+        expiry, checked_at = item
+        now = time.time()
+        if expiry <= now and now - checked_at > RECHECK:
+            ACCESS_CACHE_LOOKUPS.inc("recheck")
+            return None
+        ACCESS_CACHE_LOOKUPS.inc("hit")
+        return expiry
+
+    def set(self, user_id: int, expiry: float) -> None:
+        self._items[user_id] = (expiry, time.time())
+
+    def update_from_user(self, user_id: int, user: dict | None) -> float:
+        expiry = access_expiry(user)
+        self.set(user_id, expiry)
+        return expiry
+
+    def invalidate(self, user_id: int) -> None:
+        self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+ACCESS = AccessMap()
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import ssl
+from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
@@ -11,6 +12,8 @@ logger = logging.getLogger(__name__)
 _pool: Optional[asyncpg.Pool] = None
 _lock = asyncio.Lock()
 
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
 
 def _normalize_dsn(dsn: str) -> str:
     if not (dsn.startswith("postgresql://") or dsn.startswith("postgres://")):
@@ -58,7 +61,9 @@ async def get_pool(dsn: str) -> asyncpg.Pool:
                 )
 
                 ssl_context = None
-                if dsn.startswith("postgresql://") or dsn.startswith("postgres://"):
+                if "sslmode=disable" in dsn:
+                    ssl_context = False
+                elif dsn.startswith("postgresql://") or dsn.startswith("postgres://"):
                     ssl_context = ssl.create_default_context()
                     ssl_context.check_hostname = False
                     ssl_context.verify_mode = ssl.CERT_NONE
@@ -115,11 +120,36 @@ async def init_db(dsn: str) -> None:
                     username TEXT
                 );
             """)
+            await _apply_migrations(conn)
             logger.info("Database schema: initialized")
     except asyncpg.PostgresError as exc:
         logger.error("Database schema: init failed: %s", exc)
 
 
+async def _apply_migrations(conn: asyncpg.Connection) -> None:
+    """Применяет migrations/*.sql по порядку имён, каждую ровно один раз."""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT NOW()
+        );
+    """)
+    applied = {
+        r["name"] for r in await conn.fetch("SELECT name FROM schema_migrations")
+    }
+
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        if path.name in applied:
+            continue
+        async with conn.transaction():
+            await conn.execute(path.read_text(encoding="utf-8"))
+            await conn.execute(
+                "INSERT INTO schema_migrations (name) VALUES ($1)",
+                path.name,
+            )
+        logger.info("Database schema: applied %s", path.name)
+
+
 async def close_db() -> None:
     global _pool
 
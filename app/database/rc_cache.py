@@ -0,0 +1,81 @@
+"""Каталог активных ЖК и выбор ЖК у PRO в памяти процесса.
+
+Каталог меняется только из админки (admin_utils: add_rc, toggle_rc_status,
+change_rc_priority) — они вызывают RC_CATALOG.invalidate(). До этого
+get_active_complexes отдаёт списки по категориям без запросов, а version
+позволяет клавиатурам (rc_keyboards.rc_list_kb) кэшироваться до смены
+каталога.
+
+RC_SELECTIONS — выбранные PRO-пользователем ЖК: заполняется первым чтением
+и поддерживается add/remove/clear в rc_repository, поэтому нажатие на ЖК
+в списке стоит одну запись в БД.
+"""
+from app.metrics import CACHE_LOOKUPS
+
+
+class RCCatalog:
+    def __init__(self):
+        self.version = 0
+        self._all: list[dict] | None = None
+        self._by_category: dict[str | None, list[dict]] = {}
+
+    def get(self, category: str | None) -> list[dict] | None:
+        if self._all is None:
+            CACHE_LOOKUPS.inc("rc_catalog", "local", "miss")
+            return None
+        CACHE_LOOKUPS.inc("rc_catalog", "local", "hit")
+        complexes = self._by_category.get(category)
+        if complexes is None:
+            complexes = self._by_category[category] = [
+                rc for rc in self._all if rc["category"] == category
+            ]
+        return complexes
+
+    def put(self, complexes: list[dict], version: int) -> None:
+        """Все активные ЖК в порядке priority DESC, name, прочитанные при version.
+
+        Если каталог успели изменить, пока шёл запрос, результат устарел.
+        """
+        if version != self.version:
+            return
+        self._all = complexes
+        self._by_category = {None: complexes}
+
+    def invalidate(self) -> None:
+        self._all = None
+        self._by_category = {}
+        self.version += 1
+
+
+class RCSelections:
+    def __init__(self, max_size: int = 10_000):
+        self._max_size = max_size
+        self._items: dict[int, list[int]] = {}
+
+    def get(self, user_id: int) -> list[int] | None:
+        selected = self._items.get(user_id)
+        CACHE_LOOKUPS.inc("rc_selected", "local", "miss" if selected is None else "hit")
+        return None if selected is None else list(selected)
+
+    def put(self, user_id: int, selected: list[int]) -> None:
+        self._items.pop(user_id, None)
+        if len(self._items) >= self._max_size:
+            self._items.pop(next(iter(self._items)))
+        self._items[user_id] = list(selected)
+
+    def add(self, user_id: int, complex_id: int) -> None:
+        selected = self._items.get(user_id)
+        if selected is not None and complex_id not in selected:
+            selected.append(complex_id)
+
+    def remove(self, user_id: int, complex_id: int) -> None:
+        selected = self._items.get(user_id)
+        if selected is not None and complex_id in selected:
+            selected.remove(complex_id)
+
+    def invalidate(self, user_id: int) -> None:
+        self._items.pop(user_id, None)
+
+
+RC_CATALOG = RCCatalog()
+RC_SELECTIONS = RCSelections()
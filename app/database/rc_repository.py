@@ -1,35 +1,48 @@
 """Residential Complex repository functions."""
 import asyncpg
 
+from app.database.rc_cache import RC_CATALOG, RC_SELECTIONS
+from app.database.user_cache import USER_CACHE
+from app.metrics import db_timed
+
 
 async def get_active_complexes(
     pool: asyncpg.Pool, category: str | None = None
 ) -> list[dict]:
-    """Fetch active residential complexes, optionally filtered by category."""
-    if category:
-        rows = await pool.fetch(
-            """
-            SELECT id, name, category, priority
-            FROM residential_complexes
-            WHERE is_active = TRUE AND category = $1
-            ORDER BY priority DESC, name ASC
-            """,
-            category,
-        )
-    else:
-        rows = await pool.fetch(
-            """
-            SELECT id, name, category, priority
-            FROM residential_complexes
-            WHERE is_active = TRUE
-            ORDER BY priority DESC, name ASC
-            """
-        )
+    """Active residential complexes, optionally filtered by category (cached)."""
+    complexes = RC_CATALOG.get(category)
+    while complexes is None:
+        # put() отбрасывает результат, если каталог изменили во время запроса
+        version = RC_CATALOG.version
+        RC_CATALOG.put(await _load_active_complexes(pool), version)
+        complexes = RC_CATALOG.get(category)
+    return complexes
+
+
+@db_timed
+async def _load_active_complexes(pool: asyncpg.Pool) -> list[dict]:
+    rows = await pool.fetch(
+        """
+        SELECT id, name, category, priority
+        FROM residential_complexes
+        WHERE is_active = TRUE
+        ORDER BY priority DESC, name ASC
+        """
+    )
     return [dict(r) for r in rows]
 
 
 async def get_user_selected_complexes(pool: asyncpg.Pool, user_id: int) -> list[int]:
-    """Get list of complex IDs selected by PRO user."""
+    """Get list of complex IDs selected by PRO user (cached)."""
+    selected = RC_SELECTIONS.get(user_id)
+    if selected is None:
+        selected = await _load_user_selected_complexes(pool, user_id)
+        RC_SELECTIONS.put(user_id, selected)
+    return selected
+
+
+@db_timed
+async def _load_user_selected_complexes(pool: asyncpg.Pool, user_id: int) -> list[int]:
     rows = await pool.fetch(
         """
         SELECT complex_id
@@ -42,6 +55,7 @@ async def get_user_selected_complexes(pool: asyncpg.Pool, user_id: int) -> list[
     return [r["complex_id"] for r in rows]
 
 
+@db_timed
 async def add_user_complex(pool: asyncpg.Pool, user_id: int, complex_id: int) -> None:
     """Add complex to PRO user's selection."""
     await pool.execute(
@@ -53,8 +67,10 @@ async def add_user_complex(pool: asyncpg.Pool, user_id: int, complex_id: int) ->
         user_id,
         complex_id,
     )
+    RC_SELECTIONS.add(user_id, complex_id)
 
 
+@db_timed
 async def remove_user_complex(pool: asyncpg.Pool, user_id: int, complex_id: int) -> None:
     """Remove complex from PRO user's selection."""
     await pool.execute(
@@ -65,16 +81,20 @@ async def remove_user_complex(pool: asyncpg.Pool, user_id: int, complex_id: int)
         user_id,
         complex_id,
     )
+    RC_SELECTIONS.remove(user_id, complex_id)
 
 
+@db_timed
 async def clear_user_complexes(pool: asyncpg.Pool, user_id: int) -> None:
     """Clear all complexes for PRO user."""
     await pool.execute(
         "DELETE FROM user_residential_complexes WHERE user_id = $1",
         user_id,
     )
+    RC_SELECTIONS.put(user_id, [])
 
 
+@db_timed
 async def set_standard_complex(
     pool: asyncpg.Pool, user_id: int, complex_name: str | None
 ) -> None:
@@ -84,8 +104,10 @@ async def set_standard_complex(
         complex_name,
         user_id,
     )
+    USER_CACHE.invalidate(user_id)
 
 
+@db_timed
 async def get_standard_complex(pool: asyncpg.Pool, user_id: int) -> str | None:
     """Get single complex for STANDARD user."""
     row = await pool.fetchrow(
@@ -95,6 +117,7 @@ async def get_standard_complex(pool: asyncpg.Pool, user_id: int) -> str | None:
     return row["residential_complex"] if row else None
 
 
+@db_timed
 async def count_user_complexes(pool: asyncpg.Pool, user_id: int) -> int:
     """Count complexes selected by PRO user."""
     row = await pool.fetchrow(
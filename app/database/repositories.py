@@ -1,19 +1,43 @@
 """Репозитории для работы с БД."""
+import asyncio
+import hashlib
+import json
+import time
 from datetime import datetime, date, timedelta
 from typing import Sequence
 
 import asyncpg
 
-from app.config import Config
+from app.config import Config, get_config
+from app.database.access_cache import ACCESS, access_expiry
+from app.database.user_cache import USER_CACHE
+from app.metrics import db_timed
+
+# пользователь без записи в chat_status или с active — живой чат
+LIVE_CHAT_SQL = (
+    "NOT EXISTS (SELECT 1 FROM chat_status cs"
+    " WHERE cs.user_id = users.user_id AND cs.status <> 'active')"
+)
+
 
 # --- Users ---
 
 
+# колонки, которые можно писать через UserRepository.update
+USER_COLUMNS = frozenset({
+    "username", "mode", "rooms", "district", "districts", "from_owner",
+    "notifications_enabled", "accepted_terms", "residential_complex",
+    "subscription_type", "subscription_until", "trial_used", "trial_until",
+})
+_ACCESS_COLUMNS = frozenset({"subscription_type", "subscription_until", "trial_until"})
+
+
 class UserRepository:
     def __init__(self, pool: asyncpg.Pool, config: Config):
         self._pool = pool
         self._config = config
 
+    @db_timed
     async def get_or_create(self, user_id: int, username: str | None = None) -> dict | None:
         row = await self._pool.fetchrow(
             """
@@ -25,18 +49,58 @@ class UserRepository:
             user_id,
             username,
         )
-        return dict(row) if row else None
+        if not row:
+            return None
+        user = dict(row)
+        USER_CACHE.put(user_id, user)
+        return user
 
     async def get(self, user_id: int) -> dict | None:
+        cached = USER_CACHE.get(user_id, self._config.USER_CACHE_TTL)
+        if cached is not None:
+            return cached
+        return await self._load(user_id)
+
+    @db_timed
+    async def _load(self, user_id: int) -> dict | None:
         row = await self._pool.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id)
-        return dict(row) if row else None
+        if not row:
+            return None
+        user = dict(row)
+        USER_CACHE.put(user_id, user)
+        return user
+
+    @db_timed
+    async def update(self, user_id: int, **fields) -> None:
+        """Пишет несколько колонок users одним UPDATE.
+
+        update(uid, district=None, rooms=1) вместо set_district + set_rooms:
+        один round-trip и одна новая версия строки вместо нескольких.
+        """
+        if not fields:
+            return
+        unknown = set(fields) - USER_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown users columns: {sorted(unknown)}")
+        assignments = ", ".join(f"{col} = ${i}" for i, col in enumerate(fields, start=2))
+        await self._pool.execute(
+            f"UPDATE users SET {assignments} WHERE user_id = $1",
+            user_id,
+            *fields.values(),
+        )
+        USER_CACHE.invalidate(user_id)
+        if _ACCESS_COLUMNS & fields.keys():
+            ACCESS.invalidate(user_id)
 
+    @db_timed
     async def accept_terms(self, user_id: int) -> None:
         await self._pool.execute(
             "UPDATE users SET accepted_terms = TRUE WHERE user_id = $1",
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def start_trial(self, user_id: int) -> None:
         until = datetime.utcnow() + timedelta(hours=self._config.TRIAL_HOURS)
         await self._pool.execute(
@@ -47,49 +111,64 @@ class UserRepository:
             until,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
+        ACCESS.invalidate(user_id)
 
+    @db_timed
     async def set_mode(self, user_id: int, mode: str) -> None:
         await self._pool.execute(
             "UPDATE users SET mode = $1 WHERE user_id = $2",
             mode,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def set_rooms(self, user_id: int, rooms: int | None) -> None:
         await self._pool.execute(
             "UPDATE users SET rooms = $1 WHERE user_id = $2",
             rooms,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def set_district(self, user_id: int, district: str | None) -> None:
         await self._pool.execute(
             "UPDATE users SET district = $1 WHERE user_id = $2",
             district,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def set_districts(self, user_id: int, districts: list[str]) -> None:
         await self._pool.execute(
             "UPDATE users SET districts = $1 WHERE user_id = $2",
             districts,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def set_from_owner(self, user_id: int, value: bool) -> None:
         await self._pool.execute(
             "UPDATE users SET from_owner = $1 WHERE user_id = $2",
             value,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def set_notifications(self, user_id: int, enabled: bool) -> None:
         await self._pool.execute(
             "UPDATE users SET notifications_enabled = $1 WHERE user_id = $2",
             enabled,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
 
+    @db_timed
     async def upgrade_subscription(self, user_id: int, plan: str, days: int = 30) -> None:
         until = datetime.utcnow() + timedelta(days=days)
         await self._pool.execute(
@@ -101,49 +180,52 @@ class UserRepository:
             until,
             user_id,
         )
+        USER_CACHE.invalidate(user_id)
+        ACCESS.invalidate(user_id)
 
+    @db_timed
     async def get_active_users_by_tier(self, tier: str) -> list[dict]:
         rows = await self._pool.fetch(
-            """
+            f"""
             SELECT * FROM users
             WHERE subscription_type = $1 AND notifications_enabled = TRUE
             AND (subscription_until IS NULL OR subscription_until > NOW())
             AND (trial_until IS NULL OR trial_until > NOW())
             AND district IS NOT NULL
+            AND {LIVE_CHAT_SQL}
             """,
             tier,
         )
         return [dict(r) for r in rows]
 
+    @db_timed
     async def get_active_free_users(self) -> list[dict]:
         rows = await self._pool.fetch(
-            """
+            f"""
             SELECT * FROM users
             WHERE subscription_type = 'free' AND notifications_enabled = TRUE
             AND (trial_until IS NULL OR trial_until > NOW())
             AND district IS NOT NULL
+            AND {LIVE_CHAT_SQL}
             """
         )
         return [dict(r) for r in rows]
 
+    @db_timed
     async def get_active_paid_users(self) -> list[dict]:
         rows = await self._pool.fetch(
-            """
+            f"""
             SELECT * FROM users
             WHERE subscription_type IN ('standard', 'pro') AND notifications_enabled = TRUE
             AND subscription_until > NOW()
             AND district IS NOT NULL
+            AND {LIVE_CHAT_SQL}
             """
         )
         return [dict(r) for r in rows]
 
     def is_subscription_active(self, user: dict) -> bool:
-        if user.get("subscription_type") in ("standard", "pro"):
-            until = user.get("subscription_until")
-            return until and until > datetime.utcnow()
-        if user.get("trial_until"):
-            return user["trial_until"] > datetime.utcnow()
-        return False
+        return access_expiry(user) > time.time()
 
 
 # --- Sent Listings ---
@@ -153,43 +235,252 @@ class SentListingsRepository:
     def __init__(self, pool: asyncpg.Pool):
         self._pool = pool
 
-    async def was_sent(self, user_id: int, listing_id: str) -> bool:
+    @db_timed
+    async def was_sent(self, user_id: int, listing_id: int) -> bool:
         row = await self._pool.fetchrow(
             "SELECT 1 FROM sent_listings WHERE user_id = $1 AND listing_id = $2",
             user_id,
-            listing_id,
+            listing_key(listing_id),
         )
         return row is not None
 
-    async def mark_sent(self, user_id: int, listing_id: str) -> None:
-        await self._pool.execute(
+    @db_timed
+    async def mark_sent(self, user_id: int, listing_id: int) -> None:
+        """Помечает отправку и в том же запросе увеличивает дневной счётчик.
+
+        Счётчик растёт только если строка в sent_listings действительно
+        вставилась (повторная отметка не считается). Уникальность
+        (user_id, listing_id) держится в пределах месячной партиции
+        (migrations/006), поэтому в новом месяце та же пара вставится
+        снова: дедуп между месяцами — это проверка was_sent перед отправкой.
+        """
+        today = date.today()
+        sent = await self._pool.fetchval(
             """
-            INSERT INTO sent_listings (user_id, listing_id)
-            VALUES ($1, $2)
-            ON CONFLICT (user_id, listing_id) DO NOTHING
+            WITH ins AS (
+                INSERT INTO sent_listings (user_id, listing_id)
+                VALUES ($1, $2)
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            )
+            INSERT INTO user_daily_counts (user_id, day, sent)
+            SELECT $1, $3, 1 FROM ins
+            ON CONFLICT (user_id, day) DO UPDATE SET sent = user_daily_counts.sent + 1
+            RETURNING sent
             """,
             user_id,
-            listing_id,
+            listing_key(listing_id),
+            today,
         )
+        if sent is not None:
+            _daily_counts_for(today)[user_id] = sent
 
     async def count_sent_today(self, user_id: int) -> int:
-        row = await self._pool.fetchrow(
+        """Сколько объявлений пользователь получил за сегодня (календарный день).
+
+        Обычно ответ из памяти; в БД — один lookup по первичному ключу
+        user_daily_counts на пользователя в сутки.
+        """
+        today = date.today()
+        counts = _daily_counts_for(today)
+        cached = counts.get(user_id)
+        if cached is not None:
+            return cached
+        sent = await self._load_daily_count(user_id, today)
+        counts[user_id] = sent
+        return sent
+
+    @db_timed
+    async def _load_daily_count(self, user_id: int, day: date) -> int:
+        sent = await self._pool.fetchval(
+            "SELECT sent FROM user_daily_counts WHERE user_id = $1 AND day = $2",
+            user_id,
+            day,
+        )
+        return sent or 0
+
+    @db_timed
+    async def ensure_partitions(self, months_ahead: int = 1) -> list[str]:
+        """Создаёт месячные партиции sent_listings на текущий и следующие месяцы."""
+        first = date.today().replace(day=1)
+        names = []
+        for i in range(months_ahead + 1):
+            month = (first.month - 1 + i) % 12 + 1
+            year = first.year + (first.month - 1 + i) // 12
+            names.append(
+                await self._pool.fetchval(
+                    "SELECT sent_listings_ensure_partition($1)",
+                    date(year, month, 1),
+                )
+            )
+        return names
+
+    @db_timed
+    async def drop_partitions_before(self, cutoff: date) -> list[str]:
+        """Удаляет партиции, целиком лежащие раньше cutoff (первое число месяца)."""
+        rows = await self._pool.fetch(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'sent_listings'
+              AND c.relname ~ '^sent_listings_[0-9]{4}_[0-9]{2}$'
             """
-            SELECT COUNT(*) FROM sent_listings
-            WHERE user_id = $1 AND sent_at > NOW() - INTERVAL '24 hours'
+        )
+        dropped = []
+        for row in rows:
+            name = row["relname"]
+            year, month = int(name[-7:-3]), int(name[-2:])
+            if date(year, month, 1) < cutoff.replace(day=1):
+                await self._pool.execute(f'DROP TABLE IF EXISTS "{name}"')
+                dropped.append(name)
+        return sorted(dropped)
+
+    @db_timed
+    async def prune_daily_counts(self, before: date) -> int:
+        result = await self._pool.execute(
+            "DELETE FROM user_daily_counts WHERE day < $1",
+            before,
+        )
+        return int(result.split()[-1]) if result else 0
+
+
+class ListingKeyRepository:
+    """Отображение нечисловых ключей объявлений в BIGINT (таблица listing_keys).
+
+    Парсер отдаёт числовой id krisha почти всегда; сюда попадают только
+    редкие карточки без /a/show/<id> в ссылке. Выданные id отрицательные
+    и не пересекаются с настоящими.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    async def resolve(self, keys: Sequence[str]) -> dict[str, int]:
+        result = {k: _listing_keys[k] for k in keys if k in _listing_keys}
+        missing = sorted({k for k in keys if k not in result})
+        if missing:
+            loaded = await self._load(missing)
+            if len(_listing_keys) > 50_000:
+                _listing_keys.clear()
+            _listing_keys.update(loaded)
+            result.update(loaded)
+        return result
+
+    @db_timed
+    async def _load(self, keys: list[str]) -> dict[str, int]:
+        # вставленные строки не видны соседнему SELECT в том же запросе,
+        # поэтому объединяем RETURNING с уже существующими
+        rows = await self._pool.fetch(
+            """
+            WITH ins AS (
+                INSERT INTO listing_keys (key)
+                SELECT unnest($1::text[])
+                ON CONFLICT (key) DO NOTHING
+                RETURNING key, id
+            )
+            SELECT key, id FROM ins
+            UNION ALL
+            SELECT key, id FROM listing_keys WHERE key = ANY($1::text[])
             """,
-            user_id,
+            keys,
+        )
+        return {r["key"]: r["id"] for r in rows}
+
+
+# ключ -> id; listing_keys только дополняется, инвалидировать нечего
+_listing_keys: dict[str, int] = {}
+
+
+def listing_key(listing_id: str | int) -> int:
+    """Id объявления для BIGINT-колонок.
+
+    Парсер уже отдаёт int (см. ListingKeyRepository). Строки допускаются
+    для старых вызовов: цифры — как есть, прочее — отрицательный 63-битный
+    префикс md5, как при переносе данных в migrations/006.
+    """
+    if isinstance(listing_id, int):
+        return listing_id
+    if listing_id.isascii() and listing_id.isdigit() and len(listing_id) <= 18:
+        return int(listing_id)
+    digest = hashlib.md5(listing_id.encode("utf-8")).hexdigest()
+    return -(int(digest[:16], 16) & 0x7FFF_FFFF_FFFF_FFFF)
+
+
+# user_id -> отправлено за _daily_day; пишет только mark_sent этого процесса
+_daily_day: date | None = None
+_daily_counts: dict[int, int] = {}
+
+
+def _daily_counts_for(day: date) -> dict[int, int]:
+    global _daily_day, _daily_counts
+    if day != _daily_day:
+        _daily_day = day
+        _daily_counts = {}
+    return _daily_counts
+
+
+# --- Listing prices ---
+
+
+class ListingPriceRepository:
+    """История цен из выдачи для медиан (app/services/price_stats.py)."""
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    @db_timed
+    async def add_many(self, rows: Sequence[tuple]) -> None:
+        """rows: (listing_id, mode, district, rooms, price, area, seen_at_epoch)."""
+        ids, modes, districts, rooms, prices, areas, stamps = zip(*rows)
+        await self._pool.execute(
+            """
+            INSERT INTO listing_prices (listing_id, mode, district, rooms, price, area, seen_at)
+            SELECT id, m, d, r, p, a, to_timestamp(t)
+            FROM unnest($1::bigint[], $2::text[], $3::text[], $4::smallint[],
+                        $5::bigint[], $6::real[], $7::float8[]) AS x(id, m, d, r, p, a, t)
+            ON CONFLICT (listing_id) DO NOTHING
+            """,
+            ids, modes, districts, rooms, prices, areas, stamps,
+        )
+
+    @db_timed
+    async def load_since(self, since: float) -> list[tuple]:
+        rows = await self._pool.fetch(
+            """
+            SELECT listing_id, mode, district, rooms, price, area,
+                   EXTRACT(EPOCH FROM seen_at)::float8 AS seen_at
+            FROM listing_prices
+            WHERE seen_at >= to_timestamp($1)
+            """,
+            since,
+        )
+        return [tuple(r) for r in rows]
+
+    @db_timed
+    async def prune_before(self, cutoff: datetime) -> int:
+        result = await self._pool.execute(
+            "DELETE FROM listing_prices WHERE seen_at < $1",
+            cutoff,
         )
-        return row[0] or 0
+        return int(result.split()[-1]) if result else 0
 
 
 # --- Stats ---
 
 
+# общий для всех StatsRepository снимок get_summary()
+_summary: dict | None = None
+_summary_at = 0.0
+_summary_lock = asyncio.Lock()
+
+
 class StatsRepository:
     def __init__(self, pool: asyncpg.Pool):
         self._pool = pool
 
+    @db_timed
     async def increment_new_users(self) -> None:
         today = date.today()
         await self._pool.execute(
@@ -202,6 +493,7 @@ class StatsRepository:
             today,
         )
 
+    @db_timed
     async def increment_messages_sent(self, count: int = 1) -> None:
         today = date.today()
         await self._pool.execute(
@@ -215,6 +507,73 @@ class StatsRepository:
             count,
         )
 
+    @db_timed
+    async def add_counters(self, day: date, counters: dict) -> None:
+        """Один upsert накопленных счётчиков дня (см. app/services/stats_buffer.py).
+
+        active_users — число уникальных за день, а не приращение, поэтому
+        берётся максимум.
+        """
+        await self._pool.execute(
+            """
+            INSERT INTO stats (
+                date, messages_sent, new_users, active_users,
+                delivered_free, delivered_standard, delivered_pro
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            ON CONFLICT (date) DO UPDATE SET
+                messages_sent = stats.messages_sent + EXCLUDED.messages_sent,
+                new_users = stats.new_users + EXCLUDED.new_users,
+                active_users = GREATEST(stats.active_users, EXCLUDED.active_users),
+                delivered_free = stats.delivered_free + EXCLUDED.delivered_free,
+                delivered_standard = stats.delivered_standard + EXCLUDED.delivered_standard,
+                delivered_pro = stats.delivered_pro + EXCLUDED.delivered_pro
+            """,
+            day,
+            counters["messages_sent"],
+            counters["new_users"],
+            counters["active_users"],
+            counters["delivered_free"],
+            counters["delivered_standard"],
+            counters["delivered_pro"],
+        )
+
+    @db_timed
+    async def merge_sla(self, day: date, pending: dict[str, dict]) -> None:
+        """Прибавляет корзины SLA к агрегату дня (read-modify-write под FOR UPDATE)."""
+        from app.services.sla import TierHistogram
+
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO stats (date) VALUES ($1) ON CONFLICT (date) DO NOTHING",
+                    day,
+                )
+                raw = await conn.fetchval(
+                    "SELECT sla FROM stats WHERE date = $1 FOR UPDATE",
+                    day,
+                )
+                current = json.loads(raw) if raw else {}
+                for tier, data in pending.items():
+                    h = TierHistogram()
+                    h.merge(current.get(tier, {}))
+                    h.merge(data)
+                    current[tier] = h.to_dict()
+                await conn.execute(
+                    "UPDATE stats SET sla = $2::jsonb WHERE date = $1",
+                    day,
+                    json.dumps(current),
+                )
+
+    @db_timed
+    async def get_sla(self, day: date | None = None) -> dict[str, dict]:
+        raw = await self._pool.fetchval(
+            "SELECT sla FROM stats WHERE date = $1",
+            day or date.today(),
+        )
+        return json.loads(raw) if raw else {}
+
+    @db_timed
     async def get_today_stats(self) -> dict:
         row = await self._pool.fetchrow(
             "SELECT * FROM stats WHERE date = $1",
@@ -222,6 +581,7 @@ class StatsRepository:
         )
         return dict(row) if row else {}
 
+    @db_timed
     async def get_user_stats(self, user_id: int) -> dict:
         total_sent = await self._pool.fetchval(
             "SELECT COUNT(*) FROM sent_listings WHERE user_id = $1",
@@ -229,61 +589,214 @@ class StatsRepository:
         )
         return {"total_sent": total_sent or 0}
 
-    async def get_global_stats(self) -> dict:
-        users_total = await self._pool.fetchval("SELECT COUNT(*) FROM users")
-        active_subs = await self._pool.fetchval(
+    async def get_summary(self) -> dict:
+        """Сводка по users и stats для админки и «📊 Статистика».
+
+        Один агрегирующий запрос вместо пачки COUNT(*); результат живёт
+        STATS_SNAPSHOT_TTL секунд и общий для всех экранов, так что клики
+        по админке не сканируют users каждый раз.
+        """
+        global _summary, _summary_at
+        ttl = get_config().STATS_SNAPSHOT_TTL
+        if _summary is not None and time.monotonic() - _summary_at < ttl:
+            return _summary
+        async with _summary_lock:
+            # пока ждали блокировку, сводку мог обновить соседний запрос
+            if _summary is not None and time.monotonic() - _summary_at < ttl:
+                return _summary
+            _summary = await self._load_summary()
+            _summary_at = time.monotonic()
+        return _summary
+
+    @db_timed
+    async def _load_summary(self) -> dict:
+        row = await self._pool.fetchrow(
             """
-            SELECT COUNT(*) FROM users
-            WHERE subscription_type IN ('standard', 'pro') AND subscription_until > NOW()
+            SELECT
+                COUNT(*) AS users_total,
+                COUNT(*) FILTER (WHERE subscription_type = 'free') AS free,
+                COUNT(*) FILTER (WHERE subscription_type = 'standard') AS standard,
+                COUNT(*) FILTER (WHERE subscription_type = 'pro') AS pro,
+                COUNT(*) FILTER (
+                    WHERE subscription_type IN ('standard', 'pro') AND subscription_until > NOW()
+                ) AS active_subs,
+                COUNT(*) FILTER (
+                    WHERE subscription_type IN ('standard', 'pro')
+                    AND subscription_until > NOW()
+                    AND subscription_until < NOW() + INTERVAL '3 days'
+                ) AS expiring_3d,
+                COUNT(*) FILTER (
+                    WHERE subscription_type IN ('standard', 'pro')
+                    AND subscription_until::date = CURRENT_DATE
+                ) AS expired_today,
+                COUNT(*) FILTER (WHERE created_at > NOW() - INTERVAL '24 hours') AS new_24h,
+                COUNT(*) FILTER (WHERE created_at > NOW() - INTERVAL '7 days') AS new_7d,
+                COUNT(*) FILTER (WHERE created_at > NOW() - INTERVAL '30 days') AS new_30d,
+                COUNT(*) FILTER (WHERE notifications_enabled = TRUE) AS notifications_on,
+                (SELECT COALESCE(SUM(messages_sent), 0) FROM stats) AS messages_sent,
+                (SELECT COALESCE(new_users, 0) FROM stats WHERE date = CURRENT_DATE) AS new_today
+            FROM users
             """
         )
-        new_today = await self._pool.fetchval(
-            "SELECT COALESCE(new_users, 0) FROM stats WHERE date = CURRENT_DATE"
-        ) or 0
-        msg_sent = await self._pool.fetchval(
-            "SELECT COALESCE(SUM(messages_sent), 0) FROM stats"
-        ) or 0
+        return {k: (v or 0) for k, v in dict(row).items()}
+
+    async def get_global_stats(self) -> dict:
+        summary = await self.get_summary()
+        return {
+            "users_total": summary["users_total"],
+            "active_subs": summary["active_subs"],
+            "new_today": summary["new_today"],
+            "messages_sent": summary["messages_sent"],
+        }
+
+    async def get_admin_stats(self) -> dict:
+        summary = await self.get_summary()
+        cfg = get_config()
+        revenue = summary["standard"] * cfg.PRICE_STANDARD + summary["pro"] * cfg.PRICE_PRO
         return {
-            "users_total": users_total or 0,
-            "active_subs": active_subs or 0,
-            "new_today": new_today,
-            "messages_sent": msg_sent,
+            "users_total": summary["users_total"],
+            "free": summary["free"],
+            "standard": summary["standard"],
+            "pro": summary["pro"],
+            "active_subs": summary["active_subs"],
+            "active_today": summary["new_24h"],
+            "messages_sent": summary["messages_sent"],
+            "revenue": revenue,
         }
 
-    async def get_admin_stats(self, pool: asyncpg.Pool) -> dict:
-        users_total = await pool.fetchval("SELECT COUNT(*) FROM users")
-        free = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'free'"
+
+# --- Broadcasts ---
+
+
+class BroadcastRepository:
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    @db_timed
+    async def create(
+        self,
+        admin_id: int,
+        target: str,
+        from_chat_id: int,
+        message_id: int,
+        progress_chat_id: int,
+        progress_message_id: int,
+    ) -> int:
+        return await self._pool.fetchval(
+            """
+            INSERT INTO broadcast_jobs
+                (admin_id, target, from_chat_id, message_id, progress_chat_id, progress_message_id)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            RETURNING id
+            """,
+            admin_id, target, from_chat_id, message_id, progress_chat_id, progress_message_id,
         )
-        standard = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'standard'"
+
+    @db_timed
+    async def get(self, job_id: int) -> dict | None:
+        row = await self._pool.fetchrow("SELECT * FROM broadcast_jobs WHERE id = $1", job_id)
+        return dict(row) if row else None
+
+    @db_timed
+    async def open_jobs(self) -> list[dict]:
+        """Незавершённые задачи — для продолжения после рестарта."""
+        rows = await self._pool.fetch(
+            "SELECT * FROM broadcast_jobs WHERE status IN ('pending', 'running') ORDER BY id"
         )
-        pro = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'pro'"
+        return [dict(r) for r in rows]
+
+    @db_timed
+    async def start(self, job_id: int, total: int) -> None:
+        await self._pool.execute(
+            """
+            UPDATE broadcast_jobs
+            SET status = 'running', total = $2, started_at = COALESCE(started_at, NOW())
+            WHERE id = $1 AND status IN ('pending', 'running')
+            """,
+            job_id, total,
         )
-        active_subs = await pool.fetchval(
+
+    @db_timed
+    async def checkpoint(self, job_id: int, cursor_user_id: int, sent: int, failed: int) -> str | None:
+        """Сохраняет прогресс и возвращает текущий статус (его мог сменить /cancel)."""
+        return await self._pool.fetchval(
             """
-            SELECT COUNT(*) FROM users
-            WHERE subscription_type IN ('standard', 'pro') AND subscription_until > NOW()
+            UPDATE broadcast_jobs
+            SET cursor_user_id = GREATEST(cursor_user_id, $2), sent = $3, failed = $4
+            WHERE id = $1
+            RETURNING status
+            """,
+            job_id, cursor_user_id, sent, failed,
+        )
+
+    @db_timed
+    async def finish(self, job_id: int, status: str) -> None:
+        await self._pool.execute(
             """
+            UPDATE broadcast_jobs SET status = $2, finished_at = NOW()
+            WHERE id = $1 AND status IN ('pending', 'running')
+            """,
+            job_id, status,
         )
-        active_today = await pool.fetchval(
+
+
+# --- Chat status ---
+
+
+class ChatStatusRepository:
+    """Заблокировавшие бота и удалённые аккаунты (app/services/chat_status.py)."""
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    @db_timed
+    async def mark_dead(self, rows: Sequence[tuple]) -> None:
+        """rows: (user_id, status, error, at_epoch)."""
+        ids, statuses, errors, stamps = zip(*rows)
+        await self._pool.execute(
             """
-            SELECT COUNT(*) FROM users WHERE created_at > NOW() - INTERVAL '24 hours'
+            INSERT INTO chat_status (user_id, status, last_error, last_error_at, updated_at)
+            SELECT u, s, e, to_timestamp(t), NOW()
+            FROM unnest($1::bigint[], $2::text[], $3::text[], $4::float8[]) AS x(u, s, e, t)
+            ON CONFLICT (user_id) DO UPDATE
+            SET status = EXCLUDED.status,
+                last_error = EXCLUDED.last_error,
+                last_error_at = EXCLUDED.last_error_at,
+                updated_at = NOW()
+            """,
+            ids, statuses, errors, stamps,
+        )
+
+    @db_timed
+    async def revive(self, user_ids: Sequence[int]) -> None:
+        await self._pool.execute(
             """
+            UPDATE chat_status SET status = 'active', updated_at = NOW()
+            WHERE user_id = ANY($1::bigint[]) AND status <> 'active'
+            """,
+            list(user_ids),
         )
-        msg_sent = await pool.fetchval(
-            "SELECT COALESCE(SUM(messages_sent), 0) FROM stats"
+
+    @db_timed
+    async def dead_ids(self) -> list[int]:
+        rows = await self._pool.fetch("SELECT user_id FROM chat_status WHERE status <> 'active'")
+        return [r["user_id"] for r in rows]
+
+    @db_timed
+    async def claim_probes(self, older_than: timedelta, limit: int) -> list[int]:
+        """Мёртвые чаты, давно не проверявшиеся; сразу помечает их probed_at."""
+        rows = await self._pool.fetch(
+            """
+            UPDATE chat_status SET probed_at = NOW()
+            WHERE user_id IN (
+                SELECT user_id FROM chat_status
+                WHERE status <> 'active'
+                AND COALESCE(probed_at, last_error_at) < NOW() - $1::interval
+                ORDER BY probed_at NULLS FIRST
+                LIMIT $2
+            )
+            RETURNING user_id
+            """,
+            older_than, limit,
         )
-        cfg = Config.from_env()
-        revenue = (standard or 0) * cfg.PRICE_STANDARD + (pro or 0) * cfg.PRICE_PRO
-        return {
-            "users_total": users_total or 0,
-            "free": free or 0,
-            "standard": standard or 0,
-            "pro": pro or 0,
-            "active_subs": active_subs or 0,
-            "active_today": active_today or 0,
-            "messages_sent": msg_sent or 0,
-            "revenue": revenue,
-        }
+        return [r["user_id"] for r in rows]
@@ -0,0 +1,44 @@
+"""Короткоживущий кэш строк users в памяти процесса.
+
+Читает UserRepository.get/get_or_create, сбрасывают все записи в users
+(сеттеры репозитория, подтверждение оплаты, rc_repository). Бот работает
+одним процессом, поэтому инвалидации на месте достаточно; TTL страхует
+от записей в обход репозитория (ручные UPDATE, старый бот).
+"""
+import time
+
+from app.metrics import USER_CACHE_LOOKUPS
+
+
+class UserCache:
+    def __init__(self, max_size: int = 10_000):
+        self._max_size = max_size
+        self._items: dict[int, tuple[float, dict]] = {}
+
+    def get(self, user_id: int, ttl: float) -> dict | None:
+        item = self._items.get(user_id)
+        if item is None or ttl <= 0 or time.monotonic() - item[0] > ttl:
+            USER_CACHE_LOOKUPS.inc("miss")
+            return None
+        USER_CACHE_LOOKUPS.inc("hit")
+        # копия: обработчики иногда правят dict пользователя на месте
+        return dict(item[1])
+
+    def put(self, user_id: int, row: dict) -> None:
+        self._items.pop(user_id, None)
+        if len(self._items) >= self._max_size:
+            # dict хранит порядок вставки — выбрасываем самую старую запись
+            self._items.pop(next(iter(self._items)))
+        self._items[user_id] = (time.monotonic(), dict(row))
+
+    def invalidate(self, user_id: int) -> None:
+        self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+USER_CACHE = UserCache()
@@ -1,5 +1,6 @@
 """Advanced admin panel with full management capabilities."""
 import asyncio
+import html
 import logging
 import psutil
 from functools import wraps
@@ -11,15 +12,21 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from app.database.repositories import StatsRepository, UserRepository
+from app.database.repositories import BroadcastRepository, StatsRepository, UserRepository
 from app.database.connection import get_pool
-from app.config import Config
+from app.config import Config, get_config, reload_config
+from app.redis_client import get_redis
+from app.services.broadcast import BROADCASTS
+from app.services.loop_monitor import get_loop_monitor
+from app.services.sla import SLA, TierHistogram
+from app.utils.admin_utils import add_rc
 from app.keyboards.admin_keyboards import (
     admin_main_kb,
     admin_broadcast_kb,
     admin_rc_kb,
     admin_back_kb,
     admin_rc_item_kb,
+    broadcast_job_kb,
 )
 
 logger = logging.getLogger(__name__)
@@ -40,7 +47,8 @@ def admin_only(func):
     """Decorator to restrict access to admins only."""
     @wraps(func)
     async def wrapper(event, *args, **kwargs):
-        config = Config.from_env()
+        # config приходит из DatabaseMiddleware, если обработчик его объявил
+        config = kwargs.get("config") or get_config()
         user_id = event.from_user.id if hasattr(event, 'from_user') else None
         
         if not user_id or user_id not in config.ADMIN_IDS:
@@ -79,30 +87,18 @@ async def admin_back(callback: CallbackQuery):
 
 @router.callback_query(F.data == "admin:stats")
 @admin_only
-async def admin_stats(callback: CallbackQuery):
+async def admin_stats(callback: CallbackQuery, config: Config):
     """Show detailed statistics."""
     try:
-        config = Config.from_env()
         pool = await get_pool(config.DATABASE_URL)
         
-        # Basic stats
-        users_total = await pool.fetchval("SELECT COUNT(*) FROM users") or 0
-        free = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'free'"
-        ) or 0
-        standard = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'standard'"
-        ) or 0
-        pro = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE subscription_type = 'pro'"
-        ) or 0
-        active_subs = await pool.fetchval(
-            """
-            SELECT COUNT(*) FROM users
-            WHERE subscription_type IN ('standard', 'pro') 
-            AND subscription_until > NOW()
-            """
-        ) or 0
+        # Basic stats: one cached aggregate shared by all admin screens
+        summary = await StatsRepository(pool).get_summary()
+        users_total = summary["users_total"]
+        free = summary["free"]
+        standard = summary["standard"]
+        pro = summary["pro"]
+        active_subs = summary["active_subs"]
         
         # RC stats
         total_rc_selections = await pool.fetchval(
@@ -121,10 +117,7 @@ async def admin_stats(callback: CallbackQuery):
             """
         )
         
-        # Messages sent
-        msg_sent = await pool.fetchval(
-            "SELECT COALESCE(SUM(messages_sent), 0) FROM stats"
-        ) or 0
+        msg_sent = summary["messages_sent"]
         
         # Revenue calculation
         revenue = standard * config.PRICE_STANDARD + pro * config.PRICE_PRO
@@ -161,25 +154,16 @@ async def admin_stats(callback: CallbackQuery):
 
 @router.callback_query(F.data == "admin:users")
 @admin_only
-async def admin_users(callback: CallbackQuery):
+async def admin_users(callback: CallbackQuery, config: Config):
     """Show users summary."""
     try:
-        config = Config.from_env()
         pool = await get_pool(config.DATABASE_URL)
         
-        users_today = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE created_at > NOW() - INTERVAL '24 hours'"
-        ) or 0
-        users_week = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE created_at > NOW() - INTERVAL '7 days'"
-        ) or 0
-        users_month = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE created_at > NOW() - INTERVAL '30 days'"
-        ) or 0
-        
-        notifications_on = await pool.fetchval(
-            "SELECT COUNT(*) FROM users WHERE notifications_enabled = TRUE"
-        ) or 0
+        summary = await StatsRepository(pool).get_summary()
+        users_today = summary["new_24h"]
+        users_week = summary["new_7d"]
+        users_month = summary["new_30d"]
+        notifications_on = summary["notifications_on"]
         
         text = (
             f"👥 Пользователи\n\n"
@@ -199,28 +183,14 @@ async def admin_users(callback: CallbackQuery):
 
 @router.callback_query(F.data == "admin:subscriptions")
 @admin_only
-async def admin_subscriptions(callback: CallbackQuery):
+async def admin_subscriptions(callback: CallbackQuery, config: Config):
     """Show subscription details."""
     try:
-        config = Config.from_env()
         pool = await get_pool(config.DATABASE_URL)
         
-        expiring_soon = await pool.fetchval(
-            """
-            SELECT COUNT(*) FROM users
-            WHERE subscription_type IN ('standard', 'pro')
-            AND subscription_until > NOW()
-            AND subscription_until < NOW() + INTERVAL '3 days'
-            """
-        ) or 0
-        
-        expired_today = await pool.fetchval(
-            """
-            SELECT COUNT(*) FROM users
-            WHERE subscription_type IN ('standard', 'pro')
-            AND subscription_until::date = CURRENT_DATE
-            """
-        ) or 0
+        summary = await StatsRepository(pool).get_summary()
+        expiring_soon = summary["expiring_3d"]
+        expired_today = summary["expired_today"]
         
         text = (
             f"💎 Подписки\n\n"
@@ -283,79 +253,39 @@ async def broadcast_cancel(message: Message, state: FSMContext):
 
 @router.message(BroadcastStates.waiting_message)
 @admin_only
-async def admin_broadcast_send(message: Message, state: FSMContext):
-    """Execute broadcast."""
+async def admin_broadcast_send(message: Message, state: FSMContext, config: Config):
+    """Queue broadcast as a background job; progress is edited into status message."""
     data = await state.get_data()
     target = data.get("broadcast_target", "all")
-    
-    config = Config.from_env()
-    pool = await get_pool(config.DATABASE_URL)
-    
-    # Get target users
-    if target == "all":
-        users = await pool.fetch("SELECT user_id FROM users")
-    elif target == "pro":
-        users = await pool.fetch(
-            "SELECT user_id FROM users WHERE subscription_type = 'pro'"
-        )
-    elif target == "standard":
-        users = await pool.fetch(
-            "SELECT user_id FROM users WHERE subscription_type = 'standard'"
-        )
-    elif target == "free":
-        users = await pool.fetch(
-            "SELECT user_id FROM users WHERE subscription_type = 'free'"
-        )
-    else:
-        users = []
-    
-    total = len(users)
-    
-    status_msg = await message.answer(
-        f"📢 Начинаю рассылку...\n"
-        f"Всего пользователей: {total}"
-    )
-    
-    success = 0
-    failed = 0
-    
-    # Batch sending with rate limit (30 msg/sec)
-    for i, user in enumerate(users):
-        try:
-            await message.bot.copy_message(
-                chat_id=user["user_id"],
-                from_chat_id=message.chat.id,
-                message_id=message.message_id,
-            )
-            success += 1
-        except Exception as e:
-            logger.warning(f"Broadcast failed for {user['user_id']}: {e}")
-            failed += 1
-        
-        # Update status every 50 messages
-        if (i + 1) % 50 == 0:
-            try:
-                await status_msg.edit_text(
-                    f"📢 Рассылка в процессе...\n"
-                    f"Отправлено: {i + 1}/{total}\n"
-                    f"✅ Успешно: {success}\n"
-                    f"❌ Ошибок: {failed}"
-                )
-            except:
-                pass
-        
-        # Rate limiting: 30 msg/sec
-        await asyncio.sleep(1 / 30)
-    
     await state.clear()
-    
-    await status_msg.edit_text(
-        f"✅ Рассылка завершена!\n\n"
-        f"📊 Статистика:\n"
-        f"Всего: {total}\n"
-        f"✅ Успешно: {success}\n"
-        f"❌ Ошибок: {failed}"
+
+    pool = await get_pool(config.DATABASE_URL)
+    repo = BroadcastRepository(pool)
+    status_msg = await message.answer("📢 Рассылка поставлена в очередь...")
+    job_id = await repo.create(
+        admin_id=message.from_user.id,
+        target=target,
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+        progress_chat_id=status_msg.chat.id,
+        progress_message_id=status_msg.message_id,
     )
+    if BROADCASTS.submit(await repo.get(job_id)):
+        text = f"📢 Рассылка #{job_id} запущена"
+    else:
+        text = f"📢 Рассылка #{job_id} начнётся после запуска монитора"
+    await status_msg.edit_text(text, reply_markup=broadcast_job_kb(job_id))
+
+
+@router.callback_query(F.data.startswith("admin_bcjob:cancel:"))
+@admin_only
+async def admin_broadcast_job_cancel(callback: CallbackQuery, config: Config):
+    """Stop a running broadcast job."""
+    job_id = int(callback.data.split(":")[-1])
+    pool = await get_pool(config.DATABASE_URL)
+    await BroadcastRepository(pool).finish(job_id, "cancelled")
+    BROADCASTS.cancel(job_id)
+    await callback.answer("⛔ Рассылка останавливается")
 
 
 @router.callback_query(F.data == "admin:rc")
@@ -372,10 +302,9 @@ async def admin_rc_menu(callback: CallbackQuery):
 
 @router.callback_query(F.data == "admin_rc:list")
 @admin_only
-async def admin_rc_list(callback: CallbackQuery):
+async def admin_rc_list(callback: CallbackQuery, config: Config):
     """Show list of all residential complexes."""
     try:
-        config = Config.from_env()
         pool = await get_pool(config.DATABASE_URL)
         
         complexes = await pool.fetch(
@@ -466,7 +395,7 @@ async def admin_rc_add_category(message: Message, state: FSMContext):
 
 @router.message(RCStates.waiting_priority)
 @admin_only
-async def admin_rc_add_priority(message: Message, state: FSMContext):
+async def admin_rc_add_priority(message: Message, state: FSMContext, config: Config):
     """Receive RC priority and save."""
     try:
         priority = int(message.text.strip())
@@ -480,19 +409,10 @@ async def admin_rc_add_priority(message: Message, state: FSMContext):
     name = data["rc_name"]
     category = data["rc_category"]
     
-    config = Config.from_env()
     pool = await get_pool(config.DATABASE_URL)
     
     try:
-        await pool.execute(
-            """
-            INSERT INTO residential_complexes (name, category, priority, is_active)
-            VALUES ($1, $2, $3, TRUE)
-            """,
-            name,
-            category,
-            priority,
-        )
+        await add_rc(pool, name, category, priority)
         
         await message.answer(
             f"✅ ЖК добавлен!\n\n"
@@ -508,12 +428,56 @@ async def admin_rc_add_priority(message: Message, state: FSMContext):
     await state.clear()
 
 
+@router.callback_query(F.data == "admin:sla")
+@admin_only
+async def admin_sla(callback: CallbackQuery, config: Config):
+    """Show per-tier delivery latency (first seen -> sent) for today."""
+    try:
+        pool = await get_pool(config.DATABASE_URL)
+        stats_repo = StatsRepository(pool)
+        
+        stored = await stats_repo.get_sla()
+        intervals = {
+            "pro": config.PRO_CHECK_INTERVAL,
+            "standard": config.STANDARD_CHECK_INTERVAL,
+            "free": config.FREE_CHECK_INTERVAL,
+        }
+        
+        lines = []
+        for tier in ("pro", "standard", "free"):
+            h = TierHistogram()
+            h.merge(stored.get(tier, {}))
+            # ещё не сброшенные в БД доставки
+            h.merge(SLA.pending_snapshot().get(tier, {}))
+            if not h.count:
+                lines.append(f"{tier.upper()}: нет доставок")
+                continue
+            sm = h.summary()
+            lines.append(
+                f"{tier.upper()} (интервал {intervals[tier]} с): {sm['count']} доставок\n"
+                f"   p50 {sm['p50']:.0f} с · p95 {sm['p95']:.0f} с · p99 {sm['p99']:.0f} с\n"
+                f"   в очереди в среднем {sm['avg_queue']:.1f} с"
+            )
+        
+        text = (
+            "⏱ SLA доставки за сегодня\n"
+            "(от первого появления объявления до отправки)\n\n"
+            + "\n\n".join(lines)
+        )
+        
+        await callback.message.edit_text(text, reply_markup=admin_back_kb())
+        await callback.answer()
+        
+    except Exception as e:
+        logger.exception("Admin SLA error: %s", e)
+        await callback.answer("❌ Ошибка", show_alert=True)
+
+
 @router.callback_query(F.data == "admin:system")
 @admin_only
-async def admin_system_status(callback: CallbackQuery):
+async def admin_system_status(callback: CallbackQuery, config: Config):
     """Show system status."""
     try:
-        config = Config.from_env()
         pool = await get_pool(config.DATABASE_URL)
         
         # DB check
@@ -524,13 +488,13 @@ async def admin_system_status(callback: CallbackQuery):
             db_status = "🔴 ERROR"
         
         # Redis check
-        try:
-            from config import get_redis
-            redis = await get_redis()
-            await redis.ping()
-            redis_status = "🟢 OK"
-        except:
-            redis_status = "🔴 ERROR"
+        redis_health = await (await get_redis(config)).health()
+        if redis_health["ok"]:
+            redis_status = f"🟢 OK ({redis_health['latency_ms']:.1f} ms)"
+        elif not redis_health["configured"]:
+            redis_status = "⚪ не настроен (кэш в памяти)"
+        else:
+            redis_status = "🔴 ERROR (кэш в памяти)"
         
         # Async tasks
         tasks = len([t for t in asyncio.all_tasks() if not t.done()])
@@ -542,6 +506,22 @@ async def admin_system_status(callback: CallbackQuery):
         # CPU
         cpu_percent = process.cpu_percent(interval=0.1)
         
+        # Event loop lag
+        loop_monitor = get_loop_monitor()
+        if loop_monitor:
+            lag = loop_monitor.snapshot()
+            loop_text = (
+                f"🌀 Loop lag: {lag['lag_last_ms']:.0f} ms "
+                f"(p99 {lag['lag_p99_ms']:.0f}, max {lag['lag_max_ms']:.0f})\n"
+                f"🧱 Блокировок: {lag['stalls']}\n"
+            )
+            if lag["top_sites"]:
+                loop_text += "\n".join(
+                    f"   {count}× <code>{html.escape(site)}</code>" for site, count in lag["top_sites"][:3]
+                ) + "\n"
+        else:
+            loop_text = "🌀 Loop lag: выключен\n"
+        
         text = (
             f"⚙ Статус системы\n\n"
             f"🗄 Database: {db_status}\n"
@@ -549,6 +529,7 @@ async def admin_system_status(callback: CallbackQuery):
             f"⚡ Async tasks: {tasks}\n"
             f"💾 Memory: {memory_mb:.1f} MB\n"
             f"🔧 CPU: {cpu_percent:.1f}%\n"
+            f"{loop_text}"
             f"⏰ Uptime: running\n\n"
             f"📦 Python: {psutil.PROCFS_PATH or 'N/A'}"
         )
@@ -559,3 +540,41 @@ async def admin_system_status(callback: CallbackQuery):
     except Exception as e:
         logger.exception("System status error: %s", e)
         await callback.answer("❌ Ошибка", show_alert=True)
+
+
+def _config_reload_text() -> str:
+    config, changes = reload_config()
+    logger.info("Config reloaded by admin, fingerprint %s, changed: %s", config.fingerprint(), list(changes))
+    if not changes:
+        return f"🔄 Конфиг перечитан, изменений нет\n\nFingerprint: {config.fingerprint()}"
+    lines = "\n".join(f"   {key}: {old} → {new}" for key, (old, new) in changes.items())
+    return (
+        f"🔄 Конфиг перечитан\n\n"
+        f"Изменено:\n{lines}\n\n"
+        f"Fingerprint: {config.fingerprint()}\n"
+        f"TOKEN, DATABASE_URL, REDIS_URL, скорость отправки, прокси и пул разбора "
+        f"применятся после перезапуска."
+    )
+
+
+@router.message(Command("reload_config"))
+@admin_only
+async def admin_reload_config_cmd(message: Message):
+    """Re-read environment/.env into the process-wide config."""
+    try:
+        await message.answer(_config_reload_text(), reply_markup=admin_back_kb())
+    except Exception as e:
+        logger.exception("Config reload error: %s", e)
+        await message.answer(f"❌ Конфиг не перечитан: {e}")
+
+
+@router.callback_query(F.data == "admin:reload_config")
+@admin_only
+async def admin_reload_config(callback: CallbackQuery):
+    """Re-read environment/.env into the process-wide config."""
+    try:
+        await callback.message.edit_text(_config_reload_text(), reply_markup=admin_back_kb())
+        await callback.answer()
+    except Exception as e:
+        logger.exception("Config reload error: %s", e)
+        await callback.answer(f"❌ Конфиг не перечитан: {e}", show_alert=True)
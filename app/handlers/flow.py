@@ -42,13 +42,13 @@ async def district_select(
     message: Message,
     user_repo: UserRepository,
     config,
+    db_user: dict | None = None,
 ):
-    u = await user_repo.get(message.from_user.id)
+    u = db_user or await user_repo.get(message.from_user.id)
     if not u:
         return
     district = message.text
-    await user_repo.set_district(message.from_user.id, district)
-    await user_repo.set_notifications(message.from_user.id, True)
+    await user_repo.update(message.from_user.id, district=district, notifications_enabled=True)
 
     mode = u.get("mode") or "rent"
     rooms = u.get("rooms") or 1
@@ -80,8 +80,9 @@ async def district_select(
 async def back(
     message: Message,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
-    u = await user_repo.get(message.from_user.id)
+    u = db_user or await user_repo.get(message.from_user.id)
     if not u:
         await message.answer("Выберите режим:", reply_markup=mode_kb())
         return
@@ -110,8 +111,9 @@ async def stop_notifications(
 async def start_notifications(
     message: Message,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
-    u = await user_repo.get(message.from_user.id)
+    u = db_user or await user_repo.get(message.from_user.id)
     if not u or not u.get("district"):
         await message.answer("Сначала выберите режим и район.")
         return
@@ -124,6 +126,5 @@ async def change_params(
     message: Message,
     user_repo: UserRepository,
 ):
-    await user_repo.set_district(message.from_user.id, None)
-    await user_repo.set_rooms(message.from_user.id, 1)
+    await user_repo.update(message.from_user.id, district=None, rooms=1)
     await message.answer("Выберите режим:", reply_markup=mode_kb())
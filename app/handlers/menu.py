@@ -14,10 +14,11 @@ router = Router()
 async def menu_rent(
     callback: CallbackQuery,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
     """Переход к аренде."""
     await callback.answer()
-    user = await user_repo.get(callback.from_user.id)
+    user = db_user or await user_repo.get(callback.from_user.id)
     has_active = user and user_repo.is_subscription_active(user)
     if not has_active:
         await callback.message.edit_text(
@@ -36,10 +37,11 @@ async def menu_rent(
 async def menu_sale(
     callback: CallbackQuery,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
     """Переход к продаже."""
     await callback.answer()
-    user = await user_repo.get(callback.from_user.id)
+    user = db_user or await user_repo.get(callback.from_user.id)
     has_active = user and user_repo.is_subscription_active(user)
     if not has_active:
         await callback.message.edit_text(
@@ -58,10 +60,11 @@ async def menu_sale(
 async def menu_notifications(
     callback: CallbackQuery,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
     """Настройки уведомлений."""
     await callback.answer()
-    user = await user_repo.get(callback.from_user.id)
+    user = db_user or await user_repo.get(callback.from_user.id)
     if not user:
         return
     await callback.message.edit_text(
@@ -78,10 +81,11 @@ async def menu_notifications(
 async def menu_subscription(
     callback: CallbackQuery,
     user_repo: UserRepository,
+    db_user: dict | None = None,
 ):
     """Меню подписки."""
     await callback.answer()
-    user = await user_repo.get(callback.from_user.id)
+    user = db_user or await user_repo.get(callback.from_user.id)
     has_active = user and user_repo.is_subscription_active(user)
     is_trial = False
     if user:
@@ -1,10 +1,10 @@
 """Residential Complex handlers."""
 import logging
 
+import asyncpg
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 
-from app.database.connection import get_pool
 from app.database.repositories import UserRepository
 from app.database.rc_repository import (
     get_active_complexes,
@@ -13,7 +13,6 @@ from app.database.rc_repository import (
     remove_user_complex,
     clear_user_complexes,
     set_standard_complex,
-    get_standard_complex,
     count_user_complexes,
 )
 from app.keyboards.rc_keyboards import (
@@ -21,7 +20,6 @@ from app.keyboards.rc_keyboards import (
     rc_list_kb,
     rc_upgrade_kb,
 )
-from app.config import Config
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -41,7 +39,12 @@ async def show_rc_categories(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("rc_cat_"))
-async def select_category(callback: CallbackQuery):
+async def select_category(
+    callback: CallbackQuery,
+    pool: asyncpg.Pool,
+    user_repo: UserRepository,
+    db_user: dict | None = None,
+):
     """Handle category selection and show complexes."""
     category = callback.data.split("_")[-1]
     user_id = callback.from_user.id
@@ -51,12 +54,8 @@ async def select_category(callback: CallbackQuery):
     
     _user_category_filter[user_id] = category
     
-    pool = await get_pool(Config.from_env().DATABASE_URL)
-    config = Config.from_env()
-    
-    # Get user data
-    user_repo = UserRepository(pool, config)
-    user = await user_repo.get(user_id)
+    # SubscriptionMiddleware уже загрузил пользователя
+    user = db_user or await user_repo.get(user_id)
     
     if not user:
         await callback.answer("Ошибка получения данных пользователя", show_alert=True)
@@ -87,7 +86,7 @@ async def select_category(callback: CallbackQuery):
     if subscription_type == "pro":
         selected_ids = await get_user_selected_complexes(pool, user_id)
     elif subscription_type == "standard":
-        standard_complex = await get_standard_complex(pool, user_id)
+        standard_complex = user.get("residential_complex")
         if standard_complex:
             # Find ID by name
             selected_ids = [
@@ -114,22 +113,23 @@ async def select_category(callback: CallbackQuery):
         f"Категория: {category_text}\n"
         f"{limits_text.format(len(selected_ids))}\n\n"
         "Выберите ЖК (нажмите для выбора/отмены):",
-        reply_markup=rc_list_kb(complexes, selected_ids, subscription_type),
+        reply_markup=rc_list_kb(complexes, selected_ids, subscription_type, category),
     )
     await callback.answer()
 
 
 @router.callback_query(F.data.startswith("rc_select_"))
-async def toggle_complex(callback: CallbackQuery):
+async def toggle_complex(
+    callback: CallbackQuery,
+    pool: asyncpg.Pool,
+    user_repo: UserRepository,
+    db_user: dict | None = None,
+):
     """Toggle residential complex selection."""
     complex_id = int(callback.data.split("_")[-1])
     user_id = callback.from_user.id
     
-    pool = await get_pool(Config.from_env().DATABASE_URL)
-    config = Config.from_env()
-    
-    user_repo = UserRepository(pool, config)
-    user = await user_repo.get(user_id)
+    user = db_user or await user_repo.get(user_id)
     
     if not user:
         await callback.answer("Ошибка получения данных", show_alert=True)
@@ -155,7 +155,7 @@ async def toggle_complex(callback: CallbackQuery):
     
     if subscription_type == "standard":
         # STANDARD: single selection
-        current = await get_standard_complex(pool, user_id)
+        current = user.get("residential_complex")
         
         if current == selected_complex["name"]:
             # Deselect
@@ -206,21 +206,22 @@ async def toggle_complex(callback: CallbackQuery):
         f"Категория: {category_text}\n"
         f"{limits_text.format(len(selected_ids))}\n\n"
         "Выберите ЖК (нажмите для выбора/отмены):",
-        reply_markup=rc_list_kb(complexes, selected_ids, subscription_type),
+        reply_markup=rc_list_kb(complexes, selected_ids, subscription_type, category),
     )
     await callback.answer("✅")
 
 
 @router.callback_query(F.data == "rc_save")
-async def save_selection(callback: CallbackQuery):
+async def save_selection(
+    callback: CallbackQuery,
+    pool: asyncpg.Pool,
+    user_repo: UserRepository,
+    db_user: dict | None = None,
+):
     """Save residential complex selection."""
     user_id = callback.from_user.id
     
-    pool = await get_pool(Config.from_env().DATABASE_URL)
-    config = Config.from_env()
-    
-    user_repo = UserRepository(pool, config)
-    user = await user_repo.get(user_id)
+    user = db_user or await user_repo.get(user_id)
     
     if not user:
         await callback.answer("Ошибка", show_alert=True)
@@ -229,7 +230,7 @@ async def save_selection(callback: CallbackQuery):
     subscription_type = user.get("subscription_type", "free")
     
     if subscription_type == "standard":
-        selected = await get_standard_complex(pool, user_id)
+        selected = user.get("residential_complex")
         if selected:
             await callback.message.edit_text(
                 f"✅ Сохранено!\n\n"
@@ -6,6 +6,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.keyboards import main_kb
 from app.database.repositories import UserRepository, StatsRepository
+from app.services.stats_buffer import STATS
 
 router = Router()
 
@@ -43,11 +44,10 @@ async def cmd_start(
 async def terms_accept(
     callback: CallbackQuery,
     user_repo: UserRepository,
-    stats_repo: StatsRepository,
 ):
     await callback.answer()
     await user_repo.accept_terms(callback.from_user.id)
-    await stats_repo.increment_new_users()
+    STATS.record_new_user()
     await callback.message.edit_text("✅ Согласие получено.")
     await callback.message.answer("Выберите действие:", reply_markup=main_kb())
 
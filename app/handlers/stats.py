@@ -15,8 +15,9 @@ async def user_stats(
     user_repo: UserRepository,
     sent_repo: SentListingsRepository,
     stats_repo: StatsRepository,
+    db_user: dict | None = None,
 ):
-    u = await user_repo.get(message.from_user.id)
+    u = db_user or await user_repo.get(message.from_user.id)
     if not u:
         await message.answer("Нажмите /start")
         return
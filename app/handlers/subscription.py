@@ -7,6 +7,8 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.keyboards import main_kb
 from app.database.repositories import UserRepository
+from app.database.access_cache import ACCESS
+from app.database.user_cache import USER_CACHE
 
 router = Router()
 
@@ -176,6 +178,8 @@ async def pay_confirm(
         until,
         row["user_id"],
     )
+    USER_CACHE.invalidate(row["user_id"])
+    ACCESS.invalidate(row["user_id"])
 
     await callback.answer("Подписка активирована.")
     await callback.message.edit_text(f"✅ Платёж #{req_id} подтверждён. Подписка на 30 дней.")
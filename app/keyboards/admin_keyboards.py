@@ -21,9 +21,15 @@ def admin_main_kb() -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(text="📢 Рассылка", callback_data="admin:broadcast"),
     )
+    builder.row(
+        InlineKeyboardButton(text="⏱ SLA доставки", callback_data="admin:sla"),
+    )
     builder.row(
         InlineKeyboardButton(text="⚙ Система", callback_data="admin:system"),
     )
+    builder.row(
+        InlineKeyboardButton(text="🔄 Перечитать конфиг", callback_data="admin:reload_config"),
+    )
     return builder.as_markup()
 
 
@@ -97,3 +103,12 @@ def admin_rc_item_kb(rc_id: int, is_active: bool) -> InlineKeyboardMarkup:
         InlineKeyboardButton(text="↩ Назад", callback_data="admin_rc:list"),
     )
     return builder.as_markup()
+
+
+def broadcast_job_kb(job_id: int) -> InlineKeyboardMarkup:
+    """Running broadcast controls."""
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(text="⛔ Остановить", callback_data=f"admin_bcjob:cancel:{job_id}"),
+    )
+    return builder.as_markup()
@@ -2,6 +2,8 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.database.rc_cache import RC_CATALOG
+
 
 def rc_category_kb() -> InlineKeyboardMarkup:
     """Category selection keyboard."""
@@ -24,12 +26,38 @@ def rc_category_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+# (версия каталога, категория, маска выбранных, тариф) -> клавиатура
+_list_kb_cache: dict[tuple, InlineKeyboardMarkup] = {}
+_LIST_KB_CACHE_SIZE = 4096
+
+
 def rc_list_kb(
     complexes: list[dict],
     selected_ids: list[int],
     subscription_type: str,
+    category: str | None = None,
 ) -> InlineKeyboardMarkup:
-    """Residential complex list with 2 buttons per row."""
+    """Residential complex list with 2 buttons per row.
+
+    complexes must be the catalog list for category (get_active_complexes):
+    the markup is memoized per catalog version, category, selection bitmask
+    over that list and tier.
+    """
+    selected = set(selected_ids)
+    mask = 0
+    for i, rc in enumerate(complexes):
+        if rc["id"] in selected:
+            mask |= 1 << i
+    key = (RC_CATALOG.version, category, mask, subscription_type)
+    markup = _list_kb_cache.get(key)
+    if markup is None:
+        if len(_list_kb_cache) >= _LIST_KB_CACHE_SIZE:
+            _list_kb_cache.clear()
+        markup = _list_kb_cache[key] = _build_rc_list_kb(complexes, selected)
+    return markup
+
+
+def _build_rc_list_kb(complexes: list[dict], selected: set[int]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     for rc in complexes:
@@ -37,7 +65,7 @@ def rc_list_kb(
         name = rc["name"]
         
         # Add checkmark if selected
-        if rc_id in selected_ids:
+        if rc_id in selected:
             text = f"✔ {name}"
         else:
             text = name
@@ -0,0 +1,251 @@
+"""Метрики в формате Prometheus и HTTP-эндпоинт /metrics.
+
+Метрики объявлены на уровне модуля и пишутся всегда одним вызовом
+`observe`/`inc`. Пока реестр выключен (METRICS_ENABLED=false), эти вызовы
+возвращаются сразу после проверки флага — ни аллокаций, ни блокировок.
+"""
+import logging
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+from aiohttp import web
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self._metrics: list = []
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Функция, которая при каждом scrape отдаёт готовые строки (gauge «на лету»)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        REGISTRY.register(self)
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        if not REGISTRY.enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            out.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return out
+
+
+class Gauge:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        REGISTRY.register(self)
+
+    def set(self, value: float, *labels) -> None:
+        if not REGISTRY.enabled:
+            return
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._values.items():
+            out.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return out
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self.buckets = buckets
+        # labels -> [counts per bucket..., +Inf], sum
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+        REGISTRY.register(self)
+
+    def observe(self, value: float, *labels) -> None:
+        if not REGISTRY.enabled:
+            return
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def totals(self) -> dict[tuple, tuple[int, float]]:
+        """labels -> (count, sum); для бенчмарков и отчётов."""
+        return {labels: (sum(counts), self._sums[labels]) for labels, counts in self._counts.items()}
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.label_names, labels, 'le="%s"' % bound)
+                out.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            le = _labels(self.label_names, labels, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{le} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, labels)} {self._sums[labels]}")
+            out.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return out
+
+
+# --- Метрики пайплайна ---
+
+FETCH_SECONDS = Histogram("krisha_fetch_seconds", "Krisha page fetch latency", ("proxy",))
+PARSE_SECONDS = Histogram("krisha_parse_seconds", "HTML parse time (executor round-trip)")
+LISTINGS_PER_CYCLE = Histogram(
+    "monitor_listings_per_cycle", "Listings fetched per tier cycle", ("tier",), COUNT_BUCKETS
+)
+MATCHES_PER_LISTING = Histogram(
+    "monitor_matches_per_listing", "Users a listing was queued for per cycle", ("tier",), COUNT_BUCKETS
+)
+CYCLE_SECONDS = Histogram(
+    "monitor_cycle_seconds", "Tier cycle duration", ("tier",),
+    (1.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+CYCLE_OVERRUNS = Counter(
+    "monitor_cycle_overruns_total", "Tier cycles that took longer than the tier interval", ("tier",)
+)
+QUEUE_DEPTH = Gauge("send_queue_depth", "Messages waiting in the send queue", ("priority",))
+SEND_SECONDS = Histogram("telegram_send_seconds", "Telegram sendMessage latency")
+SEND_FAILURES = Counter("telegram_send_failures_total", "Messages dropped after retries")
+DELIVERY_SECONDS = Histogram(
+    "delivery_latency_seconds", "First seen -> sent latency by stage", ("tier", "stage"),
+    (1.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Repository method latency", ("method",))
+USER_CACHE_LOOKUPS = Counter("user_cache_lookups_total", "User row cache lookups", ("result",))
+ACCESS_CACHE_LOOKUPS = Counter("access_cache_lookups_total", "Access expiry map lookups", ("result",))
+REDIS_COMMANDS = Counter(
+    "redis_commands_total", "Redis round-trips by backend (memory = in-process fallback)", ("op", "backend")
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Two-level cache lookups (local LRU, then Redis)", ("cache", "tier", "result")
+)
+
+
+def db_timed(func):
+    """Декоратор для async-методов репозиториев: латентность по имени метода."""
+    method = func.__qualname__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not REGISTRY.enabled:
+            return await func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, method)
+
+    return wrapper
+
+
+def _loop_collector() -> Iterable[str]:
+    from app.services.loop_monitor import get_loop_monitor
+
+    monitor = get_loop_monitor()
+    if monitor is None:
+        return []
+    snap = monitor.snapshot()
+    lines = [
+        "# HELP event_loop_lag_seconds Event loop wake-up lag",
+        "# TYPE event_loop_lag_seconds gauge",
+        f'event_loop_lag_seconds{{stat="last"}} {snap["lag_last_ms"] / 1000}',
+        f'event_loop_lag_seconds{{stat="p99"}} {snap["lag_p99_ms"] / 1000}',
+        f'event_loop_lag_seconds{{stat="max"}} {snap["lag_max_ms"] / 1000}',
+        "# HELP event_loop_stalls_total Loop blocks longer than the slow-callback threshold",
+        "# TYPE event_loop_stalls_total counter",
+        f"event_loop_stalls_total {snap['stalls']}",
+        "# HELP event_loop_blocking_samples Watchdog samples per blocking call site",
+        "# TYPE event_loop_blocking_samples gauge",
+    ]
+    for site, count in snap["top_sites"]:
+        lines.append(f'event_loop_blocking_samples{{site="{_escape(site)}"}} {count}')
+    return lines
+
+
+REGISTRY.add_collector(_loop_collector)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=REGISTRY.render(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"X-Prometheus-Format": "0.0.4"},
+    )
+
+
+async def start_metrics_server(config: Config) -> web.AppRunner | None:
+    """Поднимает /metrics, если METRICS_ENABLED. Иначе реестр остаётся выключенным."""
+    if not config.METRICS_ENABLED:
+        return None
+
+    REGISTRY.enabled = True
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, config.METRICS_HOST, config.METRICS_PORT)
+    await site.start()
+    logger.info("Metrics: listening on %s:%d/metrics", config.METRICS_HOST, config.METRICS_PORT)
+    return runner
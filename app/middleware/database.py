@@ -4,18 +4,23 @@ from typing import Any, Awaitable, Callable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
-from app.config import Config
+from app.config import get_config
 from app.database.connection import get_pool
 from app.database.repositories import (
     UserRepository,
     SentListingsRepository,
     StatsRepository,
 )
+from app.services.chat_status import CHATS
+from app.services.stats_buffer import STATS
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, config: Config):
-        self.config = config
+    """Кладёт в data пул, репозитории и текущий конфиг процесса.
+
+    Конфиг берётся из get_config() на каждый апдейт (это просто ссылка),
+    так что после reload_config() обработчики сразу видят новые значения.
+    """
 
     async def __call__(
         self,
@@ -23,10 +28,16 @@ class DatabaseMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        pool = await get_pool(self.config.DATABASE_URL)
+        config = get_config()
+        pool = await get_pool(config.DATABASE_URL)
         data["pool"] = pool
-        data["user_repo"] = UserRepository(pool, self.config)
+        data["user_repo"] = UserRepository(pool, config)
         data["sent_repo"] = SentListingsRepository(pool)
         data["stats_repo"] = StatsRepository(pool)
-        data["config"] = self.config
+        data["config"] = config
+        from_user = data.get("event_from_user")
+        if from_user is not None:
+            STATS.touch_user(from_user.id)
+            # написал боту — значит, чат снова живой
+            CHATS.mark_alive(from_user.id)
         return await handler(event, data)
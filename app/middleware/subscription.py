@@ -1,10 +1,12 @@
 """Middleware для проверки наличия действующей подписки у пользователя."""
+import time
 from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 from aiogram.dispatcher.event.bases import CancelHandler
 
+from app.database.access_cache import ACCESS
 from app.database.repositories import UserRepository
 
 
@@ -41,8 +43,14 @@ class SubscriptionMiddleware(BaseMiddleware):
         if user_repo is None or from_user is None:
             return await handler(event, data)
 
-        user = await user_repo.get(from_user.id)
-        if not user or not user_repo.is_subscription_active(user):
+        # обычно доступ известен из карты в памяти и в БД не ходим; иначе
+        # один запрос, и обработчики берут пользователя из data["db_user"]
+        expiry = ACCESS.get(from_user.id)
+        if expiry is None:
+            user = await user_repo.get(from_user.id)
+            data["db_user"] = user
+            expiry = ACCESS.update_from_user(from_user.id, user)
+        if expiry <= time.time():
             msg = "Нет активной подписки. Перейдите в раздел 💎 Подписка."
             if isinstance(event, Message):
                 await event.answer(msg)
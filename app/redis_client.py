@@ -0,0 +1,242 @@
+"""Redis: общий пул соединений, пакетные операции и запасной кэш в памяти.
+
+Клиент один на процесс (`get_redis()`), соединение поднимается лениво при
+первой команде. Если REDIS_URL не задан или Redis недоступен, те же вызовы
+обслуживает LocalStore — словарь с TTL в памяти процесса: дедупликация и
+кэш AI продолжают работать, просто не делятся между процессами. После
+ошибки Redis не дёргаем RETRY_AFTER секунд, затем пробуем переподключиться.
+
+Пакетные методы (`mget`, `set_many`) — один round-trip на весь список
+ключей: MGET или pipeline из SET ... EX.
+"""
+import logging
+import time
+from typing import Iterable, Sequence
+
+from app.metrics import REDIS_COMMANDS
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER = 30.0
+
+
+class LocalStore:
+    """Подмножество команд Redis поверх dict: строки с TTL, без типов."""
+
+    def __init__(self, max_size: int = 200_000):
+        self._max_size = max_size
+        self._items: dict[str, tuple[float, str]] = {}
+
+    def _alive(self, key: str, now: float) -> str | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at and expires_at <= now:
+            del self._items[key]
+            return None
+        return value
+
+    def get(self, key: str) -> str | None:
+        return self._alive(key, time.monotonic())
+
+    def mget(self, keys: Sequence[str]) -> list[str | None]:
+        now = time.monotonic()
+        return [self._alive(k, now) for k in keys]
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        now = time.monotonic()
+        if nx and self._alive(key, now) is not None:
+            return False
+        self._items.pop(key, None)
+        if len(self._items) >= self._max_size:
+            # dict хранит порядок вставки — выбрасываем самую старую запись
+            self._items.pop(next(iter(self._items)))
+        self._items[key] = (now + ex if ex else 0.0, str(value))
+        return True
+
+    def delete(self, *keys: str) -> int:
+        return sum(self._items.pop(k, None) is not None for k in keys)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RedisClient:
+    """Фасад над redis.asyncio с запасным LocalStore.
+
+    client — готовый клиент (fakeredis.aioredis.FakeRedis в проверках);
+    тогда url не нужен: после ошибки клиент не выбрасывается, а снова
+    пробуется через RETRY_AFTER.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        max_connections: int = 20,
+        timeout: float = 2.0,
+        client=None,
+    ):
+        self._url = url
+        self._max_connections = max_connections
+        self._timeout = timeout
+        self._redis = client
+        # клиент из конструктора не пересоздать по url — его не выбрасываем
+        self._injected = client is not None
+        self._down_until = 0.0
+        self.last_error: str | None = None
+        self.local = LocalStore()
+
+    @property
+    def backend(self) -> str:
+        up = self._redis is not None and time.monotonic() >= self._down_until
+        return "redis" if up else "memory"
+
+    async def _client(self):
+        """Соединённый клиент redis.asyncio или None — тогда работаем из памяти."""
+        if time.monotonic() < self._down_until:
+            return None
+        if self._redis is not None:
+            return self._redis
+        if not self._url:
+            return None
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            self.last_error = "redis package not installed"
+            self._down_until = float("inf")
+            return None
+
+        pool = aioredis.ConnectionPool.from_url(
+            self._url,
+            max_connections=self._max_connections,
+            socket_timeout=self._timeout,
+            socket_connect_timeout=self._timeout,
+            decode_responses=True,
+        )
+        client = aioredis.Redis(connection_pool=pool)
+        try:
+            await client.ping()
+        except Exception as e:
+            await client.aclose()
+            self._mark_down(e)
+            return None
+        logger.info("Redis connected (pool of %d)", self._max_connections)
+        self._redis = client
+        self.last_error = None
+        return client
+
+    def _mark_down(self, error: Exception) -> None:
+        if self.backend == "redis" or self.last_error is None:
+            logger.warning("Redis unavailable, using in-process cache for %.0fs: %s", RETRY_AFTER, error)
+        self.last_error = str(error) or type(error).__name__
+        self._down_until = time.monotonic() + RETRY_AFTER
+        if not self._injected:
+            self._redis = None
+
+    async def _run(self, op: str, remote, local):
+        """remote(client) в Redis; при отсутствии или ошибке — local() в памяти."""
+        client = await self._client()
+        if client is not None:
+            try:
+                result = await remote(client)
+                REDIS_COMMANDS.inc(op, "redis")
+                self.last_error = None
+                return result
+            except Exception as e:
+                self._mark_down(e)
+        REDIS_COMMANDS.inc(op, "memory")
+        return local()
+
+    async def ping(self) -> bool:
+        client = await self._client()
+        if client is None:
+            return False
+        try:
+            return bool(await client.ping())
+        except Exception as e:
+            self._mark_down(e)
+            return False
+
+    async def health(self) -> dict:
+        """Состояние для админки: backend, ok, latency_ms, error."""
+        started = time.perf_counter()
+        ok = await self.ping()
+        return {
+            "backend": self.backend,
+            "configured": bool(self._url) or self._redis is not None,
+            "ok": ok,
+            "latency_ms": (time.perf_counter() - started) * 1000 if ok else None,
+            "error": self.last_error,
+        }
+
+    async def get(self, key: str) -> str | None:
+        return await self._run("get", lambda r: r.get(key), lambda: self.local.get(key))
+
+    async def exists(self, key: str) -> bool:
+        return await self.get(key) is not None
+
+    async def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        async def remote(r):
+            return bool(await r.set(key, value, ex=max(1, int(ex)) if ex else None, nx=nx))
+
+        return await self._run("set", remote, lambda: self.local.set(key, value, ex, nx))
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        return await self._run("delete", lambda r: r.delete(*keys), lambda: self.local.delete(*keys))
+
+    async def mget(self, keys: Sequence[str]) -> list[str | None]:
+        if not keys:
+            return []
+        return await self._run("mget", lambda r: r.mget(keys), lambda: self.local.mget(keys))
+
+    async def set_many(self, items: Iterable[tuple[str, str]], ex: float | None = None) -> None:
+        items = list(items)
+        if not items:
+            return
+
+        async def remote(r):
+            async with r.pipeline(transaction=False) as pipe:
+                for key, value in items:
+                    pipe.set(key, value, ex=max(1, int(ex)) if ex else None)
+                await pipe.execute()
+
+        def local():
+            for key, value in items:
+                self.local.set(key, value, ex)
+
+        await self._run("set_many", remote, local)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            finally:
+                self._redis = None
+
+
+_client: RedisClient | None = None
+
+
+async def get_redis(config=None) -> RedisClient:
+    """Клиент процесса; REDIS_URL берётся из config (по умолчанию get_config())."""
+    global _client
+    if _client is None:
+        if config is None:
+            from app.config import get_config
+
+            config = get_config()
+        _client = RedisClient(config.REDIS_URL)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,198 @@
+"""Фоновые рассылки админа: задачи в broadcast_jobs, отправка через SendQueue.
+
+Хендлер только создаёт задачу и сообщение прогресса, дальше работает
+BROADCASTS. Получатели читаются страницами по user_id
+(iter_broadcast_targets) и сразу идут в очередь, в которой одновременно
+не больше WINDOW копий одной задачи. Курсор — последний user_id, до
+которого всё уже отправлено (всё ниже самого раннего ещё летящего), и раз в
+PROGRESS_INTERVAL он пишется в БД вместе со счётчиками. После рестарта
+start() продолжает с user_id > cursor: доставка «хотя бы раз», повторно
+сообщение получат те, кому его отправили после последнего чекпоинта
+(не больше PROGRESS_INTERVAL × BROADCAST_RATE_PER_SECOND + WINDOW человек).
+
+Отмена — кнопка под сообщением прогресса: статус в БД меняется сразу,
+задача замечает это на ближайшем чекпоинте (или сразу, если отменили в
+этом же процессе) и перестаёт добавлять получателей. Задача, упавшая с
+ошибкой, сохраняет курсор и закрывается статусом failed.
+"""
+import asyncio
+import logging
+import time
+
+import asyncpg
+
+from app.database.repositories import BroadcastRepository
+from app.keyboards.admin_keyboards import broadcast_job_kb
+from app.services.queue import SendQueue
+from app.utils.admin_utils import count_broadcast_targets, iter_broadcast_targets
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 200
+PROGRESS_INTERVAL = 5.0
+
+
+def format_progress(job: dict, sent: int, failed: int, total: int, status: str = "running") -> str:
+    header = {
+        "running": "📢 Рассылка в процессе...",
+        "done": "✅ Рассылка завершена!",
+        "cancelled": "⛔ Рассылка отменена",
+        "failed": "❌ Рассылка прервана из-за ошибки",
+    }.get(status, "📢 Рассылка")
+    return (
+        f"{header}\n\n"
+        f"Задача #{job['id']} ({job['target']})\n"
+        f"Отправлено: {sent + failed}/{total}\n"
+        f"✅ Успешно: {sent}\n"
+        f"❌ Ошибок: {failed}"
+    )
+
+
+def _confirmed(progress: dict) -> int:
+    """Последний user_id, до которого всё отправлено."""
+    in_flight = progress["in_flight"]
+    return next(iter(in_flight)) - 1 if in_flight else progress["cursor"]
+
+
+class BroadcastRunner:
+    def __init__(self):
+        self._queue: SendQueue | None = None
+        self._pool: asyncpg.Pool | None = None
+        self._repo: BroadcastRepository | None = None
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._cancelled: set[int] = set()
+
+    async def start(self, queue: SendQueue, pool: asyncpg.Pool) -> None:
+        """Запускается из run_monitor; продолжает незавершённые задачи."""
+        self._queue = queue
+        self._pool = pool
+        self._repo = BroadcastRepository(pool)
+        for job in await self._repo.open_jobs():
+            logger.info("Broadcast #%d: resuming after user_id %d", job["id"], job["cursor_user_id"])
+            self._spawn(job)
+
+    def submit(self, job: dict) -> bool:
+        """False — монитор ещё не запущен, задачу подхватит start()."""
+        if self._queue is None:
+            return False
+        self._spawn(job)
+        return True
+
+    def cancel(self, job_id: int) -> None:
+        self._cancelled.add(job_id)
+
+    def active(self) -> list[int]:
+        return list(self._tasks)
+
+    def _spawn(self, job: dict) -> None:
+        job_id = job["id"]
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job: dict) -> None:
+        progress = {
+            "cursor": job["cursor_user_id"],
+            "sent": job["sent"],
+            "failed": job["failed"],
+            "total": job["total"],
+            # user_id в порядке добавления, то есть по возрастанию
+            "in_flight": {},
+        }
+        try:
+            await self._run_job(job, progress)
+        except Exception:
+            logger.exception("Broadcast #%d failed", job["id"])
+            await self._abort(job, progress)
+        finally:
+            self._cancelled.discard(job["id"])
+
+    async def _run_job(self, job: dict, progress: dict) -> None:
+        job_id = job["id"]
+        if progress["total"] is None:
+            progress["total"] = await count_broadcast_targets(self._pool, job["target"])
+        total = progress["total"]
+        await self._repo.start(job_id, total)
+
+        in_flight: dict[int, None] = progress["in_flight"]
+        window = asyncio.Semaphore(WINDOW)
+        last_report = time.monotonic()
+
+        def on_done(user_id: int):
+            def done(ok: bool) -> None:
+                in_flight.pop(user_id, None)
+                progress["sent" if ok else "failed"] += 1
+                window.release()
+            return done
+
+        async def report() -> bool:
+            """Чекпоинт и прогресс; False — задачу отменили."""
+            status = await self._repo.checkpoint(
+                job_id, _confirmed(progress), progress["sent"], progress["failed"]
+            )
+            if status == "cancelled":
+                self._cancelled.add(job_id)
+            await self._edit_progress(job, progress, "running")
+            return job_id not in self._cancelled
+
+        async for chunk in iter_broadcast_targets(self._pool, job["target"], after_user_id=progress["cursor"]):
+            for user_id in chunk:
+                if job_id in self._cancelled:
+                    break
+                await window.acquire()
+                in_flight[user_id] = None
+                progress["cursor"] = user_id
+                self._queue.put_copy(user_id, job["from_chat_id"], job["message_id"], on_done(user_id))
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    if not await report():
+                        break
+            if job_id in self._cancelled:
+                break
+
+        # дожидаемся уже поставленных в очередь
+        while in_flight:
+            await asyncio.sleep(0.5)
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await report()
+
+        status = "cancelled" if job_id in self._cancelled else "done"
+        await self._repo.checkpoint(job_id, progress["cursor"], progress["sent"], progress["failed"])
+        await self._repo.finish(job_id, status)
+        await self._edit_progress(job, progress, status)
+        logger.info(
+            "Broadcast #%d %s: sent %d, failed %d", job_id, status, progress["sent"], progress["failed"]
+        )
+
+    async def _abort(self, job: dict, progress: dict) -> None:
+        """Ошибка задачи: сохранить курсор и закрыть её статусом failed."""
+        try:
+            await self._repo.checkpoint(
+                job["id"], _confirmed(progress), progress["sent"], progress["failed"]
+            )
+            await self._repo.finish(job["id"], "failed")
+        except Exception as e:
+            # БД недоступна — строка останется running и продолжится после рестарта
+            logger.warning("Broadcast #%d: cannot record failure: %s", job["id"], e)
+            return
+        await self._edit_progress(job, progress, "failed")
+
+    async def _edit_progress(self, job: dict, progress: dict, status: str) -> None:
+        if not job.get("progress_chat_id"):
+            return
+        try:
+            await self._queue.bot.edit_message_text(
+                format_progress(job, progress["sent"], progress["failed"], progress["total"] or 0, status),
+                chat_id=job["progress_chat_id"],
+                message_id=job["progress_message_id"],
+                reply_markup=broadcast_job_kb(job["id"]) if status == "running" else None,
+            )
+        except Exception as e:
+            # "message is not modified" и удалённое сообщение прогресса не мешают рассылке
+            logger.debug("Broadcast #%d progress edit: %s", job["id"], e)
+
+
+BROADCASTS = BroadcastRunner()
@@ -0,0 +1,120 @@
+"""Мёртвые чаты: пользователь заблокировал бота или удалил аккаунт.
+
+Очередь отправки сообщает сюда об ошибках 403 (blocked / deactivated) и
+«chat not found». CHATS держит множество мёртвых user_id в памяти — очередь
+по нему сразу пропускает оставшиеся сообщения таким чатам — и копит
+изменения, которые chat_status_flush_loop пишет в chat_status. Снимки
+пользователей монитора и цели рассылок исключают такие чаты в SQL
+(LIVE_CHAT_SQL).
+
+Чат оживает, если пользователь снова пишет боту (DatabaseMiddleware), или
+по пробе: probe_loop раз в PROBE_INTERVAL берёт мёртвые чаты, не
+проверявшиеся PROBE_AFTER, и ставит в очередь send_chat_action с самым
+низким приоритетом. Успешная проба возвращает чат в active.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+BLOCKED, DEACTIVATED = "blocked", "deactivated"
+
+PROBE_INTERVAL = 3600
+PROBE_AFTER = timedelta(days=7)
+PROBE_BATCH = 500
+
+
+def classify_error(error: Exception) -> str | None:
+    """blocked / deactivated для ошибок «чат мёртв», None для остальных."""
+    text = str(error).lower()
+    if "blocked" in text:
+        return BLOCKED
+    if "deactivated" in text or "chat not found" in text:
+        return DEACTIVATED
+    return None
+
+
+class ChatStatusBuffer:
+    def __init__(self):
+        self._dead: set[int] = set()
+        self._pending_dead: dict[int, tuple[str, str, float]] = {}
+        self._pending_alive: set[int] = set()
+
+    def is_dead(self, user_id: int) -> bool:
+        return user_id in self._dead
+
+    def mark_dead(self, user_id: int, status: str, error: str) -> None:
+        self._dead.add(user_id)
+        self._pending_alive.discard(user_id)
+        self._pending_dead[user_id] = (status, error[:200], time.time())
+
+    def mark_alive(self, user_id: int) -> None:
+        """Дёшево для любых пользователей: пишется только бывший мёртвый."""
+        if user_id in self._dead:
+            self._dead.discard(user_id)
+            self._pending_dead.pop(user_id, None)
+            self._pending_alive.add(user_id)
+
+    def load(self, user_ids: list[int]) -> None:
+        self._dead.update(user_ids)
+
+    def take_pending(self) -> tuple[list[tuple], list[int]]:
+        dead = [(uid, *info) for uid, info in self._pending_dead.items()]
+        alive = list(self._pending_alive)
+        self._pending_dead = {}
+        self._pending_alive = set()
+        return dead, alive
+
+    def restore_pending(self, dead: list[tuple], alive: list[int]) -> None:
+        for uid, status, error, at in dead:
+            if uid in self._dead:
+                self._pending_dead.setdefault(uid, (status, error, at))
+        self._pending_alive.update(uid for uid in alive if uid not in self._dead)
+
+    def __len__(self) -> int:
+        return len(self._dead)
+
+
+CHATS = ChatStatusBuffer()
+
+
+async def load_chat_status(chat_repo) -> None:
+    try:
+        CHATS.load(await chat_repo.dead_ids())
+        logger.info("Chat status: %d dead chats", len(CHATS))
+    except Exception as e:
+        logger.warning("Chat status load failed: %s", e)
+
+
+async def chat_status_flush_loop(chat_repo, interval: int = 10) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush_chat_status(chat_repo)
+
+
+async def flush_chat_status(chat_repo) -> None:
+    dead, alive = CHATS.take_pending()
+    try:
+        if dead:
+            await chat_repo.mark_dead(dead)
+        if alive:
+            await chat_repo.revive(alive)
+    except Exception as e:
+        logger.warning("Chat status flush failed: %s", e)
+        CHATS.restore_pending(dead, alive)
+
+
+async def probe_loop(chat_repo, queue) -> None:
+    while True:
+        await asyncio.sleep(PROBE_INTERVAL)
+        try:
+            user_ids = await chat_repo.claim_probes(PROBE_AFTER, PROBE_BATCH)
+        except Exception as e:
+            logger.warning("Chat status probe failed: %s", e)
+            continue
+        for user_id in user_ids:
+            queue.put_probe(user_id)
+        if user_ids:
+            logger.info("Chat status: probing %d dead chats", len(user_ids))
@@ -0,0 +1,186 @@
+"""Мониторинг блокировок event loop: лаг пробуждения и профиль медленных колбэков."""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from pathlib import Path
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+_monitor: "LoopMonitor | None" = None
+
+
+def _call_site(frame) -> tuple[str, list[str]]:
+    """Самый глубокий кадр проекта (не stdlib/site-packages) и весь стек."""
+    stack = traceback.extract_stack(frame)
+    site = None
+    for fs in reversed(stack):
+        if fs.filename.startswith(_PROJECT_ROOT) and "site-packages" not in fs.filename:
+            site = fs
+            break
+    if site is None:
+        site = stack[-1]
+    path = site.filename.replace(_PROJECT_ROOT + "/", "")
+    return f"{path}:{site.lineno} {site.name}", traceback.format_list(stack[-12:])
+
+
+class LoopMonitor:
+    """Сэмплер лага event loop + сторожевой поток, снимающий стек при блокировке.
+
+    Сэмплер спит `interval` секунд и меряет, насколько позже он проснулся.
+    Сторожевой поток видит, что сэмплер не отметился дольше
+    `interval + threshold`, и снимает стек потока loop: так находится код,
+    который держит loop, без asyncio debug mode.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        threshold: float = 0.1,
+        report_interval: float = 300.0,
+        top_n: int = 5,
+        asyncio_debug: bool = False,
+    ):
+        self._interval = interval
+        self._threshold = threshold
+        self._report_interval = report_interval
+        self._top_n = top_n
+        self._asyncio_debug = asyncio_debug
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._running = False
+        self._lock = threading.Lock()
+
+        self._lags: deque[float] = deque(maxlen=600)
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._stalls = 0
+        self._stall_active = False
+        # сэмплы по местам вызова: сколько раз сторож застал loop на этой строке
+        self._sites: Counter[str] = Counter()
+        self._site_stacks: dict[str, list[str]] = {}
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._loop.slow_callback_duration = self._threshold
+        if self._asyncio_debug:
+            # штатный лог asyncio «Executing <Handle ...> took N seconds»
+            self._loop.set_debug(True)
+        self._heartbeat = time.monotonic()
+        self._running = True
+
+        asyncio.create_task(self._sampler())
+        asyncio.create_task(self._reporter())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        logger.info(
+            "Loop monitor: started (interval=%.2fs, threshold=%dms)",
+            self._interval,
+            self._threshold * 1000,
+        )
+
+    def stop(self) -> None:
+        self._running = False
+
+    async def _sampler(self) -> None:
+        while self._running:
+            scheduled = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled)
+            with self._lock:
+                self._heartbeat = now
+                self._stall_active = False
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                self._lags.append(lag)
+
+    def _watchdog(self) -> None:
+        step = max(self._threshold / 2, 0.01)
+        while self._running:
+            time.sleep(step)
+            overdue = time.monotonic() - self._heartbeat - self._interval
+            if overdue < self._threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            site, stack = _call_site(frame)
+            del frame
+
+            with self._lock:
+                self._sites[site] += 1
+                self._site_stacks.setdefault(site, stack)
+                first = not self._stall_active
+                if first:
+                    self._stall_active = True
+                    self._stalls += 1
+
+            if first:
+                logger.warning(
+                    "Event loop blocked >%dms at %s\n%s",
+                    self._threshold * 1000,
+                    site,
+                    "".join(stack).rstrip(),
+                )
+
+    async def _reporter(self) -> None:
+        while self._running:
+            await asyncio.sleep(self._report_interval)
+            top = self.top_sites()
+            if not top:
+                continue
+            lines = "\n".join(f"  {count:>5}  {site}" for site, count in top)
+            logger.warning(
+                "Loop monitor: top blocking sites (samples × %dms):\n%s",
+                max(self._threshold / 2, 0.01) * 1000,
+                lines,
+            )
+
+    def top_sites(self, n: int | None = None) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._sites.most_common(n or self._top_n)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+            return {
+                "lag_last_ms": self._last_lag * 1000,
+                "lag_p99_ms": p99 * 1000,
+                "lag_max_ms": self._max_lag * 1000,
+                "stalls": self._stalls,
+                "top_sites": self._sites.most_common(self._top_n),
+            }
+
+
+def start_loop_monitor(config: Config) -> LoopMonitor | None:
+    global _monitor
+
+    if not config.LOOP_MONITOR_ENABLED:
+        return None
+    if _monitor is None:
+        _monitor = LoopMonitor(
+            interval=config.LOOP_LAG_INTERVAL,
+            threshold=config.LOOP_SLOW_CALLBACK_MS / 1000,
+            report_interval=config.LOOP_REPORT_INTERVAL,
+            asyncio_debug=config.LOOP_ASYNCIO_DEBUG,
+        )
+        _monitor.start()
+    return _monitor
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    return _monitor
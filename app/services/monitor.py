@@ -1,17 +1,35 @@
 """Монитор парсинга с error isolation и production оптимизациями."""
 import asyncio
 import logging
+import time
+from collections import Counter
 from datetime import datetime
 
-from app.config import Config
+from app.config import Config, get_config
 from app.database.connection import get_pool
 from app.database.repositories import (
+    ChatStatusRepository,
+    ListingPriceRepository,
     UserRepository,
     SentListingsRepository,
     StatsRepository,
 )
+from app.cache import TieredCache
+from app.redis_client import get_redis
 from app.services.parser import KrishaParser
-from app.services.queue import SendQueue
+from app.services.price_stats import PRICES, format_price_score, load_prices, price_flush_loop
+from app.services.retention import retention_loop
+from app.services.broadcast import BROADCASTS
+from app.services.chat_status import chat_status_flush_loop, load_chat_status, probe_loop
+from app.services.queue import SendQueue, set_send_queue
+from app.services.sla import SLA, DeliveryTrace, sla_flush_loop
+from app.services.stats_buffer import stats_flush_loop
+from app.metrics import (
+    CYCLE_OVERRUNS,
+    CYCLE_SECONDS,
+    LISTINGS_PER_CYCLE,
+    MATCHES_PER_LISTING,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +44,19 @@ DISTRICT_MAP = {
     "Алатауский": "alatauskij",
 }
 
+# кэш «уже отправлено» перед sent_listings: повторные объявления выдачи
+# отсекаются локальным LRU или одним MGET на пользователя вместо was_sent
+# на каждое
+SENT_CACHE_TTL = 24 * 3600
+
+
+# оценка цены по медиане вместо AI — платным тарифам
+PRICE_SCORE_TIERS = ("standard", "pro")
+
+
+def _sent_key(user_id: int, listing_id: int) -> str:
+    return f"sent:{user_id}:{listing_id}"
+
 
 async def _process_user_listings(
     user: dict,
@@ -33,13 +64,23 @@ async def _process_user_listings(
     sent_repo: SentListingsRepository,
     queue: SendQueue,
     config: Config,
+    matches: Counter | None = None,
+    tier: str = "",
+    sent_cache: TieredCache | None = None,
 ) -> int:
     count = 0
+    tier = tier or user.get("subscription_type") or "free"
+    uid = user["user_id"]
+    if sent_cache is not None and listings:
+        known = await sent_cache.get_many([_sent_key(uid, listing.id) for listing in listings])
+        listings = [listing for listing, hit in zip(listings, known) if hit is None]
+    remember: list[int] = []
     for listing in listings:
         if user.get("from_owner") and not listing.from_owner:
             continue
 
-        if await sent_repo.was_sent(user["user_id"], listing.id):
+        if await sent_repo.was_sent(uid, listing.id):
+            remember.append(listing.id)
             continue
 
         if user.get("subscription_type") == "free":
@@ -48,10 +89,22 @@ async def _process_user_listings(
                 continue
 
         text = f"🏠 {listing.title}\n💰 {listing.price}\n🔗 {listing.url}"
+        if listing.price_note and tier in PRICE_SCORE_TIERS:
+            text += f"\n{listing.price_note}"
         is_pro = user.get("subscription_type") == "pro"
-        await queue.put(user["user_id"], text, is_pro=is_pro)
-        await sent_repo.mark_sent(user["user_id"], listing.id)
+        trace = DeliveryTrace(
+            tier=tier,
+            first_seen=listing.seen_at or time.time(),
+            matched_at=time.time(),
+        )
+        await queue.put(user["user_id"], text, is_pro=is_pro, trace=trace)
+        await sent_repo.mark_sent(uid, listing.id)
+        remember.append(listing.id)
+        if matches is not None:
+            matches[listing.id] += 1
         count += 1
+    if sent_cache is not None and remember:
+        await sent_cache.set_many(((_sent_key(uid, i), "1") for i in remember), ex=SENT_CACHE_TTL)
     return count
 
 
@@ -61,7 +114,11 @@ async def _run_tier(
     sent_repo: SentListingsRepository,
     queue: SendQueue,
     config: Config,
+    tier: str = "",
+    sent_cache: TieredCache | None = None,
 ) -> None:
+    fetched = 0
+    matches: Counter = Counter()
     for user in users:
         try:
             district = user.get("district")
@@ -78,52 +135,84 @@ async def _run_tier(
             for d in districts:
                 district_slug = DISTRICT_MAP.get(d, d.lower().replace(" ", ""))
                 listings = await parser.parse(mode, rooms, district_slug, from_owner)
+                fetched += len(listings)
+                for listing in listings:
+                    listing.seen_at = SLA.first_seen(listing.id)
+                    score = PRICES.observe_scored(listing.id, mode, d, listing.title, listing.price)
+                    if score is not None:
+                        listing.price_note = format_price_score(score[0], score[2])
                 await _process_user_listings(
-                    user, listings, sent_repo, queue, config
+                    user, listings, sent_repo, queue, config, matches, tier, sent_cache
                 )
         except Exception as e:
             logger.exception(f"Monitor error for user {user.get('user_id')}: {e}")
 
+    LISTINGS_PER_CYCLE.observe(fetched, tier)
+    for n in matches.values():
+        MATCHES_PER_LISTING.observe(n, tier)
+
 
 async def _tier_loop(
     tier: str,
-    interval: int,
     user_repo: UserRepository,
     sent_repo: SentListingsRepository,
     parser: KrishaParser,
     queue: SendQueue,
-    config: Config,
+    sent_cache: TieredCache | None = None,
 ) -> None:
     while True:
+        # конфиг каждый цикл заново: лимиты и интервалы подхватывают /reload_config
+        config = get_config()
+        interval = getattr(config, f"{tier.upper()}_CHECK_INTERVAL")
+        started = time.monotonic()
         try:
             if tier == "free":
                 users = await user_repo.get_active_free_users()
             else:
                 users = await user_repo.get_active_users_by_tier(tier)
             if users:
-                await _run_tier(users, parser, sent_repo, queue, config)
+                await _run_tier(users, parser, sent_repo, queue, config, tier, sent_cache)
         except Exception as e:
             logger.exception(f"Monitor {tier} error: {e}")
+        elapsed = time.monotonic() - started
+        CYCLE_SECONDS.observe(elapsed, tier)
+        if elapsed > interval:
+            CYCLE_OVERRUNS.inc(tier)
         await asyncio.sleep(interval)
 
 
 async def run_monitor(bot, config: Config) -> None:
     from app.database.repositories import StatsRepository
 
-    queue = SendQueue(bot, config.RATE_LIMIT_PER_SECOND)
+    queue = SendQueue(
+        bot, config.RATE_LIMIT_PER_SECOND, config.SEND_WORKERS, config.BROADCAST_RATE_PER_SECOND
+    )
     pool = await get_pool(config.DATABASE_URL)
     stats_repo = StatsRepository(pool)
     user_repo = UserRepository(pool, config)
     sent_repo = SentListingsRepository(pool)
+    price_repo = ListingPriceRepository(pool)
+    chat_repo = ChatStatusRepository(pool)
     parser = KrishaParser(config)
+    await load_prices(price_repo)
+    await load_chat_status(chat_repo)
+    sent_cache = TieredCache(
+        "sent", await get_redis(config), config.LOCAL_CACHE_SIZE, config.LOCAL_CACHE_TTL
+    )
 
-    async def stats_cb(count: int):
-        await stats_repo.increment_messages_sent(count)
-
-    queue.start(stats_callback=stats_cb)
+    # счётчики отправок копит сама очередь (STATS), здесь только сброс в БД
+    queue.start()
+    set_send_queue(queue)
+    await BROADCASTS.start(queue, pool)
+    asyncio.create_task(sla_flush_loop(stats_repo))
+    asyncio.create_task(stats_flush_loop(stats_repo, config.STATS_FLUSH_INTERVAL))
+    asyncio.create_task(price_flush_loop(price_repo))
+    asyncio.create_task(chat_status_flush_loop(chat_repo, config.STATS_FLUSH_INTERVAL))
+    asyncio.create_task(probe_loop(chat_repo, queue))
+    asyncio.create_task(retention_loop(sent_repo, config, price_repo))
 
     await asyncio.gather(
-        _tier_loop("pro", config.PRO_CHECK_INTERVAL, user_repo, sent_repo, parser, queue, config),
-        _tier_loop("standard", config.STANDARD_CHECK_INTERVAL, user_repo, sent_repo, parser, queue, config),
-        _tier_loop("free", config.FREE_CHECK_INTERVAL, user_repo, sent_repo, parser, queue, config),
+        _tier_loop("pro", user_repo, sent_repo, parser, queue, sent_cache),
+        _tier_loop("standard", user_repo, sent_repo, parser, queue, sent_cache),
+        _tier_loop("free", user_repo, sent_repo, parser, queue, sent_cache),
     )
@@ -2,6 +2,10 @@
 import asyncio
 import logging
 import random
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from typing import Sequence
 
@@ -9,6 +13,9 @@ import aiohttp
 from bs4 import BeautifulSoup
 
 from app.config import Config
+from app.database.connection import get_pool
+from app.database.repositories import ListingKeyRepository
+from app.metrics import FETCH_SECONDS, PARSE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +26,150 @@ USER_AGENTS = (
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 )
 
+# (id, title, price, url, from_owner) — компактная форма для передачи между процессами.
+# id — число krisha; если его не нашлось, строка-ключ (href), которую
+# KrishaParser переводит в число через таблицу listing_keys.
+ListingRow = tuple[int | str, str, str, str, bool]
+
+# /a/show/695000137, /a/show/695000137?srchid=..., https://krisha.kz/a/show/695000137
+_SHOW_ID_RE = re.compile(r"/a/show/(\d+)")
+
+_executor: Executor | None = None
+
 
 @dataclass
 class Listing:
-    id: str
+    id: int
     title: str
     price: str
     url: str
     from_owner: bool = False
+    seen_at: float = 0.0
+    price_note: str = ""
+
+
+# «2-комнатная квартира · 62 м² · 1/5 этаж», «295 000 〒 в месяц»
+_ROOMS_RE = re.compile(r"(\d+)\s*-?\s*комн")
+_AREA_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*м²")
+_PRICE_RE = re.compile(r"\d[\d\s\u00a0]*")
+
+
+def parse_price(text: str) -> int | None:
+    """Цена в тенге из строки карточки; None, если чисел нет («Договорная»)."""
+    match = _PRICE_RE.search(text or "")
+    if not match:
+        return None
+    digits = "".join(ch for ch in match.group() if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def parse_area(title: str) -> float | None:
+    match = _AREA_RE.search(title or "")
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def parse_rooms(title: str) -> int | None:
+    match = _ROOMS_RE.search(title or "")
+    return int(match.group(1)) if match else None
+
+
+def listing_id_from_url(href: str) -> int | None:
+    """Числовой id объявления из ссылки krisha или None."""
+    match = _SHOW_ID_RE.search(href)
+    return int(match.group(1)) if match else None
+
+
+def _card_id(card) -> int | None:
+    for attr in ("data-id", "data-product-id"):
+        value = card.get(attr, "")
+        if value.isascii() and value.isdigit():
+            return int(value)
+    return None
+
+
+def parse_listings_html(raw: bytes, encoding: str | None = None) -> list[ListingRow]:
+    """Разбор страницы выдачи. Выполняется в пуле, не в event loop."""
+    soup = BeautifulSoup(raw, "lxml", from_encoding=encoding)
+    rows: list[ListingRow] = []
+
+    for card in soup.select("div.a-card"):
+        title_el = card.select_one("a.a-card__title")
+        price_el = card.select_one("div.a-card__price")
+        if not title_el or not price_el:
+            continue
+
+        href = title_el.get("href", "")
+        listing_id = listing_id_from_url(href) or _card_id(card) or href
+        if not listing_id:
+            continue
+
+        card_text = card.text.lower()
+        from_owner_flag = "от хозяина" in card_text or "собственник" in card_text
+
+        rows.append(
+            (
+                listing_id,
+                title_el.text.strip(),
+                price_el.text.strip(),
+                "https://krisha.kz" + href,
+                from_owner_flag,
+            )
+        )
+
+    return rows
+
+
+def _proxy_label(proxy: str | None) -> str:
+    """host:port прокси без логина/пароля — для меток метрик."""
+    if not proxy:
+        return "direct"
+    return proxy.rsplit("@", 1)[-1].split("://", 1)[-1]
+
+
+def get_parse_executor(config: Config) -> Executor:
+    """Общий пул для разбора HTML. Process pool с откатом на потоки."""
+    global _executor
+
+    if _executor is not None:
+        return _executor
+
+    workers = max(1, config.PARSER_WORKERS)
+    if config.PARSER_EXECUTOR == "process":
+        try:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            logger.info("Parser executor: process pool (workers=%d)", workers)
+            return _executor
+        except (OSError, NotImplementedError, ImportError) as exc:
+            logger.warning("Parser executor: process pool unavailable (%s), using threads", exc)
+
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parser")
+    logger.info("Parser executor: thread pool (workers=%d)", workers)
+    return _executor
+
+
+def shutdown_parse_executor() -> None:
+    global _executor
+
+    if _executor is None:
+        return
+
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+def _fallback_to_threads(config: Config, broken: Executor) -> Executor:
+    """Заменяет сломанный пул потоками, если его ещё не заменил другой разбор."""
+    global _executor
+
+    if _executor is not broken and _executor is not None:
+        return _executor
+    logger.error("Parser executor: process pool broken, switching to threads")
+    broken.shutdown(wait=False, cancel_futures=True)
+    _executor = ThreadPoolExecutor(
+        max_workers=max(1, config.PARSER_WORKERS),
+        thread_name_prefix="parser",
+    )
+    return _executor
 
 
 class KrishaParser:
@@ -61,15 +204,47 @@ class KrishaParser:
         district: str,
         from_owner: bool = False,
     ) -> str:
+        host = self._config.KRISHA_BASE_URL
         if mode == "rent":
-            base = f"https://krisha.kz/arenda/kvartiry/almaty-{district}/"
+            base = f"{host}/arenda/kvartiry/almaty-{district}/"
         else:
-            base = f"https://krisha.kz/prodazha/kvartiry/almaty-{district}/"
+            base = f"{host}/prodazha/kvartiry/almaty-{district}/"
         url = f"{base}?das[who]=1&das[live.rooms]={rooms}"
         if from_owner:
             url += "&das[who]=1"  # от хозяина
         return url
 
+    async def _parse_html(self, raw: bytes, encoding: str | None) -> list[Listing]:
+        loop = asyncio.get_running_loop()
+        executor = get_parse_executor(self._config)
+        started = time.perf_counter()
+        try:
+            rows = await loop.run_in_executor(executor, parse_listings_html, raw, encoding)
+        except BrokenProcessPool:
+            executor = _fallback_to_threads(self._config, executor)
+            rows = await loop.run_in_executor(executor, parse_listings_html, raw, encoding)
+        PARSE_SECONDS.observe(time.perf_counter() - started)
+
+        keys = [row[0] for row in rows if isinstance(row[0], str)]
+        if not keys:
+            return [Listing(*row) for row in rows]
+
+        # редкий случай: в ссылке нет /a/show/<id> — берём id из listing_keys
+        try:
+            pool = await get_pool(self._config.DATABASE_URL)
+            resolved = await ListingKeyRepository(pool).resolve(keys)
+        except Exception as e:
+            logger.warning("Listing keys: resolve failed, skipping %d listings: %s", len(keys), e)
+            resolved = {}
+        listings = []
+        for listing_id, *rest in rows:
+            if isinstance(listing_id, str):
+                listing_id = resolved.get(listing_id)
+                if listing_id is None:
+                    continue
+            listings.append(Listing(listing_id, *rest))
+        return listings
+
     async def parse(
         self,
         mode: str,
@@ -86,6 +261,7 @@ class KrishaParser:
                 proxy = self._get_proxy()
                 timeout = aiohttp.ClientTimeout(total=self._config.PARSER_TIMEOUT)
 
+                started = time.perf_counter()
                 async with aiohttp.ClientSession(
                     headers=self._get_headers(),
                     timeout=timeout,
@@ -93,37 +269,11 @@ class KrishaParser:
                     async with session.get(url, proxy=proxy) as resp:
                         if resp.status != 200:
                             raise aiohttp.ClientError(f"HTTP {resp.status}")
-                        html = await resp.text()
-
-                soup = BeautifulSoup(html, "lxml")
-                cards = soup.select("div.a-card")
-                results = []
-
-                for card in cards:
-                    title_el = card.select_one("a.a-card__title")
-                    price_el = card.select_one("div.a-card__price")
-                    if not title_el or not price_el:
-                        continue
-
-                    href = title_el.get("href", "")
-                    listing_id = href.split("/")[-1].split("-")[0] or href
-                    if not listing_id or not listing_id.isdigit():
-                        listing_id = href
-
-                    link = "https://krisha.kz" + href
-                    from_owner_flag = "от хозяина" in card.text.lower() or "собственник" in card.text.lower()
-
-                    results.append(
-                        Listing(
-                            id=str(listing_id),
-                            title=title_el.text.strip(),
-                            price=price_el.text.strip(),
-                            url=link,
-                            from_owner=from_owner_flag,
-                        )
-                    )
-
-                return results
+                        raw = await resp.read()
+                        encoding = resp.charset
+                FETCH_SECONDS.observe(time.perf_counter() - started, _proxy_label(proxy))
+
+                return await self._parse_html(raw, encoding)
 
             except Exception as e:
                 last_error = e
@@ -0,0 +1,226 @@
+"""Медиана цены за м² по (режим, район, комнаты) из нашей же истории выдачи.
+
+Каждое распарсенное объявление попадает в кольцевой буфер NumPy своего
+ключа (не больше MAX_PER_KEY последних) и в очередь на запись в
+listing_prices. При старте окно за WINDOW_DAYS поднимается из БД одним
+запросом. Медиана считается векторно по живой части окна и кэшируется до
+следующего объявления по ключу — поэтому оценка цены для сообщения это
+поиск в dict, без AI и без запросов.
+"""
+import asyncio
+import logging
+import time
+from typing import Iterable
+
+import numpy as np
+
+from app.services.parser import parse_area, parse_price, parse_rooms
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 30
+MAX_PER_KEY = 512
+MIN_SAMPLES = 5
+# медиану по неизменному ключу всё равно пересчитываем: окно сдвигается
+MEDIAN_TTL = 300.0
+SEEN_LIMIT = 200_000
+PENDING_LIMIT = 50_000
+
+Key = tuple[str, str, int]
+# в _seen: объявление поднято из БД, оценки на момент учёта нет
+_UNSCORED = object()
+
+
+class _Series:
+    __slots__ = ("values", "stamps", "size", "pos", "cached", "cached_at")
+
+    def __init__(self, capacity: int):
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.stamps = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.pos = 0
+        self.cached: tuple[float, int] | None = None
+        self.cached_at = 0.0
+
+    def extend(self, values: np.ndarray, stamps: np.ndarray) -> None:
+        capacity = len(self.values)
+        values, stamps = values[-capacity:], stamps[-capacity:]
+        idx = (self.pos + np.arange(len(values))) % capacity
+        self.values[idx] = values
+        self.stamps[idx] = stamps
+        self.pos = int((self.pos + len(values)) % capacity)
+        self.size = min(self.size + len(values), capacity)
+        self.cached = None
+
+    def median(self, cutoff: float, now: float) -> tuple[float, int] | None:
+        if self.cached is None or now - self.cached_at > MEDIAN_TTL:
+            live = self.values[: self.size][self.stamps[: self.size] >= cutoff]
+            self.cached = (float(np.median(live)), len(live)) if len(live) else (0.0, 0)
+            self.cached_at = now
+        return self.cached if self.cached[1] else None
+
+
+def listing_features(title: str, price_text: str) -> tuple[int, int, float] | None:
+    """(комнаты, цена, площадь) из карточки; None, если цены или площади нет."""
+    price = parse_price(price_text)
+    area = parse_area(title)
+    if not price or not area:
+        return None
+    return parse_rooms(title) or 0, price, area
+
+
+def guess_mode(price_text: str) -> str:
+    return "rent" if "месяц" in (price_text or "") else "sale"
+
+
+class PriceStats:
+    def __init__(self, window_days: int = WINDOW_DAYS, max_per_key: int = MAX_PER_KEY):
+        self.window = window_days * 86400
+        self._max_per_key = max_per_key
+        self._series: dict[Key, _Series] = {}
+        # id уже учтённых объявлений (выдача повторяется каждый цикл) -> оценка
+        self._seen: dict = {}
+        self._pending: list[tuple] = []
+
+    def _get_series(self, key: Key) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(self._max_per_key)
+        return series
+
+    def observe(
+        self, listing_id, mode: str, district: str, title: str, price_text: str, persist: bool = True
+    ) -> bool:
+        """Учесть объявление. False — уже видели или цену не разобрать.
+
+        persist=False — только медианы в памяти, без очереди в listing_prices
+        (процесс, который не запускает price_flush_loop).
+        """
+        if listing_id in self._seen:
+            return False
+        features = listing_features(title, price_text)
+        if features is None:
+            return False
+        if len(self._seen) >= SEEN_LIMIT:
+            self._seen.pop(next(iter(self._seen)))
+        self._seen[listing_id] = None
+
+        rooms, price, area = features
+        now = time.time()
+        self._get_series((mode, district, rooms)).extend(
+            np.array([price / area]), np.array([now])
+        )
+        if persist and len(self._pending) < PENDING_LIMIT:
+            self._pending.append((listing_id, mode, district, rooms, price, area, now))
+        return True
+
+    def load(self, rows: Iterable[tuple]) -> int:
+        """Bulk-загрузка (listing_id, mode, district, rooms, price, area, seen_at_epoch)."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        ids, modes, districts, rooms, prices, areas, stamps = zip(*rows)
+        per_m2 = np.asarray(prices, dtype=np.float64) / np.asarray(areas, dtype=np.float64)
+        stamps = np.asarray(stamps, dtype=np.float64)
+        keys = list(zip(modes, districts, rooms))
+        groups: dict[Key, list[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+        for key, idx in groups.items():
+            idx = np.asarray(idx)
+            order = idx[np.argsort(stamps[idx], kind="stable")]
+            self._get_series(key).extend(per_m2[order], stamps[order])
+        for listing_id in ids:
+            self._seen[listing_id] = _UNSCORED
+        return len(rows)
+
+    def market(self, mode: str, district: str, rooms: int) -> tuple[float, int] | None:
+        """(медиана цены за м², число объявлений) или None, если данных мало."""
+        series = self._series.get((mode, district, rooms))
+        if series is None:
+            return None
+        now = time.time()
+        result = series.median(now - self.window, now)
+        if result is None or result[1] < MIN_SAMPLES:
+            return None
+        return result
+
+    def score(self, mode: str, district: str, title: str, price_text: str) -> tuple[float, float, int] | None:
+        """(отклонение от медианы, медиана за м², выборка); -0.12 — на 12% дешевле."""
+        features = listing_features(title, price_text)
+        if features is None:
+            return None
+        rooms, price, area = features
+        market = self.market(mode, district, rooms)
+        if market is None:
+            return None
+        median, samples = market
+        return price / area / median - 1, median, samples
+
+    def observe_scored(
+        self, listing_id, mode: str, district: str, title: str, price_text: str
+    ) -> tuple[float, float, int] | None:
+        """score() на момент первого учёта объявления, дальше — она же.
+
+        Оценка считается до того, как цена попала в окно, поэтому объявление
+        не сравнивается с собой, и все получатели видят одну оценку.
+        """
+        score = self._seen.get(listing_id, _UNSCORED)
+        if score is not _UNSCORED:
+            return score
+        score = self.score(mode, district, title, price_text)
+        if listing_id in self._seen:
+            self._seen[listing_id] = score
+        elif self.observe(listing_id, mode, district, title, price_text):
+            self._seen[listing_id] = score
+        return score
+
+    def take_pending(self) -> list[tuple]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    def restore_pending(self, rows: list[tuple]) -> None:
+        self._pending = (rows + self._pending)[-PENDING_LIMIT:]
+
+    def __len__(self) -> int:
+        return sum(s.size for s in self._series.values())
+
+
+PRICES = PriceStats()
+
+
+def format_price_score(deviation: float, samples: int) -> str:
+    pct = abs(deviation) * 100
+    if pct < 5:
+        verdict = "в рынке"
+    elif deviation < 0:
+        verdict = f"на {pct:.0f}% ниже рынка"
+    else:
+        verdict = f"на {pct:.0f}% выше рынка"
+    return f"📊 Цена за м² {verdict} (медиана {samples} похожих за {WINDOW_DAYS} дн.)"
+
+
+async def load_prices(price_repo) -> None:
+    since = time.time() - PRICES.window
+    try:
+        loaded = PRICES.load(await price_repo.load_since(since))
+        logger.info("Price stats: loaded %d listings", loaded)
+    except Exception as e:
+        logger.warning("Price stats load failed: %s", e)
+
+
+async def price_flush_loop(price_repo, interval: int = 30) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush_prices(price_repo)
+
+
+async def flush_prices(price_repo) -> None:
+    rows = PRICES.take_pending()
+    if not rows:
+        return
+    try:
+        await price_repo.add_many(rows)
+    except Exception as e:
+        logger.warning("Price stats flush failed: %s", e)
+        PRICES.restore_pending(rows)
@@ -1,50 +1,206 @@
-"""Очередь рассылки с rate limit и приоритетом PRO."""
+"""Очередь рассылки с rate limit и приоритетом PRO.
+
+Одна очередь на процесс (get_send_queue()): через неё идут и уведомления
+монитора, и фоновые рассылки админа (copy_message с низшим приоритетом).
+Несколько воркеров отправляют параллельно. Слоты по времени раздают два
+лимита: RATE_LIMIT_PER_SECOND для уведомлений и BROADCAST_RATE_PER_SECOND
+для рассылок и проб — медленный ответ Telegram одному чату не тормозит
+остальных. В один чат — не чаще раза в PER_CHAT_INTERVAL: сообщение,
+пришедшее раньше, откладывается обратно в очередь, воркер не ждёт.
+Мёртвые чаты (chat_status.CHATS) очередь отмечает по ошибкам отправки и
+дальше пропускает, не тратя на них слоты.
+"""
 import asyncio
+import itertools
 import logging
-from dataclasses import dataclass
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable
+
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.metrics import QUEUE_DEPTH, SEND_SECONDS, SEND_FAILURES
+from app.services.chat_status import CHATS, classify_error
+from app.services.sla import SLA, DeliveryTrace
+from app.services.stats_buffer import STATS
 
 logger = logging.getLogger(__name__)
 
+BROADCAST_PRIORITY = 3
+PROBE_PRIORITY = 4
+
+# Telegram: примерно одно сообщение в секунду на чат
+PER_CHAT_INTERVAL = 1.0
+CHAT_SLOTS_LIMIT = 50_000
+
 
 @dataclass(order=True)
 class QueueItem:
-    priority: int  # 0 = PRO (высший), 1 = STANDARD, 2 = FREE
-    user_id: int
-    text: str
+    priority: int  # 0 = PRO (высший), 1 = STANDARD, 2 = FREE, 3 = рассылка, 4 = проба
+    seq: int  # FIFO внутри приоритета
+    user_id: int = field(compare=False)
+    text: str = field(default="", compare=False)
+    trace: DeliveryTrace | None = field(default=None, compare=False)
+    # (from_chat_id, message_id) — copy_message вместо send_message
+    copy_from: tuple[int, int] | None = field(default=None, compare=False)
+    on_done: Callable[[bool], None] | None = field(default=None, compare=False)
+    # send_chat_action мёртвому чату: жив ли он снова
+    probe: bool = field(default=False, compare=False)
 
 
 class SendQueue:
-    """Очередь с rate limit 1 msg/sec и приоритетом PRO."""
+    """Очередь с rate limit, несколькими воркерами и приоритетом PRO."""
 
-    def __init__(self, bot: Bot, rate_per_sec: float = 1.0):
+    def __init__(
+        self,
+        bot: Bot,
+        rate_per_sec: float = 1.0,
+        workers: int = 1,
+        broadcast_rate_per_sec: float | None = None,
+    ):
         self._bot = bot
         self._rate = rate_per_sec
+        self._broadcast_rate = broadcast_rate_per_sec or rate_per_sec
+        self._workers = max(1, workers)
         self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         self._running = False
         self._retry_count = 3
+        self._depth: dict[int, int] = defaultdict(int)
+        self._seq = itertools.count()
+        self._next_slot = 0.0
+        self._next_broadcast_slot = 0.0
+        # user_id -> когда в этот чат можно писать снова
+        self._chat_slots: dict[int, float] = {}
+
+    @property
+    def bot(self) -> Bot:
+        return self._bot
 
     def _priority(self, is_pro: bool) -> int:
         return 0 if is_pro else 1
 
-    async def put(self, user_id: int, text: str, is_pro: bool = False) -> None:
-        item = QueueItem(
-            priority=self._priority(is_pro),
-            user_id=user_id,
-            text=text,
+    def _enqueue(self, item: QueueItem) -> None:
+        self._queue.put_nowait(item)
+        self._depth[item.priority] += 1
+        QUEUE_DEPTH.set(self._depth[item.priority], item.priority)
+
+    async def put(
+        self,
+        user_id: int,
+        text: str,
+        is_pro: bool = False,
+        trace: DeliveryTrace | None = None,
+    ) -> None:
+        if trace is not None:
+            trace.enqueued_at = time.time()
+        self._enqueue(
+            QueueItem(
+                priority=self._priority(is_pro),
+                seq=next(self._seq),
+                user_id=user_id,
+                text=text,
+                trace=trace,
+            )
         )
-        await self._queue.put(item)
 
-    async def _send_with_retry(self, user_id: int, text: str) -> bool:
-        for attempt in range(self._retry_count):
+    def put_copy(
+        self,
+        user_id: int,
+        from_chat_id: int,
+        message_id: int,
+        on_done: Callable[[bool], None] | None = None,
+    ) -> None:
+        """Копия сообщения для рассылки; on_done(ok) вызывается после попытки."""
+        self._enqueue(
+            QueueItem(
+                priority=BROADCAST_PRIORITY,
+                seq=next(self._seq),
+                user_id=user_id,
+                copy_from=(from_chat_id, message_id),
+                on_done=on_done,
+            )
+        )
+
+    def put_probe(self, user_id: int) -> None:
+        self._enqueue(
+            QueueItem(priority=PROBE_PRIORITY, seq=next(self._seq), user_id=user_id, probe=True)
+        )
+
+    def depth(self) -> dict[int, int]:
+        return dict(self._depth)
+
+    async def _throttle(self, item: QueueItem) -> None:
+        """Следующий слот отправки своего лимита, общий для всех воркеров.
+
+        Чат занимается от этого слота, а не от момента взятия из очереди:
+        при длинной очереди ожидание слота дольше PER_CHAT_INTERVAL.
+        """
+        now = time.monotonic()
+        if item.priority >= BROADCAST_PRIORITY:
+            slot = max(now, self._next_broadcast_slot)
+            self._next_broadcast_slot = slot + 1.0 / self._broadcast_rate
+        else:
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self._rate
+        self._book_chat(item.user_id, slot)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _chat_wait(self, user_id: int) -> float:
+        """0 — в чат уже можно писать, иначе сколько ещё ждать."""
+        return max(0.0, self._chat_slots.get(user_id, 0.0) - time.monotonic())
+
+    def _book_chat(self, user_id: int, slot: float) -> None:
+        if len(self._chat_slots) >= CHAT_SLOTS_LIMIT:
+            now = time.monotonic()
+            self._chat_slots = {uid: t for uid, t in self._chat_slots.items() if t > now}
+        self._chat_slots[user_id] = slot + PER_CHAT_INTERVAL
+
+    async def _deliver(self, item: QueueItem) -> None:
+        if item.probe:
+            await self._bot.send_chat_action(item.user_id, "typing")
+        elif item.copy_from is not None:
+            from_chat_id, message_id = item.copy_from
+            await self._bot.copy_message(
+                chat_id=item.user_id,
+                from_chat_id=from_chat_id,
+                message_id=message_id,
+            )
+        else:
+            await self._bot.send_message(item.user_id, item.text)
+
+    def _hold(self, item: QueueItem, seconds: float) -> None:
+        """Flood control: слоты своего лимита не раньше чем через seconds."""
+        until = time.monotonic() + seconds
+        if item.priority >= BROADCAST_PRIORITY:
+            self._next_broadcast_slot = max(self._next_broadcast_slot, until)
+        else:
+            self._next_slot = max(self._next_slot, until)
+
+    async def _send_with_retry(self, item: QueueItem) -> bool:
+        attempt = 0
+        while attempt < self._retry_count:
             try:
-                await self._bot.send_message(user_id, text)
+                started = time.perf_counter()
+                await self._deliver(item)
+                SEND_SECONDS.observe(time.perf_counter() - started)
                 return True
+            except TelegramRetryAfter as e:
+                # ждут все воркеры этого лимита; попыткой это не считается
+                logger.warning(f"Send to {item.user_id}: flood control, retry in {e.retry_after}s")
+                self._hold(item, e.retry_after)
+                await self._throttle(item)
             except Exception as e:
-                logger.warning(f"Send to {user_id} attempt {attempt + 1}: {e}")
-                if "blocked" in str(e).lower() or "deactivated" in str(e).lower():
+                status = classify_error(e)
+                if status is not None:
+                    CHATS.mark_dead(item.user_id, status, str(e))
                     return False
+                logger.warning(f"Send to {item.user_id} attempt {attempt + 1}: {e}")
                 await asyncio.sleep(2 ** attempt)
+                attempt += 1
+        SEND_FAILURES.inc()
         return False
 
     async def _worker(self, stats_callback=None) -> None:
@@ -56,16 +212,51 @@ class SendQueue:
                 )
             except asyncio.TimeoutError:
                 continue
+            self._depth[item.priority] -= 1
+            QUEUE_DEPTH.set(self._depth[item.priority], item.priority)
 
-            ok = await self._send_with_retry(item.user_id, item.text)
+            if CHATS.is_dead(item.user_id) and not item.probe:
+                ok = False
+            else:
+                wait = self._chat_wait(item.user_id)
+                if wait > 0:
+                    asyncio.get_running_loop().call_later(wait, self._enqueue, item)
+                    continue
+                await self._throttle(item)
+                ok = await self._send_with_retry(item)
+            if item.on_done is not None:
+                item.on_done(ok)
+            if item.probe:
+                if ok:
+                    CHATS.mark_alive(item.user_id)
+                continue
+            if item.copy_from is not None:
+                # рассылки не считаются доставками монитора
+                continue
+            if ok and item.trace is not None:
+                SLA.record(item.trace)
+            if ok:
+                STATS.record_sent(item.trace.tier if item.trace else None)
             if ok and stats_callback:
                 await stats_callback(1)
 
-            await asyncio.sleep(1.0 / self._rate)
-
     def start(self, stats_callback=None) -> None:
         self._running = True
-        asyncio.create_task(self._worker(stats_callback))
+        for _ in range(self._workers):
+            asyncio.create_task(self._worker(stats_callback))
 
     def stop(self) -> None:
         self._running = False
+
+
+_queue: SendQueue | None = None
+
+
+def get_send_queue() -> SendQueue | None:
+    """Очередь, запущенная run_monitor; None, пока монитор не стартовал."""
+    return _queue
+
+
+def set_send_queue(queue: SendQueue | None) -> None:
+    global _queue
+    _queue = queue
@@ -0,0 +1,49 @@
+"""Обслуживание sent_listings: партиции вперёд и удаление старых месяцев.
+
+sent_listings разбита по месяцам (migrations/006). Раз в RETENTION_INTERVAL
+job заранее создаёт партицию следующего месяца, чтобы вставки не падали в
+DEFAULT, и удаляет партиции старше SENT_RETENTION_MONTHS целиком — DROP
+вместо DELETE, без раздувания индексов и VACUUM. Заодно чистит
+user_daily_counts (для лимита нужен только сегодняшний день) и
+listing_prices старше окна медиан.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from app.config import Config
+from app.services.price_stats import WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+RETENTION_INTERVAL = 6 * 3600
+DAILY_COUNTS_KEEP_DAYS = 7
+
+
+def _months_back(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def run_retention(sent_repo, config: Config, price_repo=None) -> None:
+    created = await sent_repo.ensure_partitions(months_ahead=1)
+    cutoff = _months_back(date.today(), config.SENT_RETENTION_MONTHS)
+    dropped = await sent_repo.drop_partitions_before(cutoff)
+    pruned = await sent_repo.prune_daily_counts(date.today() - timedelta(days=DAILY_COUNTS_KEEP_DAYS))
+    logger.info(
+        "sent_listings retention: partitions %s, dropped %s, daily counts pruned %d",
+        created, dropped or "none", pruned,
+    )
+    if price_repo is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=WINDOW_DAYS)
+        prices = await price_repo.prune_before(cutoff)
+        logger.info("listing_prices retention: pruned %d", prices)
+
+
+async def retention_loop(sent_repo, config: Config, price_repo=None) -> None:
+    while True:
+        try:
+            await run_retention(sent_repo, config, price_repo)
+        except Exception as e:
+            logger.warning("sent_listings retention failed: %s", e)
+        await asyncio.sleep(RETENTION_INTERVAL)
@@ -0,0 +1,169 @@
+"""SLA доставки: от первого появления объявления до отправки в Telegram.
+
+Для каждой доставки фиксируются четыре отметки: first_seen (монитор впервые
+увидел объявление), matched (прошло фильтры пользователя), enqueued и sent.
+Задержки копятся в фиксированных корзинах по тарифам — такие гистограммы
+складываются между сбросами и процессами, поэтому в `stats` хранится
+агрегат, а p50/p95/p99 считаются при чтении.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from app.metrics import DELIVERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# верхние границы корзин, секунды; последняя корзина — «больше 3600»
+SLA_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1200, 1800, 3600)
+
+# сколько помнить время первого появления объявления
+FIRST_SEEN_TTL = 24 * 3600
+
+
+@dataclass
+class DeliveryTrace:
+    tier: str
+    first_seen: float
+    matched_at: float
+    enqueued_at: float = 0.0
+
+
+@dataclass
+class TierHistogram:
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(SLA_BUCKETS) + 1))
+    count: int = 0
+    sum: float = 0.0
+    queue_sum: float = 0.0
+
+    def add(self, total: float, queued: float) -> None:
+        idx = len(SLA_BUCKETS)
+        for i, bound in enumerate(SLA_BUCKETS):
+            if total <= bound:
+                idx = i
+                break
+        self.buckets[idx] += 1
+        self.count += 1
+        self.sum += total
+        self.queue_sum += queued
+
+    def merge(self, other: dict) -> None:
+        for i, n in enumerate(other.get("buckets", [])[: len(self.buckets)]):
+            self.buckets[i] += n
+        self.count += other.get("count", 0)
+        self.sum += other.get("sum", 0.0)
+        self.queue_sum += other.get("queue_sum", 0.0)
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": self.buckets,
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "queue_sum": round(self.queue_sum, 3),
+        }
+
+    def percentile(self, q: float) -> float:
+        """Оценка квантиля с линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            if n and cumulative + n >= rank:
+                lower = SLA_BUCKETS[i - 1] if i > 0 else 0
+                if i >= len(SLA_BUCKETS):
+                    return float(lower)
+                upper = SLA_BUCKETS[i]
+                return lower + (upper - lower) * (rank - cumulative) / n
+            cumulative += n
+        return float(SLA_BUCKETS[-1])
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "avg_queue": self.queue_sum / self.count if self.count else 0.0,
+        }
+
+
+class SlaTracker:
+    def __init__(self):
+        self._first_seen: dict[int, float] = {}
+        # день доставки -> тариф -> гистограмма
+        self._pending: dict[date, dict[str, TierHistogram]] = {}
+        self._last_prune = time.time()
+
+    def first_seen(self, listing_id: int) -> float:
+        """Время, когда монитор впервые увидел объявление (в этом процессе)."""
+        now = time.time()
+        seen = self._first_seen.setdefault(listing_id, now)
+        if now - self._last_prune > 600:
+            self._prune(now)
+        return seen
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - FIRST_SEEN_TTL
+        self._first_seen = {k: v for k, v in self._first_seen.items() if v > cutoff}
+        self._last_prune = now
+
+    def record(self, trace: DeliveryTrace, sent_at: float | None = None) -> None:
+        sent_at = sent_at or time.time()
+        total = max(0.0, sent_at - trace.first_seen)
+        queued = max(0.0, sent_at - trace.enqueued_at) if trace.enqueued_at else 0.0
+        day = self._pending.setdefault(date.fromtimestamp(sent_at), {})
+        day.setdefault(trace.tier, TierHistogram()).add(total, queued)
+
+        DELIVERY_SECONDS.observe(total, trace.tier, "total")
+        DELIVERY_SECONDS.observe(max(0.0, trace.matched_at - trace.first_seen), trace.tier, "match")
+        DELIVERY_SECONDS.observe(queued, trace.tier, "queue")
+
+    def take_pending(self) -> dict[date, dict[str, dict]]:
+        """Забирает накопленное по дням доставки."""
+        pending = {
+            day: {tier: h.to_dict() for tier, h in tiers.items() if h.count}
+            for day, tiers in self._pending.items()
+        }
+        self._pending = {}
+        return {day: tiers for day, tiers in pending.items() if tiers}
+
+    def restore_pending(self, day: date, pending: dict[str, dict]) -> None:
+        """Вернуть несброшенные данные дня обратно (ошибка БД при сбросе)."""
+        tiers = self._pending.setdefault(day, {})
+        for tier, data in pending.items():
+            tiers.setdefault(tier, TierHistogram()).merge(data)
+
+    def pending_snapshot(self, day: date | None = None) -> dict[str, dict]:
+        """Ещё не сброшенное за день (по умолчанию сегодня)."""
+        tiers = self._pending.get(day or date.today(), {})
+        return {tier: h.to_dict() for tier, h in tiers.items() if h.count}
+
+
+SLA = SlaTracker()
+
+
+def summarize(sla: dict[str, dict]) -> dict[str, dict]:
+    result = {}
+    for tier, data in sla.items():
+        h = TierHistogram()
+        h.merge(data)
+        result[tier] = h.summary()
+    return result
+
+
+async def sla_flush_loop(stats_repo, interval: int = 60) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush_sla(stats_repo)
+
+
+async def flush_sla(stats_repo) -> None:
+    for day, pending in SLA.take_pending().items():
+        try:
+            await stats_repo.merge_sla(day, pending)
+        except Exception as e:
+            logger.warning("SLA flush for %s failed: %s", day, e)
+            SLA.restore_pending(day, pending)
@@ -0,0 +1,117 @@
+"""Буфер дневных счётчиков `stats`.
+
+Раньше каждая успешная отправка делала upsert в строку `stats` за сегодня —
+одна горячая строка, на которой конкурируют все воркеры. Теперь счётчики
+копятся в памяти и раз в STATS_FLUSH_INTERVAL секунд (и при остановке)
+уходят в БД одним upsert на каждый день, к которому относятся события —
+сброс сразу после полуночи не переносит вчерашнее на сегодня. При падении
+процесса теряется не больше одного интервала.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("free", "standard", "pro")
+
+
+class _DayCounters:
+    __slots__ = ("messages_sent", "new_users", "delivered", "active", "active_restored", "active_flushed")
+
+    def __init__(self):
+        self.messages_sent = 0
+        self.new_users = 0
+        self.delivered: Counter[str] = Counter()
+        # уникальные пользователи за день; в БД уходит размер множества
+        self.active: set[int] = set()
+        # размер, вернувшийся после неудачного сброса (множество могли уже отбросить)
+        self.active_restored = 0
+        self.active_flushed = 0
+
+    def active_users(self) -> int:
+        return max(len(self.active), self.active_restored)
+
+
+class StatsBuffer:
+    def __init__(self):
+        self._days: dict[date, _DayCounters] = {}
+
+    def _day(self, day: date | None = None) -> _DayCounters:
+        day = day or date.today()
+        counters = self._days.get(day)
+        if counters is None:
+            counters = self._days[day] = _DayCounters()
+        return counters
+
+    def record_sent(self, tier: str | None = None) -> None:
+        counters = self._day()
+        counters.messages_sent += 1
+        if tier in TIERS:
+            counters.delivered[tier] += 1
+
+    def record_new_user(self) -> None:
+        self._day().new_users += 1
+
+    def touch_user(self, user_id: int) -> None:
+        self._day().active.add(user_id)
+
+    def take_pending(self) -> dict[date, dict]:
+        """Забирает накопленное по дням, к которым относятся события."""
+        today = date.today()
+        taken = {}
+        for day, counters in list(self._days.items()):
+            pending = {
+                "messages_sent": counters.messages_sent,
+                "new_users": counters.new_users,
+                "active_users": counters.active_users(),
+                **{f"delivered_{t}": counters.delivered[t] for t in TIERS},
+            }
+            changed = any(v for k, v in pending.items() if k != "active_users")
+            if changed or pending["active_users"] != counters.active_flushed:
+                taken[day] = pending
+            counters.messages_sent = 0
+            counters.new_users = 0
+            counters.delivered = Counter()
+            counters.active_flushed = pending["active_users"]
+            if day != today:
+                # прошедший день больше не пополняется
+                del self._days[day]
+        return taken
+
+    def restore_pending(self, day: date, pending: dict) -> None:
+        """Вернуть несброшенные счётчики дня (ошибка БД при сбросе)."""
+        counters = self._day(day)
+        counters.messages_sent += pending["messages_sent"]
+        counters.new_users += pending["new_users"]
+        for t in TIERS:
+            counters.delivered[t] += pending[f"delivered_{t}"]
+        counters.active_restored = max(counters.active_restored, pending["active_users"])
+        counters.active_flushed = 0
+
+    def pending_snapshot(self) -> dict:
+        counters = self._days.get(date.today()) or _DayCounters()
+        return {
+            "messages_sent": counters.messages_sent,
+            "new_users": counters.new_users,
+            "active_users": counters.active_users(),
+        }
+
+
+STATS = StatsBuffer()
+
+
+async def stats_flush_loop(stats_repo, interval: int = 10) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush_stats(stats_repo)
+
+
+async def flush_stats(stats_repo) -> None:
+    for day, pending in STATS.take_pending().items():
+        try:
+            await stats_repo.add_counters(day, pending)
+        except Exception as e:
+            logger.warning("Stats flush for %s failed: %s", day, e)
+            STATS.restore_pending(day, pending)
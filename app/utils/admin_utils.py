@@ -1,43 +1,24 @@
 """Admin utility functions and queries."""
 import asyncpg
 from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from app.database.access_cache import ACCESS
+from app.database.rc_cache import RC_CATALOG
+from app.database.repositories import LIVE_CHAT_SQL, StatsRepository
+from app.database.user_cache import USER_CACHE
 
 
 async def get_user_stats(pool: asyncpg.Pool) -> dict:
-    """Get comprehensive user statistics."""
-    users_total = await pool.fetchval("SELECT COUNT(*) FROM users") or 0
-    
-    free = await pool.fetchval(
-        "SELECT COUNT(*) FROM users WHERE subscription_type = 'free'"
-    ) or 0
-    
-    standard = await pool.fetchval(
-        "SELECT COUNT(*) FROM users WHERE subscription_type = 'standard'"
-    ) or 0
-    
-    pro = await pool.fetchval(
-        "SELECT COUNT(*) FROM users WHERE subscription_type = 'pro'"
-    ) or 0
-    
-    active_subs = await pool.fetchval(
-        """
-        SELECT COUNT(*) FROM users
-        WHERE subscription_type IN ('standard', 'pro') 
-        AND subscription_until > NOW()
-        """
-    ) or 0
-    
-    users_today = await pool.fetchval(
-        "SELECT COUNT(*) FROM users WHERE created_at > NOW() - INTERVAL '24 hours'"
-    ) or 0
-    
+    """Get comprehensive user statistics (shared cached summary)."""
+    summary = await StatsRepository(pool).get_summary()
     return {
-        "total": users_total,
-        "free": free,
-        "standard": standard,
-        "pro": pro,
-        "active_subs": active_subs,
-        "new_today": users_today,
+        "total": summary["users_total"],
+        "free": summary["free"],
+        "standard": summary["standard"],
+        "pro": summary["pro"],
+        "active_subs": summary["active_subs"],
+        "new_today": summary["new_24h"],
     }
 
 
@@ -69,41 +50,67 @@ async def get_rc_stats(pool: asyncpg.Pool) -> dict:
     }
 
 
-async def get_broadcast_targets(
+BROADCAST_CHUNK = 1000
+
+# условия выборки для сегментов рассылки
+BROADCAST_SEGMENTS = {
+    "all": "TRUE",
+    "pro": "subscription_type = 'pro' AND subscription_until > NOW()",
+    "standard": "subscription_type = 'standard' AND subscription_until > NOW()",
+    "free": "subscription_type = 'free'",
+    "active": "notifications_enabled = TRUE",
+}
+
+
+async def iter_broadcast_targets(
     pool: asyncpg.Pool,
-    target: str = "all"
-) -> list[int]:
-    """Get list of user IDs for broadcast."""
-    if target == "all":
-        users = await pool.fetch("SELECT user_id FROM users")
-    elif target == "pro":
-        users = await pool.fetch(
-            """
-            SELECT user_id FROM users 
-            WHERE subscription_type = 'pro'
-            AND subscription_until > NOW()
-            """
-        )
-    elif target == "standard":
-        users = await pool.fetch(
-            """
-            SELECT user_id FROM users 
-            WHERE subscription_type = 'standard'
-            AND subscription_until > NOW()
-            """
-        )
-    elif target == "free":
-        users = await pool.fetch(
-            "SELECT user_id FROM users WHERE subscription_type = 'free'"
-        )
-    elif target == "active":
-        users = await pool.fetch(
-            "SELECT user_id FROM users WHERE notifications_enabled = TRUE"
-        )
-    else:
-        users = []
-    
-    return [u["user_id"] for u in users]
+    target: str = "all",
+    after_user_id: int = 0,
+    chunk: int = BROADCAST_CHUNK,
+) -> AsyncIterator[list[int]]:
+    """Stream broadcast user IDs in user_id order, chunk by chunk, skipping dead chats.
+
+    Keyset pagination over the users.user_id index: each page is a short
+    query, so no connection or transaction is held while the chunk is sent.
+    """
+    where = BROADCAST_SEGMENTS.get(target)
+    if where is None:
+        return
+    query = (
+        f"SELECT user_id FROM users WHERE {where} AND {LIVE_CHAT_SQL}"
+        " AND user_id > $1 ORDER BY user_id LIMIT $2"
+    )
+    while True:
+        rows = await pool.fetch(query, after_user_id, chunk)
+        if not rows:
+            return
+        user_ids = [r["user_id"] for r in rows]
+        yield user_ids
+        if len(user_ids) < chunk:
+            return
+        after_user_id = user_ids[-1]
+
+
+async def count_broadcast_targets(pool: asyncpg.Pool, target: str = "all") -> int:
+    """Audience size for a broadcast segment."""
+    where = BROADCAST_SEGMENTS.get(target)
+    if where is None:
+        return 0
+    return await pool.fetchval(f"SELECT COUNT(*) FROM users WHERE {where} AND {LIVE_CHAT_SQL}") or 0
+
+
+async def add_rc(pool: asyncpg.Pool, name: str, category: str, priority: int) -> None:
+    """Add an active residential complex."""
+    await pool.execute(
+        """
+        INSERT INTO residential_complexes (name, category, priority, is_active)
+        VALUES ($1, $2, $3, TRUE)
+        """,
+        name,
+        category,
+        priority,
+    )
+    RC_CATALOG.invalidate()
 
 
 async def toggle_rc_status(pool: asyncpg.Pool, rc_id: int) -> bool:
@@ -123,6 +130,7 @@ async def toggle_rc_status(pool: asyncpg.Pool, rc_id: int) -> bool:
         new_status,
         rc_id,
     )
+    RC_CATALOG.invalidate()
     
     return new_status
 
@@ -148,6 +156,7 @@ async def change_rc_priority(
         new_priority,
         rc_id,
     )
+    RC_CATALOG.invalidate()
     
     return new_priority
 
@@ -185,4 +194,7 @@ async def cleanup_expired_subscriptions(pool: asyncpg.Pool) -> int:
     
     # Extract count from result string like "UPDATE 5"
     count = int(result.split()[-1]) if result else 0
+    if count:
+        USER_CACHE.clear()
+        ACCESS.clear()
     return count
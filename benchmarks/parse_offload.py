@@ -0,0 +1,132 @@
+"""Задержка обработки апдейтов при насыщенном мониторе.
+
+Сравнивает разбор HTML прямо в event loop (inline) с разбором в пуле
+потоков и процессов. Пока «монитор» непрерывно разбирает страницы,
+зонд имитирует обработчик апдейтов aiogram и меряет, на сколько позже
+запланированного он получает управление.
+
+    python -m benchmarks.parse_offload --seconds 10 --monitors 6
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.config import Config
+from app.services.parser import KrishaParser, parse_listings_html, shutdown_parse_executor
+
+CARD = """
+<div class="a-card" data-id="{id}">
+  <div class="a-card__header">
+    <a class="a-card__title" href="/a/show/{id}">{rooms}-комнатная квартира · {area} м² · {floor}/9 этаж</a>
+    <div class="a-card__price">{price} 〒</div>
+  </div>
+  <div class="a-card__subtitle">Алматы, Бостандыкский р-н, мкр Орбита-{floor}</div>
+  <div class="a-card__text-preview">{owner} Квартира после ремонта, мебель и техника, рядом школа, парк и остановки.</div>
+  <div class="a-card__footer"><span class="a-card__stats-item">{views} просмотров</span></div>
+</div>
+"""
+
+
+def build_page(cards: int = 20, padding_kb: int = 200) -> bytes:
+    body = "".join(
+        CARD.format(
+            id=680000000 + i,
+            rooms=1 + i % 4,
+            area=35 + i * 3,
+            floor=1 + i % 9,
+            price=f"{150 + i * 7} 000",
+            owner="от хозяина" if i % 3 == 0 else "",
+            views=100 + i,
+        )
+        for i in range(cards)
+    )
+    # реальная выдача Krisha — это ~200–400 КБ разметки вокруг карточек
+    filler = "<div class='filler'>" + "<span>x</span>" * (padding_kb * 60) + "</div>"
+    return f"<html><body>{filler}{body}</body></html>".encode("utf-8")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def _probe(lags: list[float], stop: asyncio.Event, period: float) -> None:
+    """Имитация обработчика апдейтов: должен просыпаться каждые `period` сек."""
+    while not stop.is_set():
+        scheduled = time.perf_counter() + period
+        await asyncio.sleep(period)
+        lags.append((time.perf_counter() - scheduled) * 1000)
+
+
+async def _monitor(mode: str, parser: KrishaParser, page: bytes, stop: asyncio.Event, counter: list[int]) -> None:
+    while not stop.is_set():
+        if mode == "inline":
+            parse_listings_html(page, "utf-8")
+            await asyncio.sleep(0)
+        else:
+            await parser._parse_html(page, "utf-8")
+        counter[0] += 1
+
+
+async def run_mode(mode: str, seconds: float, monitors: int, workers: int, page: bytes) -> dict:
+    config = Config(
+        TOKEN="bench",
+        DATABASE_URL="",
+        PARSER_EXECUTOR=mode,
+        PARSER_WORKERS=workers,
+    )
+    parser = KrishaParser(config)
+    if mode != "inline":
+        # прогрев пула, чтобы старт процессов не попал в замер
+        await asyncio.gather(*(parser._parse_html(page, "utf-8") for _ in range(workers)))
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    counter = [0]
+    tasks = [asyncio.create_task(_probe(lags, stop, 0.02))]
+    tasks += [
+        asyncio.create_task(_monitor(mode, parser, page, stop, counter))
+        for _ in range(monitors)
+    ]
+
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    shutdown_parse_executor()
+
+    return {
+        "mode": mode,
+        "pages_per_s": counter[0] / seconds,
+        "p50": statistics.median(lags) if lags else 0.0,
+        "p95": _percentile(lags, 0.95),
+        "p99": _percentile(lags, 0.99),
+        "max": max(lags) if lags else 0.0,
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--monitors", type=int, default=6, help="параллельных разборов")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--cards", type=int, default=20)
+    ap.add_argument("--modes", default="inline,thread,process")
+    args = ap.parse_args()
+
+    page = build_page(args.cards)
+    print(f"page: {len(page) / 1024:.0f} KB, {args.cards} cards, monitors={args.monitors}, workers={args.workers}")
+    print(f"{'mode':<8} {'pages/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode in args.modes.split(","):
+        r = await run_mode(mode.strip(), args.seconds, args.monitors, args.workers, page)
+        print(
+            f"{r['mode']:<8} {r['pages_per_s']:>8.1f} {r['p50']:>8.1f} "
+            f"{r['p95']:>8.1f} {r['p99']:>8.1f} {r['max']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
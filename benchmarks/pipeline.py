@@ -0,0 +1,214 @@
+"""Сквозной офлайн-бенчмарк монитора: выдача → матчинг → рассылка.
+
+Поднимает локальную заглушку krisha.kz (сохранённые страницы из fixtures)
+и фейковый Telegram Bot API, засевает в PostgreSQL синтетических
+пользователей и гоняет настоящий run_monitor заданное время.
+
+    BENCH_DATABASE_URL=postgresql://postgres@localhost/bench?sslmode=disable \\
+        python -m benchmarks.pipeline --users 10000 --seconds 60
+
+Пользователи создаются в зарезервированном диапазоне user_id и
+удаляются перед каждым прогоном; остальные данные базы не трогаются.
+Никаких внешних запросов — результаты сравнимы между коммитами.
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psutil
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.config import Config
+from app.database.connection import close_db, get_pool, init_db
+from app.metrics import CYCLE_SECONDS, DB_QUERY_SECONDS, REGISTRY
+from app.services.monitor import DISTRICT_MAP, run_monitor
+from app.services.parser import shutdown_parse_executor
+from benchmarks.stand_ins import FakeTelegram, KrishaStandIn
+
+BENCH_USER_BASE = 9_000_000_000
+BENCH_TOKEN = "123456:bench"
+# таблицы с данными синтетических пользователей; users — последней
+BENCH_TABLES = ("sent_listings", "user_daily_counts", "users")
+
+USER_COLUMNS = (
+    "user_id", "username", "mode", "rooms", "district", "subscription_type",
+    "subscription_until", "trial_until", "accepted_terms",
+    "notifications_enabled", "from_owner",
+)
+
+
+def synthetic_users(n: int, split: tuple[float, float, float], seed: int = 1) -> list[tuple]:
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    districts = list(DISTRICT_MAP)
+    rows = []
+    for i in range(n):
+        tier = rnd.choices(("free", "standard", "pro"), weights=split)[0]
+        paid = tier != "free"
+        rows.append((
+            BENCH_USER_BASE + i,
+            f"bench{i}",
+            "rent" if rnd.random() < 0.75 else "sale",
+            rnd.randint(1, 4),
+            rnd.choice(districts),
+            tier,
+            now + timedelta(days=30) if paid else None,
+            None if paid else now + timedelta(hours=2),
+            True,
+            rnd.random() < 0.95,
+            rnd.random() < 0.2,
+        ))
+    return rows
+
+
+async def seed(dsn: str, rows: list[tuple]) -> None:
+    pool = await get_pool(dsn)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            for table in BENCH_TABLES:
+                await conn.execute(f"DELETE FROM {table} WHERE user_id >= $1", BENCH_USER_BASE)
+            await conn.copy_records_to_table("users", records=rows, columns=USER_COLUMNS)
+
+
+async def cleanup(dsn: str) -> None:
+    pool = await get_pool(dsn)
+    for table in BENCH_TABLES:
+        await pool.execute(f"DELETE FROM {table} WHERE user_id >= $1", BENCH_USER_BASE)
+
+
+async def sample_rss(peak: dict, interval: float = 0.5) -> None:
+    # пул разбора — отдельные процессы, поэтому считаем RSS вместе с детьми
+    proc = psutil.Process()
+    while True:
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        peak["rss"] = max(peak.get("rss", 0), total)
+        await asyncio.sleep(interval)
+
+
+def _total(hist) -> tuple[int, float]:
+    count = total = 0
+    for c, s in hist.totals().values():
+        count += c
+        total += s
+    return count, total
+
+
+async def main(args: argparse.Namespace) -> None:
+    dsn = args.dsn or os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        sys.exit("нужен --dsn или BENCH_DATABASE_URL")
+
+    krisha = KrishaStandIn(new_per_minute=args.new_per_minute, latency_ms=args.krisha_latency_ms)
+    telegram = FakeTelegram(latency_ms=args.telegram_latency_ms)
+    krisha_url = await krisha.start()
+    telegram_url = await telegram.start()
+
+    config = Config(
+        TOKEN=BENCH_TOKEN,
+        DATABASE_URL=dsn,
+        KRISHA_BASE_URL=krisha_url,
+        FREE_CHECK_INTERVAL=args.free_interval,
+        STANDARD_CHECK_INTERVAL=args.standard_interval,
+        PRO_CHECK_INTERVAL=args.pro_interval,
+        PARSER_RETRY_COUNT=1,
+        PARSER_DELAY_MIN=0.0,
+        PARSER_DELAY_MAX=0.0,
+        PARSER_EXECUTOR=args.executor,
+        RATE_LIMIT_PER_SECOND=args.rate,
+        LOOP_MONITOR_ENABLED=False,
+    )
+
+    split = tuple(float(x) for x in args.split.split(","))
+    await init_db(dsn)
+    started = time.perf_counter()
+    await seed(dsn, synthetic_users(args.users, split))
+    print(f"seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    # метрики нужны для подсчёта, HTTP-эндпоинт не поднимаем
+    REGISTRY.enabled = True
+    bot = Bot(BENCH_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(telegram_url)))
+
+    peak: dict = {}
+    rss_task = asyncio.create_task(sample_rss(peak))
+    before = set(asyncio.all_tasks())
+    started = time.perf_counter()
+    monitor = asyncio.create_task(run_monitor(bot, config))
+    await asyncio.sleep(args.seconds)
+    elapsed = time.perf_counter() - started
+
+    # run_monitor запускает воркер очереди и flush SLA отдельными задачами
+    leftovers = [t for t in asyncio.all_tasks() if t not in before and t is not asyncio.current_task()]
+    for task in [monitor, rss_task, *leftovers]:
+        task.cancel()
+    await asyncio.gather(monitor, rss_task, *leftovers, return_exceptions=True)
+
+    cycles, _ = _total(CYCLE_SECONDS)
+    queries, query_time = _total(DB_QUERY_SECONDS)
+    # MATCHES_PER_LISTING пишется только в конце цикла, а на 10k пользователей
+    # цикл может не уложиться в прогон — считаем совпадения по sent_listings
+    pool = await get_pool(dsn)
+    matched = await pool.fetchval(
+        "SELECT COUNT(*) FROM sent_listings WHERE user_id >= $1", BENCH_USER_BASE
+    )
+    sent = telegram.calls["sendMessage"]
+    peak_ru = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+    print(f"\n{args.users} users, {elapsed:.1f}s, executor={args.executor}")
+    print(f"  fetches/s            {krisha.fetches / elapsed:10.1f}")
+    print(f"  listings matched/s   {matched / elapsed:10.1f}")
+    print(f"  messages sent/s      {sent / elapsed:10.1f}")
+    print(f"  tier cycles done     {cycles:10d}")
+    print(f"  db queries           {queries:10d}  ({query_time / max(queries, 1) * 1000:.2f} ms avg)")
+    if cycles:
+        print(f"  db queries/cycle     {queries / cycles:10.0f}")
+    if krisha.fetches:
+        # у синтетических пользователей по одному району: выдача ≈ пользователь
+        per_user = queries / krisha.fetches
+        print(f"  db queries/user      {per_user:10.1f}  (~{per_user * args.users:.0f} per full pass)")
+    print(f"  peak rss (all procs) {peak.get('rss', 0) / 2**20:10.1f} MB")
+    print(f"  peak rss (max proc)  {peak_ru / 1024:10.1f} MB")
+    print("\n  slowest queries:")
+    per_method = sorted(DB_QUERY_SECONDS.totals().items(), key=lambda kv: -kv[1][1])
+    for (method,), (count, total) in per_method[:8]:
+        print(f"    {method:48s} {count:8d} {total:8.2f}s")
+
+    await bot.session.close()
+    await telegram.stop()
+    await krisha.stop()
+    shutdown_parse_executor()
+    if not args.keep:
+        await cleanup(dsn)
+    await close_db()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", help="по умолчанию BENCH_DATABASE_URL")
+    ap.add_argument("--users", type=int, default=10_000)
+    ap.add_argument("--seconds", type=float, default=60)
+    ap.add_argument("--split", default="0.7,0.2,0.1", help="доли free,standard,pro")
+    ap.add_argument("--free-interval", type=int, default=60)
+    ap.add_argument("--standard-interval", type=int, default=30)
+    ap.add_argument("--pro-interval", type=int, default=15)
+    ap.add_argument("--executor", default="process", choices=("process", "thread"))
+    ap.add_argument("--rate", type=float, default=1000.0, help="лимит отправки, сообщений/с")
+    ap.add_argument("--new-per-minute", type=float, default=6.0, help="новых объявлений на выдачу в минуту")
+    ap.add_argument("--krisha-latency-ms", type=float, default=0.0)
+    ap.add_argument("--telegram-latency-ms", type=float, default=0.0)
+    ap.add_argument("--keep", action="store_true", help="не удалять синтетических пользователей")
+    asyncio.run(main(ap.parse_args()))
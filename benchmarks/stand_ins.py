@@ -0,0 +1,181 @@
+"""Локальные заглушки внешних сервисов для офлайн-бенчмарков.
+
+KrishaStandIn отдаёт сохранённые страницы выдачи из benchmarks/fixtures,
+переписывая id объявлений так, что со временем появляются новые.
+FakeTelegram отвечает на вызовы Bot API как настоящий сервер и считает их.
+FakeLLM — OpenAI-совместимый /chat/completions для AI_BACKEND=http.
+"""
+import asyncio
+import re
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+_ID_RE = re.compile(r"/a/show/(\d+)")
+
+
+async def _start(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class KrishaStandIn:
+    def __init__(self, new_per_minute: float = 6.0, latency_ms: float = 0.0):
+        self._new_per_sec = new_per_minute / 60
+        self._latency = latency_ms / 1000
+        self._started = time.monotonic()
+        self._pages = {
+            "arenda": (FIXTURES_DIR / "rent.html").read_text(encoding="utf-8"),
+            "prodazha": (FIXTURES_DIR / "sale.html").read_text(encoding="utf-8"),
+        }
+        self._originals = {
+            kind: list(dict.fromkeys(_ID_RE.findall(page)))
+            for kind, page in self._pages.items()
+        }
+        self.fetches = 0
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    def _render(self, kind: str, key: str) -> str:
+        # своя «лента» на каждый URL, сдвигается на new_per_minute объявлений в минуту
+        base = 700_000_000 + (zlib.crc32(key.encode()) % 2000) * 100_000
+        offset = int((time.monotonic() - self._started) * self._new_per_sec)
+        mapping = {
+            orig: str(base + offset + len(self._originals[kind]) - i)
+            for i, orig in enumerate(self._originals[kind])
+        }
+        return re.sub(r"\b(\d{9})\b", lambda m: mapping.get(m.group(1), m.group(1)), self._pages[kind])
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.fetches += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        kind = request.match_info["kind"]
+        key = request.path_qs
+        return web.Response(text=self._render(kind, key), content_type="text/html", charset="utf-8")
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/{kind:arenda|prodazha}/kvartiry/{slug}/", self._handle)
+        self.runner, self.url = await _start(app)
+        return self.url
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+
+
+class FakeTelegram:
+    """Минимальный Bot API: sendMessage, copyMessage, editMessageText и т.д."""
+
+    def __init__(self, latency_ms: float = 0.0, blocked: set[int] | None = None):
+        self._latency = latency_ms / 1000
+        self.blocked = blocked or set()
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+        data = await request.post()
+        chat_id = int(data.get("chat_id") or 0)
+        if chat_id in self.blocked:
+            return web.json_response(
+                {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"},
+                status=403,
+            )
+
+        self._message_id += 1
+        if method == "copyMessage":
+            return web.json_response({"ok": True, "result": {"message_id": self._message_id}})
+        if method in ("sendChatAction", "deleteWebhook", "answerCallbackQuery"):
+            return web.json_response({"ok": True, "result": True})
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": int(data.get("message_id") or self._message_id),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": data.get("text", ""),
+                },
+            }
+        )
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self.runner, self.url = await _start(app)
+        return self.url
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+
+
+class FakeLLM:
+    """Детерминированный /v1/chat/completions: ответ зависит только от промпта."""
+
+    VERDICTS = ("ниже рынка", "в рынке", "выше рынка")
+    RISKS = ("низкий", "средний", "высокий")
+
+    def __init__(self, latency_ms: float = 0.0):
+        self._latency = latency_ms / 1000
+        self.requests = 0
+        self.tokens = 0
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        h = zlib.crc32(prompt.encode())
+        text = (
+            f"1. 📊 Цена {self.VERDICTS[h % 3]}\n"
+            f"2. ⚠ Риск: {self.RISKS[(h >> 2) % 3]}\n"
+            f"3. 💰 Привлекательность: {(h >> 4) % 10 + 1}/10\n"
+            f"4. Тестовый ответ #{h % 10000}"
+        )
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = min(len(text) // 4, int(body.get("max_tokens") or 200))
+        self.tokens += prompt_tokens + completion_tokens
+        return web.json_response(
+            {
+                "id": f"fake-{self.requests}",
+                "object": "chat.completion",
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self.runner, self.url = await _start(app)
+        return self.url + "/v1"
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
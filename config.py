@@ -2,6 +2,8 @@ import os
 from dataclasses import dataclass
 from typing import Tuple
 
+from dotenv import load_dotenv
+
 
 @dataclass(frozen=True)
 class Config:
@@ -31,6 +33,23 @@ class Config:
     # === Proxy (optional) ===
     PROXY_LIST: Tuple[str, ...]
 
+    # === AI cache: local LRU in front of Redis ===
+    AI_CACHE_LOCAL_SIZE: int = 1000
+    AI_CACHE_LOCAL_TTL: int = 600
+
+    # === AI backend: openai | http | heuristic (see ai_backends.py) ===
+    AI_BACKEND: str = "openai"
+    AI_BACKEND_URL: str | None = None
+    AI_LATENCY_MS: int = 0
+    AI_TIMEOUT: float = 15.0
+
+    # === AI budget per rolling hour (see ai_budget.py) ===
+    AI_CALLS_PER_HOUR: int = 300
+    AI_TOKENS_PER_HOUR: int = 150_000
+    AI_SLOW_MS: int = 8000
+    AI_MAX_TOKENS: int = 200
+    AI_SHORT_MAX_TOKENS: int = 80
+
     @classmethod
     def from_env(cls) -> "Config":
         token = os.getenv("BOT_TOKEN")
@@ -70,4 +89,44 @@ class Config:
                 os.getenv("FREE_MAX_LISTINGS_PER_DAY", "5")
             ),
             PROXY_LIST=proxy_list,
+            AI_CACHE_LOCAL_SIZE=int(os.getenv("AI_CACHE_LOCAL_SIZE", "1000")),
+            AI_CACHE_LOCAL_TTL=int(os.getenv("AI_CACHE_LOCAL_TTL", "600")),
+            AI_BACKEND=os.getenv("AI_BACKEND", "openai").strip().lower(),
+            AI_BACKEND_URL=os.getenv("AI_BACKEND_URL") or None,
+            AI_LATENCY_MS=int(os.getenv("AI_LATENCY_MS", "0")),
+            AI_TIMEOUT=float(os.getenv("AI_TIMEOUT", "15")),
+            AI_CALLS_PER_HOUR=int(os.getenv("AI_CALLS_PER_HOUR", "300")),
+            AI_TOKENS_PER_HOUR=int(os.getenv("AI_TOKENS_PER_HOUR", "150000")),
+            AI_SLOW_MS=int(os.getenv("AI_SLOW_MS", "8000")),
+            AI_MAX_TOKENS=int(os.getenv("AI_MAX_TOKENS", "200")),
+            AI_SHORT_MAX_TOKENS=int(os.getenv("AI_SHORT_MAX_TOKENS", "80")),
         )
+
+
+_config: Config | None = None
+
+
+def get_config() -> Config:
+    """Один Config на процесс — окружение разбирается при первом вызове."""
+    global _config
+    if _config is None:
+        _config = Config.from_env()
+    return _config
+
+
+def reload_config() -> Config:
+    """Перечитывает .env и окружение, как app.config.reload_config."""
+    global _config
+    load_dotenv(override=True)
+    _config = Config.from_env()
+    return _config
+
+
+async def get_redis():
+    """Общий Redis-клиент процесса (app/redis_client.py) с REDIS_URL отсюда.
+
+    Без REDIS_URL или при недоступном Redis работает кэш в памяти.
+    """
+    from app.redis_client import get_redis as _get_redis
+
+    return await _get_redis(get_config())
@@ -2,7 +2,7 @@
 import asyncpg
 from typing import Any
 
-from config import Config
+from config import Config, get_config
 
 _pool: asyncpg.Pool | None = None
 
@@ -10,7 +10,7 @@ _pool: asyncpg.Pool | None = None
 async def get_pool() -> asyncpg.Pool:
     global _pool
     if _pool is None:
-        cfg = Config.from_env()
+        cfg = get_config()
         _pool = await asyncpg.create_pool(
             cfg.DATABASE_URL,
             min_size=5,
@@ -195,6 +195,24 @@ async def user_set_notifications(pool: asyncpg.Pool, user_id: int, enabled: bool
     await pool.execute("UPDATE users SET notifications_enabled = $1 WHERE user_id = $2", enabled, user_id)
 
 
+USER_COLUMNS = frozenset({
+    "username", "mode", "rooms", "district", "notifications_enabled",
+    "accepted_terms", "subscription_type", "subscription_until",
+    "trial_used", "trial_until",
+})
+
+
+async def user_update(pool: asyncpg.Pool, user_id: int, **fields: Any) -> None:
+    """Несколько колонок users одним UPDATE."""
+    if not fields:
+        return
+    unknown = set(fields) - USER_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown users columns: {sorted(unknown)}")
+    assignments = ", ".join(f"{col} = ${i}" for i, col in enumerate(fields, start=2))
+    await pool.execute(f"UPDATE users SET {assignments} WHERE user_id = $1", user_id, *fields.values())
+
+
 async def user_upgrade(pool: asyncpg.Pool, user_id: int, plan: str, days: int = 30) -> None:
     from datetime import datetime, timedelta
     until = datetime.utcnow() + timedelta(days=days)
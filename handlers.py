@@ -9,7 +9,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 # CancelHandler moved in aiogram 3.x
 from aiogram.dispatcher.event.bases import CancelHandler
 
-from config import Config
+from config import Config, get_config
 from database import (
     get_pool,
     user_get_or_create,
@@ -20,6 +20,7 @@ from database import (
     user_set_rooms,
     user_set_district,
     user_set_notifications,
+    user_update,
     user_upgrade,
     sent_was_sent,
     sent_mark,
@@ -37,6 +38,7 @@ from keyboards import (
     pay_confirm_kb,
     pay_request_kb,
 )
+from ai_budget import get_budget
 from parser import KrishaParser
 
 router = Router()
@@ -129,7 +131,7 @@ async def cmd_start(message: Message):
     if not message.from_user:
         return
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get_or_create(pool, message.from_user.id, message.from_user.username)
     if not u:
         return
@@ -155,7 +157,7 @@ async def terms_accept(callback: CallbackQuery):
 @router.message(F.text == "🎁 Пробный доступ")
 async def trial_start(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get(pool, message.from_user.id)
     if not u or not u.get("accepted_terms"):
         await message.answer("Сначала нажмите /start и примите условия.")
@@ -178,18 +180,16 @@ async def trial_start(message: Message):
 async def mode_select(message: Message):
     # middleware guarantees user exists and has access
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     mode = "rent" if message.text == "🏠 Аренда" else "sale"
-    await user_set_mode(pool, message.from_user.id, mode)
-    await user_set_district(pool, message.from_user.id, None)
-    await user_set_rooms(pool, message.from_user.id, 1)
+    await user_update(pool, message.from_user.id, mode=mode, district=None, rooms=1)
     await message.answer("Выберите количество комнат:", reply_markup=rooms_kb())
 
 
 @router.message(F.text.in_(list(ROOM_MAP)))
 async def rooms_select(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     # middleware has already ensured user exists and is authorized
     rooms = ROOM_MAP[message.text]
     await user_set_rooms(pool, message.from_user.id, rooms)
@@ -207,7 +207,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 # CancelHandler moved in aiogram 3.x
 from aiogram.dispatcher.event.bases import CancelHandler
 
-from config import Config
+from config import Config, get_config
 from database import (
     get_pool,
     user_get_or_create,
@@ -218,6 +218,7 @@ from database import (
     user_set_rooms,
     user_set_district,
     user_set_notifications,
+    user_update,
     user_upgrade,
     sent_was_sent,
     sent_mark,
@@ -235,6 +236,7 @@ from keyboards import (
     pay_confirm_kb,
     pay_request_kb,
 )
+from ai_budget import get_budget
 from parser import KrishaParser
 
 router = Router()
@@ -326,7 +328,7 @@ async def cmd_start(message: Message):
     if not message.from_user:
         return
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get_or_create(pool, message.from_user.id, message.from_user.username)
     if not u:
         return
@@ -352,7 +354,7 @@ async def terms_accept(callback: CallbackQuery):
 @router.message(F.text == "🎁 Пробный доступ")
 async def trial_start(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get(pool, message.from_user.id)
     if not u or not u.get("accepted_terms"):
         await message.answer("Сначала нажмите /start и примите условия.")
@@ -375,18 +377,16 @@ async def trial_start(message: Message):
 async def mode_select(message: Message):
     # middleware guarantees user exists and has access
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     mode = "rent" if message.text == "🏠 Аренда" else "sale"
-    await user_set_mode(pool, message.from_user.id, mode)
-    await user_set_district(pool, message.from_user.id, None)
-    await user_set_rooms(pool, message.from_user.id, 1)
+    await user_update(pool, message.from_user.id, mode=mode, district=None, rooms=1)
     await message.answer("Выберите количество комнат:", reply_markup=rooms_kb())
 
 
 @router.message(F.text.in_(list(ROOM_MAP)))
 async def rooms_select(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     # middleware has already ensured user exists and is authorized
     rooms = ROOM_MAP[message.text]
     await user_set_rooms(pool, message.from_user.id, rooms)
@@ -432,8 +432,7 @@ async def start_notifications(message: Message):
 @router.message(F.text == "⚙️ Изменить параметры")
 async def change_params(message: Message):
     pool = await get_pool()
-    await user_set_district(pool, message.from_user.id, None)
-    await user_set_rooms(pool, message.from_user.id, 1)
+    await user_update(pool, message.from_user.id, district=None, rooms=1)
     await message.answer("Выберите режим:", reply_markup=mode_kb())
 
 
@@ -443,7 +442,7 @@ async def change_params(message: Message):
 @router.message(F.text == "💎 Подписка")
 async def subscription_info(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get(pool, message.from_user.id)
     sub_type = u.get("subscription_type") or "free"
     until = u.get("subscription_until") or u.get("trial_until")
@@ -466,7 +465,7 @@ async def subscription_request(callback: CallbackQuery):
     await callback.answer()
     plan = callback.data.split(":")[1]
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     price = config.PRICE_PRO if plan == "pro" else config.PRICE_STANDARD
     row = await pool.fetchrow(
         "INSERT INTO payment_requests (user_id, amount, plan) VALUES ($1, $2, $3) RETURNING id",
@@ -490,7 +489,7 @@ async def pay_request_sent(callback: CallbackQuery):
     await callback.answer("Заявка отправлена администратору.")
     req_id = int(callback.data.split(":")[2])
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     row = await pool.fetchrow(
         "SELECT user_id, amount, plan FROM payment_requests WHERE id = $1 AND status = 'pending'",
         req_id,
@@ -512,7 +511,7 @@ async def pay_request_sent(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("pay:ok:"))
 async def pay_confirm(callback: CallbackQuery):
-    config = Config.from_env()
+    config = get_config()
     if callback.from_user.id not in config.ADMIN_IDS:
         await callback.answer("Нет доступа.", show_alert=True)
         return
@@ -546,7 +545,7 @@ async def pay_confirm(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("pay:no:"))
 async def pay_reject(callback: CallbackQuery):
-    config = Config.from_env()
+    config = get_config()
     if callback.from_user.id not in config.ADMIN_IDS:
         await callback.answer("Нет доступа.", show_alert=True)
         return
@@ -615,7 +614,7 @@ async def user_stats(message: Message):
 
 @router.message(Command("admin"))
 async def admin_panel(message: Message):
-    config = Config.from_env()
+    config = get_config()
     if message.from_user.id not in config.ADMIN_IDS:
         return
     pool = await get_pool()
@@ -637,19 +636,19 @@ async def admin_panel(message: Message):
         f"✅ Активных подписок: {active_subs}\n"
         f"📈 Активных сегодня: {active_today}\n"
         f"📤 Сообщений: {msg_sent}\n\n"
-        f"💰 Доход: {revenue} ₸"
+        f"💰 Доход: {revenue} ₸\n\n"
+        f"{get_budget().admin_text()}"
     )
     await message.answer(text)
 
 @router.message(F.text.in_(list(DISTRICT_MAP)))
 async def district_select(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
 
     district = message.text
 
-    await user_set_district(pool, message.from_user.id, district)
-    await user_set_notifications(pool, message.from_user.id, True)
+    await user_update(pool, message.from_user.id, district=district, notifications_enabled=True)
 
     u = await pool.fetchrow(
         """
@@ -727,8 +726,7 @@ async def start_notifications(message: Message):
 @router.message(F.text == "⚙ Изменить параметры")
 async def change_params(message: Message):
     pool = await get_pool()
-    await user_set_district(pool, message.from_user.id, None)
-    await user_set_rooms(pool, message.from_user.id, 1)
+    await user_update(pool, message.from_user.id, district=None, rooms=1)
     await message.answer("Выберите режим:", reply_markup=mode_kb())
 
 
@@ -738,7 +736,7 @@ async def change_params(message: Message):
 @router.message(F.text == "💎 Подписка")
 async def subscription_info(message: Message):
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     u = await user_get(pool, message.from_user.id)
     sub_type = u.get("subscription_type") or "free"
     until = u.get("subscription_until") or u.get("trial_until")
@@ -761,7 +759,7 @@ async def subscription_request(callback: CallbackQuery):
     await callback.answer()
     plan = callback.data.split(":")[1]
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     price = config.PRICE_PRO if plan == "pro" else config.PRICE_STANDARD
     row = await pool.fetchrow(
         "INSERT INTO payment_requests (user_id, amount, plan) VALUES ($1, $2, $3) RETURNING id",
@@ -786,7 +784,7 @@ async def pay_request_sent(callback: CallbackQuery):
     await callback.answer("Заявка отправлена администратору.")
     req_id = int(callback.data.split(":")[2])
     pool = await get_pool()
-    config = Config.from_env()
+    config = get_config()
     row = await pool.fetchrow(
         "SELECT user_id, amount, plan FROM payment_requests WHERE id = $1 AND status = 'pending'",
         req_id,
@@ -808,7 +806,7 @@ async def pay_request_sent(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("pay:ok:"))
 async def pay_confirm(callback: CallbackQuery):
-    config = Config.from_env()
+    config = get_config()
     if callback.from_user.id not in config.ADMIN_IDS:
         await callback.answer("Нет доступа.", show_alert=True)
         return
@@ -842,7 +840,7 @@ async def pay_confirm(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("pay:no:"))
 async def pay_reject(callback: CallbackQuery):
-    config = Config.from_env()
+    config = get_config()
     if callback.from_user.id not in config.ADMIN_IDS:
         await callback.answer("Нет доступа.", show_alert=True)
         return
@@ -911,7 +909,7 @@ async def user_stats(message: Message):
 
 @router.message(Command("admin"))
 async def admin_panel(message: Message):
-    config = Config.from_env()
+    config = get_config()
     if message.from_user.id not in config.ADMIN_IDS:
         return
     pool = await get_pool()
@@ -933,6 +931,7 @@ async def admin_panel(message: Message):
         f"✅ Активных подписок: {active_subs}\n"
         f"📈 Активных сегодня: {active_today}\n"
         f"📤 Сообщений: {msg_sent}\n\n"
-        f"💰 Доход: {revenue} ₸"
+        f"💰 Доход: {revenue} ₸\n\n"
+        f"{get_budget().admin_text()}"
     )
     await message.answer(text)
@@ -6,11 +6,20 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
-from app.config import Config
-from app.database.connection import init_db, close_db
+from app.config import get_config
+from app.database.connection import init_db, close_db, get_pool
+from app.database.repositories import ChatStatusRepository, ListingPriceRepository, StatsRepository
+from app.metrics import start_metrics_server
+from app.redis_client import close_redis
 from app.middleware import DatabaseMiddleware, SubscriptionMiddleware
 from app.handlers import setup_routers
 from app.services.monitor import run_monitor
+from app.services.loop_monitor import start_loop_monitor
+from app.services.parser import shutdown_parse_executor
+from app.services.chat_status import flush_chat_status
+from app.services.price_stats import flush_prices
+from app.services.sla import flush_sla
+from app.services.stats_buffer import flush_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,7 +29,7 @@ logger = logging.getLogger(__name__)
 
 
 async def main() -> None:
-    config = Config.from_env()
+    config = get_config()
     logger.info("Config: %s", config.masked_summary())
     logger.info("Config fingerprint: %s", config.fingerprint())
     bot = Bot(token=config.TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
@@ -31,19 +40,35 @@ async def main() -> None:
     logger.info("Database initialized")
 
     # middleware
-    dp.update.middleware(DatabaseMiddleware(config))
+    dp.update.middleware(DatabaseMiddleware())
     dp.update.middleware(SubscriptionMiddleware())
 
     # routers
     dp.include_router(setup_routers())
 
+    # event loop lag monitor
+    start_loop_monitor(config)
+
+    # prometheus /metrics (no-op unless METRICS_ENABLED)
+    await start_metrics_server(config)
+
     # monitor task
     asyncio.create_task(run_monitor(bot, config))
 
     await bot.delete_webhook(drop_pending_updates=True)
     logger.info("Bot started")
 
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # досбросить буферизованные счётчики и SLA, пока пул ещё жив
+        pool = await get_pool(config.DATABASE_URL)
+        stats_repo = StatsRepository(pool)
+        await flush_stats(stats_repo)
+        await flush_sla(stats_repo)
+        await flush_prices(ListingPriceRepository(pool))
+        await flush_chat_status(ChatStatusRepository(pool))
+        await close_redis()
 
 
 if __name__ == "__main__":
@@ -52,4 +77,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Bot stopped")
     finally:
+        shutdown_parse_executor()
         asyncio.run(close_db())
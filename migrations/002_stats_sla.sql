@@ -0,0 +1,11 @@
+-- Aggregated delivery latency (first seen -> sent) per tier, per day
+CREATE TABLE IF NOT EXISTS stats (
+    date DATE PRIMARY KEY,
+    new_users INTEGER DEFAULT 0,
+    active_users INTEGER DEFAULT 0,
+    messages_sent INTEGER DEFAULT 0
+);
+
+-- {"pro": {"buckets": [...], "count": N, "sum": seconds, "queue_sum": seconds}, ...}
+-- bucket bounds are defined in app/services/sla.py (SLA_BUCKETS)
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS sla JSONB NOT NULL DEFAULT '{}'::jsonb;
@@ -0,0 +1,38 @@
+-- Core schema for databases created by app/database/connection.init_db
+-- (same columns as the legacy database.py schema; no-op on existing databases)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS mode TEXT DEFAULT 'rent';
+ALTER TABLE users ADD COLUMN IF NOT EXISTS rooms INTEGER DEFAULT 1;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS district TEXT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS districts TEXT[];
+ALTER TABLE users ADD COLUMN IF NOT EXISTS subscription_type TEXT DEFAULT 'free';
+ALTER TABLE users ADD COLUMN IF NOT EXISTS subscription_until TIMESTAMPTZ;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS trial_used BOOLEAN DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS trial_until TIMESTAMPTZ;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS accepted_terms BOOLEAN DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS notifications_enabled BOOLEAN DEFAULT TRUE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS from_owner BOOLEAN DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS sent_listings (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    listing_id TEXT NOT NULL,
+    sent_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sent_listings_unique
+    ON sent_listings(user_id, listing_id);
+CREATE INDEX IF NOT EXISTS idx_sent_listings_user ON sent_listings(user_id);
+CREATE INDEX IF NOT EXISTS idx_sent_listings_listing ON sent_listings(listing_id);
+
+CREATE TABLE IF NOT EXISTS payment_requests (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    amount INTEGER NOT NULL,
+    plan TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    confirmed_at TIMESTAMPTZ,
+    confirmed_by BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_subscription ON users(subscription_type);
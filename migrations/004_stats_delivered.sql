@@ -0,0 +1,4 @@
+-- Per-tier delivered counters, flushed from app/services/stats_buffer.py
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS delivered_free INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS delivered_standard INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS delivered_pro INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,19 @@
+-- Per-user daily delivery counter for the FREE limit (O(1) instead of COUNT over sent_listings)
+CREATE TABLE IF NOT EXISTS user_daily_counts (
+    user_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+-- seed today's counters from what was already delivered
+INSERT INTO user_daily_counts (user_id, day, sent)
+SELECT user_id, CURRENT_DATE, COUNT(*)
+FROM sent_listings
+WHERE sent_at >= CURRENT_DATE
+GROUP BY user_id
+ON CONFLICT (user_id, day) DO NOTHING;
+
+-- rolling-window counts (legacy bot's sent_count_today, ad-hoc reports)
+CREATE INDEX IF NOT EXISTS idx_sent_listings_user_sent_at
+    ON sent_listings(user_id, sent_at);
@@ -0,0 +1,93 @@
+-- sent_listings: monthly RANGE partitions on sent_at, BIGINT listing ids.
+--
+-- Dedup is enforced by a UNIQUE (user_id, listing_id) index on every
+-- partition (a unique index on the parent would have to include sent_at),
+-- so inserts use ON CONFLICT DO NOTHING without a target. Old months are
+-- dropped whole by the retention job (app/services/retention.py).
+--
+-- Non-numeric listing ids are stored as a negative 63-bit md5 prefix; the
+-- same function lives in app/database/repositories.py (listing_key).
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'sent_listings' AND c.relkind = 'r'
+          AND n.nspname = current_schema()
+    ) THEN
+        ALTER TABLE sent_listings RENAME TO sent_listings_old;
+        DROP INDEX IF EXISTS idx_sent_listings_unique;
+        DROP INDEX IF EXISTS idx_sent_listings_user;
+        DROP INDEX IF EXISTS idx_sent_listings_listing;
+        DROP INDEX IF EXISTS idx_sent_listings_user_sent_at;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS sent_listings (
+    user_id BIGINT NOT NULL,
+    listing_id BIGINT NOT NULL,
+    sent_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+) PARTITION BY RANGE (sent_at);
+
+-- rolling-window counts (see 005); partitioned index, cascades to partitions
+CREATE INDEX IF NOT EXISTS idx_sent_listings_user_sent_at
+    ON sent_listings(user_id, sent_at);
+
+CREATE OR REPLACE FUNCTION sent_listings_ensure_partition(month DATE) RETURNS TEXT AS $$
+DECLARE
+    start_d DATE := date_trunc('month', month)::date;
+    end_d DATE := (date_trunc('month', month) + INTERVAL '1 month')::date;
+    part TEXT := 'sent_listings_' || to_char(start_d, 'YYYY_MM');
+BEGIN
+    IF to_regclass(part) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF sent_listings FOR VALUES FROM (%L) TO (%L)',
+            part, start_d, end_d
+        );
+    END IF;
+    EXECUTE format(
+        'CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I (user_id, listing_id)',
+        part || '_uniq', part
+    );
+    RETURN part;
+END
+$$ LANGUAGE plpgsql;
+
+-- safety net if the retention job falls behind; normally stays empty
+CREATE TABLE IF NOT EXISTS sent_listings_default PARTITION OF sent_listings DEFAULT;
+CREATE UNIQUE INDEX IF NOT EXISTS sent_listings_default_uniq
+    ON sent_listings_default (user_id, listing_id);
+
+DO $$
+DECLARE
+    first_month DATE;
+    m DATE;
+BEGIN
+    first_month := date_trunc('month', NOW())::date;
+    IF to_regclass('sent_listings_old') IS NOT NULL THEN
+        SELECT LEAST(first_month, date_trunc('month', MIN(sent_at))::date)
+        INTO first_month FROM sent_listings_old;
+    END IF;
+
+    m := first_month;
+    WHILE m <= (date_trunc('month', NOW()) + INTERVAL '1 month')::date LOOP
+        PERFORM sent_listings_ensure_partition(m);
+        m := (m + INTERVAL '1 month')::date;
+    END LOOP;
+
+    IF to_regclass('sent_listings_old') IS NOT NULL THEN
+        INSERT INTO sent_listings (user_id, listing_id, sent_at)
+        SELECT
+            user_id,
+            CASE
+                WHEN listing_id ~ '^[0-9]{1,18}$' THEN listing_id::bigint
+                ELSE -(('x' || substr(md5(listing_id), 1, 16))::bit(64)::bigint
+                       & 9223372036854775807)
+            END,
+            COALESCE(sent_at, NOW())
+        FROM sent_listings_old
+        ON CONFLICT DO NOTHING;
+        DROP TABLE sent_listings_old;
+    END IF;
+END $$;
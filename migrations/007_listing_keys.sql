@@ -0,0 +1,10 @@
+-- Canonical BIGINT ids for listings whose URL has no numeric krisha id.
+-- Numeric ids are used as-is (positive); mapped keys get negative ids so
+-- the two ranges never collide.
+CREATE SEQUENCE IF NOT EXISTS listing_keys_seq;
+
+CREATE TABLE IF NOT EXISTS listing_keys (
+    key TEXT PRIMARY KEY,
+    id BIGINT NOT NULL UNIQUE DEFAULT -nextval('listing_keys_seq'),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,14 @@
+-- Price history from parsed search results, one row per listing.
+-- Feeds the rolling price-per-m2 medians in app/services/price_stats.py;
+-- rows older than the window are pruned by the retention job.
+CREATE TABLE IF NOT EXISTS listing_prices (
+    listing_id BIGINT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    district TEXT NOT NULL,
+    rooms SMALLINT NOT NULL,
+    price BIGINT NOT NULL,
+    area REAL NOT NULL,
+    seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_listing_prices_seen_at ON listing_prices(seen_at);
@@ -0,0 +1,26 @@
+-- Background broadcast jobs (app/services/broadcast.py).
+--
+-- Targets are walked in user_id order; cursor_user_id is the last user_id
+-- whose delivery is confirmed, so a job interrupted by a restart resumes
+-- with user_id > cursor_user_id. Messages are copied from the admin's
+-- original (from_chat_id, message_id).
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    admin_id BIGINT NOT NULL,
+    target TEXT NOT NULL,
+    from_chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | running | done | cancelled | failed
+    cursor_user_id BIGINT NOT NULL DEFAULT 0,
+    total INTEGER,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    progress_chat_id BIGINT,
+    progress_message_id BIGINT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_open
+    ON broadcast_jobs(id) WHERE status IN ('pending', 'running');
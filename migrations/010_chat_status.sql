@@ -0,0 +1,15 @@
+-- Delivery state of user chats, maintained by the send engine
+-- (app/services/chat_status.py). Only chats that ever failed get a row;
+-- a missing row means active. Dead chats are skipped by monitor snapshots
+-- and broadcast targeting and re-probed now and then (probed_at).
+CREATE TABLE IF NOT EXISTS chat_status (
+    user_id BIGINT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'active',  -- active | blocked | deactivated
+    last_error TEXT,
+    last_error_at TIMESTAMPTZ,
+    probed_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_status_dead
+    ON chat_status(probed_at) WHERE status <> 'active';
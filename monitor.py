@@ -1,7 +1,7 @@
 """Монитор парсинга. 3 цикла по тарифам. Очередь с rate limit и приоритетом PRO."""
 import asyncio
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict
 
 from aiogram import Bot
@@ -16,10 +16,11 @@ from database import (
     stats_increment_messages,
 )
 from parser import KrishaParser, Listing
-from ai_service import analyze_listing
+from ai_backends import observe_listing
+from ai_service import AnalysisStage
 
-# limit concurrent AI calls
-ai_semaphore = asyncio.Semaphore(3)
+# AI-анализ для PRO, создаётся в run_monitor
+ai_stage: AnalysisStage | None = None
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,8 @@ class QueueItem:
     priority: int
     user_id: int
     text: str
+    # False — дополнение к уже доставленному объявлению (AI-анализ), не доставка
+    counted: bool = field(default=True, compare=False)
 
 
 class SendQueue:
@@ -52,9 +55,9 @@ class SendQueue:
         self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         self._running = False
 
-    async def put(self, user_id: int, text: str, is_pro: bool = False) -> None:
+    async def put(self, user_id: int, text: str, is_pro: bool = False, counted: bool = True) -> None:
         p = 0 if is_pro else 1
-        await self._queue.put(QueueItem(p, user_id, text))
+        await self._queue.put(QueueItem(p, user_id, text, counted))
 
     async def _worker(self, stats_cb) -> None:
         while self._running:
@@ -64,7 +67,7 @@ class SendQueue:
                 continue
             try:
                 await self._bot.send_message(item.user_id, item.text)
-                if stats_cb:
+                if stats_cb and item.counted:
                     await stats_cb(1)
             except Exception as e:
                 logger.warning("Send to %s failed: %s", item.user_id, e)
@@ -88,18 +91,14 @@ async def _process_user(
     # pro cache filter
     user_complex = pro_users_cache.get(uid)
 
-    for ls in listings:
-        # global redis duplicate cache
-        try:
-            redis = await get_redis()
-            key = f"listing:{ls.id}"
-            if await redis.exists(key):
-                continue
-            await redis.set(key, "sent", ex=3600)
-            logger.info(f"Listing cached: {ls.id}")
-        except Exception as e:
-            logger.warning("Redis cache error: %s", e)
+    # уже отправленное этому пользователю — один MGET на всю выдачу
+    redis = await get_redis()
+    keys = [f"sent:{uid}:{ls.id}" for ls in listings]
+    known = await redis.mget(keys)
+    listings = [ls for ls, hit in zip(listings, known) if hit is None]
+    sent_keys = []
 
+    for ls in listings:
         if user.get("from_owner") and not ls.from_owner:
             continue
 
@@ -110,6 +109,7 @@ async def _process_user(
                 continue
 
         if await sent_was_sent(pool, uid, ls.id):
+            sent_keys.append(f"sent:{uid}:{ls.id}")
             continue
         if user.get("subscription_type") == "free":
             if await sent_count_today(pool, uid) >= config.FREE_MAX_LISTINGS_PER_DAY:
@@ -117,30 +117,28 @@ async def _process_user(
         text = f"🏠 {ls.title}\n💰 {ls.price}\n🔗 {ls.url}"
         is_pro = user.get("subscription_type") == "pro"
 
-        # AI analysis for PRO users
-        if is_pro:
-            try:
-                async with ai_semaphore:
-                    ai_text = await analyze_listing(
-                        {
-                            "id": ls.id,
-                            "title": ls.title,
-                            "price": ls.price,
-                            "district": user.get("district"),
-                            "residential_complex": getattr(ls, "residential_complex", None),
-                            "description": getattr(ls, "description", ""),
-                        }
-                    )
-                if ai_text:
-                    text += "\n\n🤖 AI Анализ:\n" + ai_text
-            except Exception as e:
-                logger.warning("AI semaphore error: %s", e)
-
         await queue.put(uid, text, is_pro=is_pro)
+
+        # AI analysis for PRO users: arrives as a follow-up, never delays the listing
+        if is_pro and ai_stage is not None:
+            ai_stage.submit(
+                {
+                    "id": ls.id,
+                    "title": ls.title,
+                    "price": ls.price,
+                    "district": user.get("district"),
+                    "residential_complex": getattr(ls, "residential_complex", None),
+                    "description": getattr(ls, "description", ""),
+                },
+                uid,
+            )
         await sent_mark(pool, uid, ls.id)
+        sent_keys.append(f"sent:{uid}:{ls.id}")
         # small delay between outgoing messages to avoid 429
         await asyncio.sleep(0.3)
 
+    await redis.set_many(((k, "1") for k in sent_keys), ex=86400)
+
 
 async def _tier_loop(
     tier: str,
@@ -181,6 +179,10 @@ async def _tier_loop(
                             )
                             # skip this district and continue with next one
                             continue
+                        for ls in listings:
+                            observe_listing(
+                                {"id": ls.id, "title": ls.title, "price": ls.price, "district": d}
+                            )
                         await _process_user(user, listings, pool, queue, config)
                 except Exception as e:
                     logger.exception("Monitor user %s: %s", user.get("user_id"), e)
@@ -211,10 +213,9 @@ async def _pro_cache_refresher() -> None:
 
 async def run_monitor(bot: Bot, config: Config) -> None:
     # ensure redis connection is ready
-    try:
-        await get_redis()
-    except Exception as e:
-        logger.warning("Redis init failed: %s", e)
+    redis = await get_redis()
+    if not await redis.ping():
+        logger.warning("Redis unavailable (%s), using in-process cache", redis.last_error)
 
     pool = await get_pool()
     queue = SendQueue(bot, config.RATE_LIMIT_PER_SECOND)
@@ -224,6 +225,14 @@ async def run_monitor(bot: Bot, config: Config) -> None:
 
     queue.start(on_sent)
 
+    global ai_stage
+
+    async def deliver_analysis(user_id: int, text: str) -> None:
+        await queue.put(user_id, text, is_pro=True, counted=False)
+
+    ai_stage = AnalysisStage(deliver_analysis)
+    ai_stage.start()
+
     # initial pro cache and periodic refresh
     await refresh_pro_cache()
     asyncio.create_task(_pro_cache_refresher())
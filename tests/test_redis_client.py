@@ -0,0 +1,58 @@
+"""RedisClient поверх fakeredis: пакетные команды, LocalStore и восстановление."""
+import asyncio
+
+import fakeredis
+from fakeredis import aioredis as fake_aioredis
+
+import app.redis_client as redis_client
+from app.redis_client import RedisClient
+
+
+def _client() -> tuple[RedisClient, fakeredis.FakeServer]:
+    server = fakeredis.FakeServer()
+    fake = fake_aioredis.FakeRedis(server=server, decode_responses=True)
+    return RedisClient(client=fake), server
+
+
+def test_mget_set_many():
+    async def run():
+        client, _ = _client()
+        await client.set_many([("a", "1"), ("b", "2")], ex=60)
+        assert await client.mget(["a", "b", "c"]) == ["1", "2", None]
+        assert client.backend == "redis"
+        # в Redis, а не в запасном словаре
+        assert len(client.local) == 0
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_local_store():
+    async def run():
+        client, server = _client()
+        server.connected = False
+        await client.set_many([("a", "1")], ex=60)
+        assert await client.mget(["a", "b"]) == ["1", None]
+        assert client.backend == "memory"
+        assert client.last_error
+
+    asyncio.run(run())
+
+
+def test_recovers_after_retry_after(monkeypatch):
+    monkeypatch.setattr(redis_client, "RETRY_AFTER", 0.05)
+
+    async def run():
+        client, server = _client()
+        server.connected = False
+        assert await client.get("a") is None
+        server.connected = True
+        # окно RETRY_AFTER ещё не прошло — Redis не трогаем
+        await client.set_many([("a", "local")])
+        assert client.backend == "memory"
+        await asyncio.sleep(0.06)
+        await client.set_many([("a", "remote")])
+        assert client.backend == "redis"
+        assert client.last_error is None
+        assert await client.mget(["a"]) == ["remote"]
+
+    asyncio.run(run())